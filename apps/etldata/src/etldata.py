@@ -1,17 +1,36 @@
 import os
 import sys
 sys.path.append(os.getcwd())
-import utils.etl_util as etlu
+import utils.cache_util as cacheu
+import utils.io_util as iou
 import utils.misc_util as miscu
 import argparse
+import copy
+import glob
 import json
 import logging
-from types import SimpleNamespace as Namespace
-from utils.log_util import log_trace
+import pickle
+from utils.log_util import log_trace, enable_metrics, write_metrics_report
+from utils.version_util import atomic_path
+
+# Modules depending on pandas are loaded on first use only
+etlu = miscu.lazy_import('utils.etl_util')
+filu = miscu.lazy_import('utils.file_util')
+engineu = miscu.lazy_import('utils.engine_util')
 
 RETURN_SUCCESS = 0
 RETURN_FAILURE = 1
 APP = 'EtlData utility'
+FEATURE_TYPES = ('extraction', 'transformation', 'rollup')
+PIPELINE_FEATURE_TYPES = ('pipeline', 'all')
+
+# Compiled config plans, keyed on path and modification time
+_LOADED_CONFIGS = {}
+PLAN_CACHE_DIR = '__pycache__'
+# Directory next to the output holding reject files, outside the output's '<title>_<N>' versions
+REJECT_DIR = 'rejects'
+# Title suffix of the reject file of records missing from the mapping, which carry mapped columns and types
+UNMAPPED_REJECTS = 'unmapped'
 
 
 def main(argv):
@@ -27,17 +46,35 @@ def main(argv):
         logging.info('')
         logging.info(f'Entering {APP}')
 
+        # Record stage metrics, if a report is requested.
+        metrics_path = vars(args)['metrics_path']
+        if metrics_path:
+            enable_metrics()
+
         # Preparation step.
-        mapping_args = miscu.convert_namespace_to_dict(args)
-        mapping_conf = miscu.convert_namespace_to_dict(feature_config)
-
-        # Workflow steps.
-        if feature_type == 'extraction':
-            run_extraction(mapping_args, mapping_conf)
-        elif feature_type == 'transformation':
-            run_transformation(mapping_args, mapping_conf)
-        else:
-            logging.warning(f'Incorrect feature type: [{feature_type}]')
+        mapping_args = vars(args)
+        mapping_conf = feature_config
+
+        if mapping_args['dry_run']:
+            _dry_run(mapping_args, process_name, feature_type)
+            logging.info(f'Leaving {APP}')
+            return RETURN_SUCCESS
+
+        try:
+            # Workflow steps.
+            if feature_type == 'extraction':
+                run_extraction(mapping_args, mapping_conf)
+            elif feature_type == 'transformation':
+                run_transformation(mapping_args, mapping_conf)
+            elif feature_type in PIPELINE_FEATURE_TYPES:
+                run_pipeline(mapping_args, mapping_conf)
+            elif feature_type == 'rollup':
+                run_rollup(mapping_args, mapping_conf)
+            else:
+                logging.warning(f'Incorrect feature type: [{feature_type}]')
+        finally:
+            if metrics_path:
+                write_metrics_report(metrics_path)
 
         logging.info(f'Leaving {APP}')
 
@@ -64,44 +101,153 @@ def _interpret_args(argv):
     arg_parser.add_argument('-log', dest='log_path', help='Fully qualified logging file')
     arg_parser.add_argument('-process', dest='process', help='Process type', required=True)
     arg_parser.add_argument('-mode', dest='mode', help='Overwrite or create new when writing choice')
+    arg_parser.add_argument('-chunksize', dest='chunk_size', type=int,
+                            help='Number of rows per chunk to stream the input with')
+    arg_parser.add_argument('-intermediate', dest='intermediate_path',
+                            help='Optional extraction output path when running the full pipeline')
+    arg_parser.add_argument('-incremental', dest='incremental', action='store_true',
+                            help='Merge the input into the persisted aggregate state of the output')
+    arg_parser.add_argument('-metrics', dest='metrics_path',
+                            help='Stage metrics report path, a Prometheus textfile if ending with .prom, JSON otherwise')
+    arg_parser.add_argument('-workers', dest='workers', type=int,
+                            help='Number of worker processes when the input is a glob or a directory')
+    arg_parser.add_argument('-dryrun', dest='dry_run', action='store_true',
+                            help='Validate arguments, config and paths without running any step')
+    arg_parser.add_argument('-cache', dest='cache', action='store_true',
+                            help='Reuse stage results of unchanged inputs, mapping and config from the stage cache')
+    arg_parser.add_argument('-rejects', dest='reject_path',
+                            help='Reject file path of records failing validation, next to the output by default')
+
+    # Without a process there is no config to read; let the parser report usage or help.
+    if '-process' not in argv[:-1]:
+        arg_parser.parse_args(argv)
 
     # Extract and interpret rest of the arguments, using static config file, based on given specific feature.
     process_arg = argv[argv.index('-process') + 1]
     process_args = process_arg.rsplit('_', 1)
     process_name = process_args[0]
     feature_type = process_args[1]
-    current_path = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
-    with open(os.path.join(current_path, f'..\\config\\{process_name}.json')) as file_config:
-        mapping_config = json.load(file_config, object_hook=lambda d: Namespace(**d))
-        if feature_type == 'extraction':
-            feature_config = vars(mapping_config.extraction)
-        elif feature_type == 'transformation':
-            feature_config = vars(mapping_config.transformation)
-
-        feature_args = vars(mapping_config.feature_args)
-        # Add necessary arguments to <arg_parser> instance, using static JSON-based configuration.
-        if feature_args:
-            for key, value in feature_args.items():
-                if isinstance(value, Namespace):
-                    value = vars(value)
-                arg_parser.add_argument(key, dest=value['dest'],
-                                        help=value['help'],
-                                        required=value['required'])
+    mapping_config = _load_config(process_name)
+    if feature_type in FEATURE_TYPES:
+        feature_config = mapping_config[feature_type]
+    elif feature_type in PIPELINE_FEATURE_TYPES:
+        feature_config = {'extraction': mapping_config['extraction'],
+                          'transformation': mapping_config['transformation']}
+    else:
+        feature_config = None
+
+    # Add necessary arguments to <arg_parser> instance, using static JSON-based configuration.
+    for key, value in mapping_config['feature_args'].items():
+        arg_parser.add_argument(key, dest=value['dest'],
+                                help=value['help'],
+                                required=value['required'])
     return arg_parser.parse_args(argv), process_name, feature_type, feature_config
 
 
+def get_config_path(process_name):
+    """
+    Find static JSON config file of given process.
+    :param process_name: Process name, i.e. config file title.
+    :return: Config file path.
+    """
+    current_path = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
+    return os.path.join(current_path, '..', 'config', f'{process_name}.json')
+
+
+def _load_config(process_name):
+    """
+    Load static JSON config file of given process, compiled into a plan of plain dicts.
+    The plan is pickled into '__pycache__' next to the config file, and kept for the life
+    of the process, keyed on file path and modification time. Every caller gets its own
+    copy, since workflow steps update config sections in place.
+    :param process_name: Process name, i.e. config file title.
+    :return: Compiled config of dict type.
+    """
+    config_path = get_config_path(process_name)
+    config_dir = os.path.dirname(config_path)
+    config_stat = os.stat(config_path)
+    config_key = (config_path, config_stat.st_mtime_ns)
+
+    if config_key not in _LOADED_CONFIGS:
+        plan_path = os.path.join(config_dir, PLAN_CACHE_DIR,
+                                 f'{process_name}.{config_stat.st_mtime_ns}.{config_stat.st_size}.plan')
+        try:
+            with open(plan_path, 'rb') as file_plan:
+                _LOADED_CONFIGS[config_key] = pickle.load(file_plan)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            _LOADED_CONFIGS[config_key] = _compile_config(config_path, plan_path)
+    return copy.deepcopy(_LOADED_CONFIGS[config_key])
+
+
+def _compile_config(config_path, plan_path):
+    """
+    Parse JSON config file and store it as a plan, replacing plans of older versions.
+    :param config_path: Config file path.
+    :param plan_path: Plan file path.
+    :return: Compiled config of dict type.
+    """
+    with open(config_path) as file_config:
+        mapping_config = json.load(file_config)
+    # JSON has no boolean type for argparse 'required' flags; settle them once here.
+    for value in mapping_config['feature_args'].values():
+        value['required'] = str(value['required']).lower() == 'true'
+
+    try:
+        plan_dir = os.path.dirname(plan_path)
+        os.makedirs(plan_dir, exist_ok=True)
+        plan_prefix = os.path.basename(plan_path).split('.')[0] + '.'
+        for old_plan in os.listdir(plan_dir):
+            if old_plan.startswith(plan_prefix) and old_plan.endswith('.plan'):
+                os.remove(os.path.join(plan_dir, old_plan))
+        with atomic_path(plan_path) as temp_path:
+            with open(temp_path, 'wb') as file_plan:
+                pickle.dump(mapping_config, file_plan, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError as os_error:
+        # A read-only install still works, only without the plan cache.
+        logging.warning(f'Config plan could not be stored to <{plan_path}>: {os_error}')
+    return mapping_config
+
+
+def _dry_run(args, process_name, feature_type):
+    """
+    Validate that the given process can run, without loading data or heavy libraries.
+    :param args: Parsed arguments of dict type.
+    :param process_name: Process name, i.e. config file title.
+    :param feature_type: Feature type, i.e. process suffix.
+    :return: None; raise FileNotFoundError for a missing input or mapping.
+    """
+    if feature_type not in FEATURE_TYPES + PIPELINE_FEATURE_TYPES:
+        logging.warning(f'Incorrect feature type: [{feature_type}]')
+    for arg_name in ('input_path', 'mapping_path'):
+        path = args.get(arg_name)
+        if path and not (os.path.exists(path) or glob.glob(path)):
+            raise FileNotFoundError(f'Provided path is invalid: <{path}>')
+    output_path = args.get('output_path')
+    if output_path and not os.path.isdir(os.path.dirname(os.path.abspath(output_path))):
+        raise FileNotFoundError(f'Provided output directory is invalid: <{output_path}>')
+    logging.info(f'Dry run of <{process_name}_{feature_type}> is valid')
+
+
 @log_trace
-def run_extraction(args, config):
+def run_extraction(args, config, collect=False):
     """ Create dataframe object populated with the data from source file
 
     params args
-        List of user passed arguments from terminal
+        List of user passed arguments from terminal,
+        nothing is written when no output path is given
     params config
         Extraction settings configuration from json
+    params collect
+        Whether to combine and return the chunks when streaming in chunks
     returns: Pandas dataframe
-        Extracted dataframe
+        Extracted dataframe, or None when streaming in chunks without collect
     """
 
+    # Input given as a glob or a directory is extracted file by file in parallel.
+    input_paths = filu.FileDataStorage.resolve_paths(miscu.eval_elem_mapping(args, 'input_path'))
+    if len(input_paths) > 1:
+        return _run_parallel_extraction(args, config, input_paths, collect)
+
     # --------------------------------
     # Input section
     # --------------------------------
@@ -116,13 +262,13 @@ def run_extraction(args, config):
                                                   "read",
                                                   input_update_with)
 
-    # Run read ETL feature.
-    df_target = etlu.read_feature(input_read_config)
+    # Streaming mode is elected by '-chunksize' argument or by <chunk_size> of <read> config section.
+    chunk_size = miscu.eval_elem_mapping(args, 'chunk_size')
+    if chunk_size:
+        input_read_config['chunk_size'] = chunk_size
+    chunk_size = miscu.eval_elem_mapping(input_read_config, 'chunk_size')
 
-    # Engage plugin from <input> config section, if available.
     input_plugin = miscu.eval_elem_mapping(input_config, "plugin")
-    if input_plugin:
-        df_target = input_plugin(df_target)
 
     # --------------------------------
     # Mapping section
@@ -138,19 +284,308 @@ def run_extraction(args, config):
                                                     'read',
                                                     mapping_update_with)
 
-    # Run mapping ETL feature.
-    df_target = etlu.mapping_feature(df_target, mapping_config)
-
     # --------------------------------
-    # Column Modifications
+    # Output section
     # --------------------------------
 
-    etlu.df_col_mods_feature(df_target, config)
+    output_write_config = _get_output_write_config(args, config)
+    write_output = bool(miscu.eval_elem_mapping(output_write_config, 'path'))
+
+    # Records failing validation or missing from the mapping are quarantined in reject files of their own,
+    # since validation rejects are rows as read, while unmapped ones are typed and mapped.
+    rejects = []
+    unmapped_rejects = []
+    quarantine = filu.FileDataStorage.is_validated(input_read_config) \
+        or miscu.eval_elem_mapping(mapping_config, 'reject_unmapped')
+
+    # Overlapped I/O runs reading, mapping and writing side by side, see <io> config section.
+    overlap, queue_size = _get_overlap(config)
+    # The compiled mapping index is kept in the stage cache along with the stage results, if elected.
+    mapping_cache = _get_stage_cache(args, config)
+
+    if chunk_size:
+        # Compile mapping once, then read, map, modify and append every chunk in turn,
+        # so only one chunk of the input is held in memory at a time.
+        # With overlapped I/O the next chunks are parsed, starting with the first one while the mapping
+        # compiles, and mapped in their own threads, while the current chunk is written.
+        chunks = etlu.read_chunks_feature(input_read_config, rejects)
+        if overlap:
+            chunks = iou.prefetch(chunks, queue_size, name='read-ahead')
+        mapping_index = etlu.compile_mapping_feature(mapping_config, mapping_cache)
+        chunks = _extract_chunks(chunks, input_plugin, mapping_config, mapping_index, config, unmapped_rejects)
+        if overlap:
+            chunks = iou.prefetch(chunks, queue_size, name='extract-ahead')
+        collected_chunks = []
+        if collect:
+            chunks = _collect_chunks(chunks, collected_chunks)
+        if write_output:
+            etlu.write_chunks_feature(output_write_config, chunks)
+        else:
+            collected_chunks = list(chunks)
+        _write_rejects(args, output_write_config, rejects)
+        _write_rejects(args, output_write_config, unmapped_rejects, UNMAPPED_REJECTS)
+        return etlu.combine_chunks_feature(collected_chunks) if collect else None
+
+    # Stage results of byte-identical input and mapping files under the same config are taken from the cache,
+    # unless records are quarantined, since every run writes its own reject file.
+    stage_cache = mapping_cache if not quarantine else None
+    read_key = extract_key = None
+    if stage_cache and os.path.isfile(miscu.eval_elem_mapping(args, 'mapping_path')):
+        read_key = cacheu.make_key('read', cacheu.file_digest(miscu.eval_elem_mapping(args, 'input_path')),
+                                   cacheu.config_fingerprint(input_read_config))
+        extract_key = cacheu.make_key('extract', read_key,
+                                      cacheu.file_digest(miscu.eval_elem_mapping(args, 'mapping_path')),
+                                      cacheu.config_fingerprint(config))
+
+    df_target = _load_stage(stage_cache, extract_key)
+    if df_target is None:
+        # With overlapped I/O a single key mapping compiles in the background, while the input is read.
+        mapping_future = None
+        if overlap and len(miscu.eval_elem_mapping(mapping_config, 'right_on', default_value=[])) == 1:
+            mapping_future = iou.background(etlu.compile_mapping_feature, mapping_config, mapping_cache)
+
+        # Run read ETL feature.
+        df_target = _load_stage(stage_cache, read_key)
+        if df_target is None:
+            df_target = etlu.read_feature(input_read_config, rejects)
+            _store_stage(stage_cache, read_key, df_target)
+
+        # Engage plugin from <input> config section, if available.
+        if input_plugin:
+            df_target = input_plugin(df_target)
+
+        # Run mapping ETL feature.
+        mapping_index = mapping_future.result() if mapping_future else None
+        df_target = etlu.mapping_feature(df_target, mapping_config, mapping_index, unmapped_rejects)
+
+        # Column Modifications
+        etlu.df_col_mods_feature(df_target, config)
+        _store_stage(stage_cache, extract_key, df_target)
+
+    # Writing final dataframe to /data folder
+    if write_output:
+        etlu.write_feature(output_write_config, df_target)
+    _write_rejects(args, output_write_config, rejects)
+    _write_rejects(args, output_write_config, unmapped_rejects, UNMAPPED_REJECTS)
+
+    return df_target
+
+
+def _run_parallel_extraction(args, config, input_paths, collect=False):
+    """ Extract every given input file in its own worker process, then either
+        combine the results into one output or let every worker write its own
+        part into a directory named after the output (<split_output> of <input>
+        config section)
+
+    params args
+        List of user passed arguments from terminal
+    params config
+        Extraction settings configuration from json
+    params input_paths
+        List of input file paths
+    params collect
+        Whether to return the combined dataframe when writing separate parts
+    returns: Pandas dataframe
+        Combined extracted dataframe, or None when writing separate parts without collect
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    input_config = miscu.eval_elem_mapping(config, 'input')
+    split_output = miscu.eval_elem_mapping(input_config, 'split_output', default_value=False)
+    workers = miscu.eval_elem_mapping(args, 'workers',
+                                      default_value=miscu.eval_elem_mapping(input_config, 'workers',
+                                                                            default_value=os.cpu_count()))
+    output_path = miscu.eval_elem_mapping(args, 'output_path')
+    output_write_config = _get_output_write_config(args, config)
+
+    logging.info(f'Extracting <{len(input_paths)}> input files using <{workers}> workers')
+    with ProcessPoolExecutor(max_workers=min(workers, len(input_paths))) as executor:
+        futures = []
+        for input_path in input_paths:
+            part_path = _get_part_path(output_path, input_path) if split_output and output_path else None
+            # Every worker quarantines into its own reject file, named after its input file
+            reject_path = _get_reject_path(args, output_write_config,
+                                           os.path.splitext(os.path.basename(input_path))[0])
+            worker_args = dict(args, input_path=input_path, output_path=part_path, reject_path=reject_path)
+            futures.append(executor.submit(run_extraction, worker_args, config,
+                                           collect=collect or not split_output))
+        list_of_extracted_df = [future.result() for future in futures]
+
+    if split_output and not collect:
+        return None
+
+    df_target = etlu.combine_chunks_feature(list_of_extracted_df)
+    if output_path and not split_output:
+        etlu.write_feature(output_write_config, df_target)
+
+    return df_target
+
+
+def _get_part_path(output_path, input_path):
+    """ Build the output path of one input file's part, within a directory
+        named after the output path
+
+    params output_path
+        Output path passed from terminal
+    params input_path
+        Input file path of the part
+    returns: str
+        Output path of the part
+    """
+    parts_dir, extension = os.path.splitext(output_path)
+    os.makedirs(parts_dir, exist_ok=True)
+    part_title = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(parts_dir, part_title + extension)
+
+
+def _get_overlap(config):
+    """ Read overlapped I/O settings, <overlap> and <queue_size> of <io> config section
+
+    params config
+        Extraction or transformation settings configuration from json
+    returns: tuple of (bool, int)
+        Whether I/O is overlapped, and by how many chunks a stage may run ahead
+    """
+    io_config = miscu.eval_elem_mapping(config, 'io')
+    return (bool(miscu.eval_elem_mapping(io_config, 'overlap')),
+            miscu.eval_elem_mapping(io_config, 'queue_size', default_value=iou.DEFAULT_QUEUE_SIZE))
+
+
+def _get_reject_path(args, output_write_config, suffix=None):
+    """ Find the reject file path, either '-rejects' argument, <reject_path>
+        of <output> config section or 'rejects/<output title>.csv' next to the output
+
+    params args
+        List of user passed arguments from terminal
+    params output_write_config
+        <output> config section, including injected path
+    params suffix
+        Title of one input file's part, pipeline stage or kind of rejects, added to the reject file title
+    returns: str
+        Reject file path, or None without an output path to derive it from
+    """
+    reject_path = miscu.eval_elem_mapping(args, 'reject_path',
+                                          default_value=miscu.eval_elem_mapping(output_write_config, 'reject_path'))
+    output_path = miscu.eval_elem_mapping(output_write_config, 'path')
+    if not reject_path and output_path:
+        output_title = filu.FileDataStorage.get_title_without_suffix(os.path.basename(output_path))
+        reject_path = os.path.join(os.path.dirname(os.path.abspath(output_path)), REJECT_DIR, output_title + '.csv')
+    if reject_path and suffix:
+        reject_title, extension = os.path.splitext(reject_path)
+        reject_path = f'{reject_title}_{suffix}{extension}'
+    return reject_path
+
+
+def _write_rejects(args, output_write_config, rejects, suffix=None):
+    """ Write quarantined records, with their reason codes, to the reject file
+
+    params args
+        List of user passed arguments from terminal
+    params output_write_config
+        <output> config section, including injected path and mode
+    params rejects
+        List of rejected record dataframes, all of one kind
+    params suffix
+        Kind of rejects added to the reject file title, e.g. UNMAPPED_REJECTS
+    """
+    if not rejects:
+        return
+    df_rejects = etlu.combine_chunks_feature(rejects)
+    reject_path = _get_reject_path(args, output_write_config, suffix)
+    if not reject_path:
+        logging.warning(f'<{len(df_rejects.index)}> rejected records are dropped, without a reject file path')
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(reject_path)), exist_ok=True)
+    etlu.write_feature({'path': reject_path,
+                        'description': miscu.eval_elem_mapping(output_write_config, 'description'),
+                        'mode': miscu.eval_elem_mapping(output_write_config, 'mode'),
+                        'file_type': 'csv'}, df_rejects)
+
+
+def _get_stage_cache(args, config):
+    """ Find the stage result cache elected by '-cache' argument or by <enabled>
+        of <cache> config section, kept in <dir> of <cache> config section or
+        in '.etl_cache' next to the input, and bounded by <max_size_mb>
+
+    params args
+        List of user passed arguments from terminal
+    params config
+        Feature settings configuration from json
+    returns: dict
+        Cache 'dir' and 'max_bytes', or None when caching is not elected
+    """
+    cache_config = miscu.eval_elem_mapping(config, 'cache')
+    if not (miscu.eval_elem_mapping(args, 'cache') or miscu.eval_elem_mapping(cache_config, 'enabled')):
+        return None
+    input_path = miscu.eval_elem_mapping(args, 'input_path')
+    if not os.path.isfile(input_path):
+        # Only a single input file has a content hash to key stage results on
+        return None
+    default_dir = os.path.join(os.path.dirname(os.path.abspath(input_path)), cacheu.CACHE_DIR_NAME)
+    max_size_mb = miscu.eval_elem_mapping(cache_config, 'max_size_mb', default_value=cacheu.DEFAULT_MAX_SIZE_MB)
+    return {'dir': miscu.eval_elem_mapping(cache_config, 'dir', default_value=default_dir),
+            'max_bytes': int(max_size_mb * 2 ** 20)}
+
+
+def _load_stage(stage_cache, key):
+    """ Look up a stage result in the stage cache, if any
+
+    params stage_cache
+        Stage cache from _get_stage_cache, or None
+    params key
+        Cache key of the stage result
+    returns: various
+        Cached stage result, or None on a miss or without a stage cache
+    """
+    if not stage_cache:
+        return None
+    # Stage results can be large, so they are not held in process memory
+    return cacheu.load_cached(stage_cache['dir'], key, keep_in_memory=False)
+
+
+def _store_stage(stage_cache, key, result):
+    """ Store a stage result in the stage cache, if any, then evict least
+        recently used results past the cache size bound
+
+    params stage_cache
+        Stage cache from _get_stage_cache, or None
+    params key
+        Cache key of the stage result
+    params result
+        Stage result to store
+    """
+    if not stage_cache:
+        return
+    cacheu.store_cached(stage_cache['dir'], key, result, keep_in_memory=False)
+    cacheu.evict_cached(stage_cache['dir'], stage_cache['max_bytes'])
 
-    # --------------------------------
-    # Output section
-    # --------------------------------
 
+def _get_state_path(output_write_config):
+    """ Find the aggregate state file of an output, either <state_path> of
+        <output> config section or '<output title>.state.pkl' next to the output
+
+    params output_write_config
+        <output> config section, including injected path
+    returns: str
+        Aggregate state file path
+    """
+    output_path = miscu.eval_elem_mapping(output_write_config, 'path')
+    default_state_path = os.path.join(os.path.dirname(os.path.abspath(output_path)),
+                                      filu.FileDataStorage.get_title_without_suffix(os.path.basename(output_path))
+                                      + '.state.pkl')
+    return miscu.eval_elem_mapping(output_write_config, 'state_path', default_value=default_state_path)
+
+
+def _get_output_write_config(args, config):
+    """ Inject output path, description and mode into <output> config section
+
+    params args
+        List of user passed arguments from terminal
+    params config
+        Extraction or transformation settings configuration from json
+    returns: dict
+        Updated <output> config section
+    """
     # Extracting intended destination and description of write file
     output_update_with = {'path': miscu.eval_elem_mapping(args,
                                                           'output_path'),
@@ -160,26 +595,63 @@ def run_extraction(args, config):
 
     # Update json configuration file with the
     # intended destination and description passed
-    output_write_config = miscu.eval_update_mapping(config,
-                                                    'output',
-                                                    output_update_with)
-
-    # Writing final dataframe to /data folder
-    etlu.write_feature(output_write_config, df_target)
-
-    return df_target
+    return miscu.eval_update_mapping(config,
+                                     'output',
+                                     output_update_with)
+
+
+def _extract_chunks(chunks, input_plugin, mapping_config, mapping_index, config, rejects=None):
+    """ Lazily run plugin, mapping and column modifications on every given chunk
+
+    params chunks
+        Iterable of input dataframe chunks
+    params input_plugin
+        Plugin from <input> config section, or None
+    params mapping_config
+        Mapping settings configuration from json
+    params mapping_index
+        Mapping lookup index, compiled once for all chunks
+    params config
+        Extraction settings configuration from json
+    params rejects
+        List records missing from the mapping are appended to, if rejected
+    returns: generator of Pandas dataframes
+        Extracted dataframe chunks
+    """
+    for df_chunk in chunks:
+        if input_plugin:
+            df_chunk = input_plugin(df_chunk)
+        df_chunk = etlu.mapping_feature(df_chunk, mapping_config, mapping_index, rejects)
+        yield etlu.df_col_mods_feature(df_chunk, config)
+
+
+def _collect_chunks(chunks, collected_chunks):
+    """ Pass given chunks through, keeping a reference to each of them
+
+    params chunks
+        Iterable of dataframe chunks
+    params collected_chunks
+        List the chunks are appended to
+    returns: generator of Pandas dataframes
+        The given chunks
+    """
+    for df_chunk in chunks:
+        collected_chunks.append(df_chunk)
+        yield df_chunk
 
 
 @log_trace
-def run_transformation(args, config):
+def run_transformation(args, config, df=None):
     """ Transform data based on passed arguments and configurations
 
     params args
         List of user passed arguments from terminal
     params config
         Extraction settings configuration from json
+    params df
+        Already extracted dataframe to transform instead of reading the input file
     returns: Pandas dataframe
-        Extracted dataframe
+        Extracted dataframe, or None when not read into pandas (stage cache hit or engine scan)
     """
 
     # --------------------------------
@@ -196,45 +668,177 @@ def run_transformation(args, config):
                                                   "read",
                                                   input_update_with)
 
-    # Run read ETL feature.
-    df_target = etlu.read_feature(input_read_config)
+    # Streaming mode is elected by '-chunksize' argument or by <chunk_size> of <read> config section.
+    chunk_size = miscu.eval_elem_mapping(args, 'chunk_size')
+    if chunk_size:
+        input_read_config['chunk_size'] = chunk_size
+    chunk_size = miscu.eval_elem_mapping(input_read_config, 'chunk_size')
 
-    # Engage plugin from <input> config section, if available.
+    # Read only the columns transformation uses: the sheet categories and the transformed columns.
+    output_config = miscu.eval_elem_mapping(config, 'output')
+    col_transforms = miscu.eval_elem_mapping(output_config, 'col_transforms')
     input_plugin = miscu.eval_elem_mapping(input_config, "plugin")
-    if input_plugin:
-        df_target = input_plugin(df_target)
+    etlu.projection_feature(input_read_config,
+                            miscu.eval_elem_mapping(output_config, 'sheet_naming', default_value=[])
+                            + miscu.eval_elem_mapping(col_transforms, 'from', default_value=[]),
+                            input_plugin)
 
     # --------------------------------
     # Transformation section
     # --------------------------------
 
-    # Transforming data according to transformations configurations json file
-    list_of_transformed_df = etlu.transform_feature(df_target, config)
+    output_write_config = _get_output_write_config(args, config)
+
+    # Incremental mode merges aggregates of the input into the state persisted next to the output.
+    state_path = None
+    input_key = None
+    if miscu.eval_elem_mapping(args, 'incremental') \
+            or miscu.eval_elem_mapping(output_write_config, 'incremental'):
+        state_path = _get_state_path(output_write_config)
+        input_path = miscu.eval_elem_mapping(args, 'input_path')
+        input_key = cacheu.file_digest(input_path) if os.path.isfile(input_path) else None
+
+    # Records failing validation are quarantined in a reject file.
+    rejects = []
+    validated = filu.FileDataStorage.is_validated(input_read_config)
+
+    # Transformations of a byte-identical input file under the same config are taken from the cache,
+    # unless they depend on an incremental state or on an in-memory hand-off, or quarantine records.
+    stage_cache = _get_stage_cache(args, config) if df is None and not state_path and not validated else None
+    transform_key = None
+    if stage_cache:
+        transform_key = cacheu.make_key('transform',
+                                        cacheu.file_digest(miscu.eval_elem_mapping(args, 'input_path')),
+                                        cacheu.config_fingerprint(config))
+
+    df_target = None
+    list_of_transformed_df = _load_stage(stage_cache, transform_key)
+    if list_of_transformed_df is None:
+        # A non pandas aggregate engine scans a columnar input file itself, unless a plugin or filter needs the rows.
+        agg_engine = miscu.eval_elem_mapping(miscu.eval_elem_mapping(config, 'aggregate'), 'engine',
+                                             default_value='pandas')
+        scan_input = df is None and not input_plugin and agg_engine != 'pandas' and not chunk_size \
+            and not miscu.eval_elem_mapping(input_read_config, 'filter') and not validated \
+            and miscu.eval_elem_mapping(input_read_config, 'file_type') in engineu.SCAN_FILE_TYPES
+        stream_input = df is None and chunk_size
+
+        # Run read ETL feature, or take over the in-memory hand-off.
+        if scan_input:
+            df_target = None
+        elif stream_input:
+            # Chunks go through the plugin one at a time, only the running aggregates are held.
+            df_target = None
+            chunks = etlu.read_chunks_feature(input_read_config, rejects)
+            overlap, queue_size = _get_overlap(config)
+            if overlap:
+                # The next chunks are parsed in their own thread, while the current chunk is aggregated.
+                chunks = iou.prefetch(chunks, queue_size, name='read-ahead')
+            if input_plugin:
+                chunks = map(input_plugin, chunks)
+        elif df is None:
+            df_target = etlu.read_feature(input_read_config, rejects)
+        else:
+            df_target = etlu.prepare_feature(df, input_read_config, rejects)
+
+        # Engage plugin from <input> config section, if available.
+        if input_plugin and not stream_input:
+            df_target = input_plugin(df_target)
+
+        # Transforming data according to transformations configurations json file
+        if scan_input:
+            list_of_transformed_df = etlu.transform_scan_feature(input_read_config, config, state_path, input_key)
+        elif stream_input:
+            list_of_transformed_df = etlu.transform_chunks_feature(chunks, config, state_path, input_key)
+        else:
+            list_of_transformed_df = etlu.transform_feature(df_target, config, state_path, input_key)
+        _store_stage(stage_cache, transform_key, list_of_transformed_df)
 
     # --------------------------------
     # Output section
     # --------------------------------
 
-    # Extracting intended destination and description of write file
-    output_update_with = {'path': miscu.eval_elem_mapping(args,
-                                                          'output_path'),
-                          'description': config['description'],
-                          'mode': miscu.eval_elem_mapping(args,
-                                                          'mode')}
-
-    # Update json configuration file with the
-    # intended destination and description passed
-    output_write_config = miscu.eval_update_mapping(config,
-                                                    'output',
-                                                    output_update_with)
-
     # Writing final dataframe to /data folder
     # This will write all dataframes to a labeled sheet in one excel file
     etlu.write_feature(output_write_config, list_of_transformed_df)
+    _write_rejects(args, output_write_config, rejects)
 
     return df_target
 
 
+@log_trace
+def run_pipeline(args, config):
+    """ Run extraction and transformation in one process, handing the
+        extracted dataframe over to transformation in memory
+
+    params args
+        List of user passed arguments from terminal,
+        extraction output is only written if '-intermediate' is given
+    params config
+        Mapping of extraction and transformation settings configuration from json
+    returns: Pandas dataframe
+        Extracted dataframe
+    """
+    # Extraction quarantines next to the final output, since its own output is optional,
+    # into reject files of its own, apart from those of transformation
+    extraction_args = dict(args, output_path=miscu.eval_elem_mapping(args, 'intermediate_path'),
+                           reject_path=_get_reject_path(args, _get_output_write_config(args,
+                                                                                       config['transformation']),
+                                                        'extraction'))
+    df_extracted = run_extraction(extraction_args, config['extraction'], collect=True)
+
+    return run_transformation(args, config['transformation'], df=df_extracted)
+
+
+@log_trace
+def run_rollup(args, config):
+    """ Build a rollup cube of the input, from which etlquery answers
+        roll-ups and slices without reading row level data again
+
+    params args
+        List of user passed arguments from terminal
+    params config
+        Rollup settings configuration from json
+    returns: Pandas dataframe
+        Rollup cube
+    """
+
+    # Prepare additional input parameters and update appropriate configuration section.
+    # Inject 'path' and 'description' into <input> config section.
+    input_update_with = {'path': miscu.eval_elem_mapping(args,
+                                                         'input_path'),
+                         'description': config['description']}
+    input_config = miscu.eval_elem_mapping(config, 'input')
+    input_read_config = miscu.eval_update_mapping(input_config,
+                                                  "read",
+                                                  input_update_with)
+
+    # Read only the columns the cube uses: its dimensions, date and transformed columns.
+    input_plugin = miscu.eval_elem_mapping(input_config, "plugin")
+    rollup_config = miscu.eval_elem_mapping(config, 'rollup')
+    col_transforms = miscu.eval_elem_mapping(miscu.eval_elem_mapping(config, 'output'), 'col_transforms')
+    etlu.projection_feature(input_read_config,
+                            miscu.eval_elem_mapping(rollup_config, 'dimensions', default_value=[])
+                            + [miscu.eval_elem_mapping(rollup_config, 'date_column', default_value='Date')]
+                            + miscu.eval_elem_mapping(col_transforms, 'from', default_value=[]),
+                            input_plugin)
+
+    # Run read ETL feature.
+    df_target = etlu.read_feature(input_read_config)
+
+    # Engage plugin from <input> config section, if available.
+    if input_plugin:
+        df_target = input_plugin(df_target)
+
+    # Pre-aggregating data according to rollup configurations json file
+    df_cube = etlu.rollup_feature(df_target, config)
+
+    # Writing the cube, in a columnar file type that keeps its description
+    output_write_config = _get_output_write_config(args, config)
+    etlu.write_feature(output_write_config, df_cube)
+
+    return df_cube
+
+
 if __name__ == '__main__':
     # Call main process.
     sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,364 @@
+import os
+import sys
+sys.path.append(os.getcwd())
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+import etldata
+import etlworker
+import utils.cache_util as cacheu
+import utils.etl_util  # noqa: F401 - warm up pandas and ETL features once, before forking workers
+import argparse
+import fnmatch
+import glob
+import json
+import logging
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from utils.version_util import atomic_path
+
+RETURN_SUCCESS = 0
+RETURN_FAILURE = 1
+APP = 'EtlData graph'
+# etldata arguments naming the files a job reads and the files it writes
+INPUT_ARGS = ('-input', '-mapping')
+OUTPUT_ARGS = ('-output', '-intermediate')
+# Outputs are matched by path, so jobs always write to the paths they declare
+WRITE_MODE = 'overwrite'
+LOGS_DIR = 'logs'
+
+
+def main(argv):
+    """
+    Run a manifest of etldata jobs as a dependency graph, over a bounded pool
+    of worker processes. A job depends on every job writing one of its inputs,
+    i.e. an '-output' or '-intermediate' path matching its '-input' or
+    '-mapping' path, a file of its input directory or of its input glob, or on
+    jobs named in its 'after' list. Independent jobs run concurrently, failed
+    jobs are retried, and jobs whose arguments, config and input contents did
+    not change since their last successful run, and none of whose dependencies
+    ran again, are skipped. Jobs write in overwrite mode.
+    A manifest is a JSON file:
+        {"jobs": [{"name": "europe_extraction", "args": ["-input", ..., "-process", "config_extraction", ...]},
+                  {"name": "europe_transformation", "args": [...], "after": []}]}
+    :param argv: Given argument parameters.
+    :return: Return code.
+    """
+    args = _interpret_args(argv)
+    logging.basicConfig(filename=args.log_path, filemode='a',
+                        format='%(asctime)s - %(message)s',
+                        level=logging.INFO)
+    logging.info(f'Entering {APP}, running <{args.manifest_path}> with <{args.workers}> workers')
+
+    try:
+        jobs = load_manifest(args.manifest_path)
+        dependencies = infer_dependencies(jobs)
+    except (FileNotFoundError, KeyError, ValueError) as error:
+        logging.info(f'Leaving {APP} incomplete with errors')
+        return f'ERROR: {error.args[0]}'
+
+    manifest_title = os.path.splitext(os.path.abspath(args.manifest_path))[0]
+    state_path = args.state_path or f'{manifest_title}.state.json'
+    logs_dir = args.logs_dir or os.path.join(os.path.dirname(manifest_title), LOGS_DIR)
+    os.makedirs(logs_dir, exist_ok=True)
+
+    results = run_graph(jobs, dependencies, args.workers, args.retries, logs_dir,
+                        state_path, force=args.force)
+
+    failed = [name for name, result in results.items() if result['status'] not in ('done', 'skipped')]
+    logging.info(f'Leaving {APP}, <{len(results) - len(failed)}> jobs done or skipped, '
+                 f'<{len(failed)}> failed or blocked')
+    return RETURN_FAILURE if failed else RETURN_SUCCESS
+
+
+def _interpret_args(argv):
+    """
+    Read and parse given command line arguments.
+    :param argv: Given argument parameters.
+    :return: Parsed arguments.
+    """
+    arg_parser = argparse.ArgumentParser(APP)
+    arg_parser.add_argument('-manifest', dest='manifest_path', help='Job manifest file', required=True)
+    arg_parser.add_argument('-workers', dest='workers', type=int, default=os.cpu_count(),
+                            help='Maximum number of concurrently running jobs')
+    arg_parser.add_argument('-retries', dest='retries', type=int, default=1,
+                            help='Number of times a failed job is run again')
+    arg_parser.add_argument('-state', dest='state_path',
+                            help='State file of the last successful runs, <manifest title>.state.json by default')
+    arg_parser.add_argument('-force', dest='force', action='store_true',
+                            help='Run every job, even if its arguments, config and inputs are unchanged')
+    arg_parser.add_argument('-logs', dest='logs_dir',
+                            help='Directory of job log files, logs next to the manifest by default')
+    arg_parser.add_argument('-log', dest='log_path', help='Fully qualified graph logging file')
+    return arg_parser.parse_args(argv)
+
+
+def load_manifest(manifest_path):
+    """
+    Read a job manifest, naming unnamed jobs after their position. Every job is set to overwrite its
+    outputs, since a versioned output in 'new' mode would not be found by the jobs reading it.
+    :param manifest_path: Job manifest file.
+    :return: dict; Job name to job mapping, in manifest order.
+    """
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+
+    jobs = {}
+    for index, job in enumerate(manifest['jobs']):
+        name = job.get('name') or f'job_{index}'
+        if name in jobs:
+            raise ValueError(f'Job name <{name}> is used twice in <{manifest_path}>')
+        if '-process' not in job['args']:
+            raise KeyError(f'Job <{name}> has no -process argument')
+        jobs[name] = {'args': _set_write_mode(name, [str(arg) for arg in job['args']]),
+                      'after': list(job.get('after', []))}
+    return jobs
+
+
+def _set_write_mode(name, job_args):
+    """
+    Replace the write mode of an etldata command line with WRITE_MODE.
+    :param name: Job name, for the log.
+    :param job_args: list of str; etldata command line arguments.
+    :return: list of str; Arguments writing in WRITE_MODE.
+    """
+    if '-mode' in job_args[:-1]:
+        index = job_args.index('-mode')
+        if job_args[index + 1] != WRITE_MODE:
+            logging.warning(f'Job <{name}> writes in <{WRITE_MODE}> mode rather than <{job_args[index + 1]}>')
+        job_args = job_args[:index] + job_args[index + 2:]
+    return job_args + ['-mode', WRITE_MODE]
+
+
+def infer_dependencies(jobs):
+    """
+    Find the jobs every job has to wait for: the jobs writing one of its inputs, and its 'after' jobs.
+    :param jobs: dict; Job name to job mapping.
+    :return: dict; Job name to set of job names it depends on.
+    """
+    writers = {}
+    for name, job in jobs.items():
+        for output_path in _get_arg_paths(job['args'], OUTPUT_ARGS):
+            writers.setdefault(output_path, set()).add(name)
+
+    dependencies = {}
+    for name, job in jobs.items():
+        depends_on = set()
+        for unknown in set(job['after']) - set(jobs):
+            raise KeyError(f'Job <{name}> runs after unknown job <{unknown}>')
+        depends_on.update(job['after'])
+        for input_path in _get_arg_paths(job['args'], INPUT_ARGS):
+            for output_path, writer_names in writers.items():
+                if _reads_output(input_path, output_path):
+                    depends_on.update(writer_names)
+        depends_on.discard(name)
+        dependencies[name] = depends_on
+
+    _check_acyclic(dependencies)
+    return dependencies
+
+
+def run_graph(jobs, dependencies, workers, retries, logs_dir, state_path, force=False):
+    """
+    Run jobs once all the jobs they depend on are done or skipped, up to workers at a time.
+    A failed job is run again up to retries times; jobs depending on a job that failed for good are not run.
+    A job whose worker process died fails along with the other jobs running in the pool, which is replaced
+    by a fresh one for the jobs still to run.
+    An unchanged job is only skipped when the jobs it depends on were skipped too.
+    :param jobs: dict; Job name to job mapping.
+    :param dependencies: dict; Job name to set of job names it depends on.
+    :param workers: int; Maximum number of concurrently running jobs.
+    :param retries: int; Number of times a failed job is run again.
+    :param logs_dir: Directory for job log files.
+    :param state_path: State file of the last successful runs.
+    :param force: bool; Run every job, even if unchanged.
+    :return: dict; Job name to result, with 'status' of 'done', 'skipped', 'failed' or 'blocked'.
+    """
+    state = _load_state(state_path)
+    results = {}
+    attempts = {name: 0 for name in jobs}
+    waiting = list(jobs)
+    pending = {}
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        while waiting or pending:
+            # Settle jobs whose dependencies are settled, as long as a worker is free.
+            for name in list(waiting):
+                if len(pending) >= workers:
+                    break
+                statuses = [results[dependency]['status'] if dependency in results else None
+                            for dependency in dependencies[name]]
+                if None in statuses:
+                    continue
+                waiting.remove(name)
+                if any(status not in ('done', 'skipped') for status in statuses):
+                    results[name] = {'status': 'blocked', 'seconds': 0.0}
+                    logging.warning(f'Job <{name}> blocked by a failed dependency')
+                    continue
+
+                # Inputs are hashed only now, once the jobs writing them are finished
+                job_key = _get_job_key(jobs[name]['args'])
+                if not force and all(status == 'skipped' for status in statuses) \
+                        and _is_unchanged(state.get(name), job_key, jobs[name]['args']):
+                    results[name] = {'status': 'skipped', 'seconds': 0.0}
+                    logging.info(f'Job <{name}> skipped, its arguments, config and inputs are unchanged')
+                    continue
+                attempts[name] += 1
+                logging.info(f'Job <{name}> started, attempt <{attempts[name]}>')
+                try:
+                    future = executor.submit(etlworker.run_job_args, name, jobs[name]['args'], logs_dir)
+                except BrokenProcessPool:
+                    # A worker process died, failing its pool; carry on with a fresh one.
+                    logging.warning(f'{APP} worker pool is broken, starting a new one')
+                    executor.shutdown(wait=False)
+                    executor = ProcessPoolExecutor(max_workers=workers)
+                    future = executor.submit(etlworker.run_job_args, name, jobs[name]['args'], logs_dir)
+                pending[future] = (name, job_key)
+
+            if not pending:
+                continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, job_key = pending.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool as broken:
+                    # The worker was killed (out of memory, crash), so the job fails like any other failed run
+                    result = {'status': 'failed', 'return': repr(broken), 'traceback': traceback.format_exc(),
+                              'seconds': 0.0}
+                result['attempts'] = attempts[name]
+                logging.info(f'Job <{name}> {result["status"]} in <{result["seconds"]:.3f}> seconds')
+                if result['status'] == 'done':
+                    results[name] = result
+                    state[name] = {'key': job_key, 'finished': time.time()}
+                    _store_state(state_path, state)
+                elif attempts[name] <= retries:
+                    # Run again in turn, ahead of jobs not started yet
+                    waiting.insert(0, name)
+                else:
+                    results[name] = result
+                    state.pop(name, None)
+                    _store_state(state_path, state)
+    finally:
+        executor.shutdown()
+
+    return results
+
+
+def _get_arg_paths(job_args, arg_names):
+    """
+    Find the paths given to any of arg_names in an etldata command line.
+    :param job_args: list of str; etldata command line arguments.
+    :param arg_names: Argument names, such as '-input'.
+    :return: list of str; Absolute paths, or glob patterns.
+    """
+    return [os.path.abspath(job_args[index + 1]) for index, arg in enumerate(job_args[:-1])
+            if arg in arg_names]
+
+
+def _reads_output(input_path, output_path):
+    """
+    Check whether an input path designates a given output: the same path, a path within
+    an input directory, or a path matching an input glob.
+    :param input_path: Absolute input path or glob pattern.
+    :param output_path: Absolute output path.
+    :return: bool
+    """
+    if input_path == output_path:
+        return True
+    if glob.has_magic(input_path):
+        return fnmatch.fnmatch(output_path, input_path)
+    return output_path.startswith(input_path.rstrip(os.sep) + os.sep)
+
+
+def _check_acyclic(dependencies):
+    """
+    Raise ValueError if jobs depend on each other in a cycle.
+    :param dependencies: dict; Job name to set of job names it depends on.
+    :return: None
+    """
+    settled = set()
+    remaining = dict(dependencies)
+    while remaining:
+        ready = [name for name, depends_on in remaining.items() if depends_on <= settled]
+        if not ready:
+            raise ValueError(f'Jobs depend on each other in a cycle: {sorted(remaining)}')
+        for name in ready:
+            settled.add(name)
+            remaining.pop(name)
+
+
+def _get_job_key(job_args):
+    """
+    Build the key of a job run out of its arguments, its process config and the contents of its inputs.
+    :param job_args: list of str; etldata command line arguments.
+    :return: str; Job key.
+    """
+    process_name = job_args[job_args.index('-process') + 1].rsplit('_', 1)[0]
+    config_path = etldata.get_config_path(process_name)
+    return cacheu.make_key('job', job_args,
+                           cacheu.file_digest(config_path) if os.path.isfile(config_path) else None,
+                           [_get_path_digest(path) for path in _get_arg_paths(job_args, INPUT_ARGS)])
+
+
+def _get_path_digest(path):
+    """
+    Hash the contents of an input file, of every file within an input directory or matching an input glob.
+    :param path: Absolute input path or glob pattern.
+    :return: list; Relative file path and content hash pairs, empty if nothing exists yet.
+    """
+    if os.path.isfile(path):
+        return [['', cacheu.file_digest(path)]]
+    if os.path.isdir(path):
+        file_paths = [os.path.join(root, file) for root, dir_names, files in os.walk(path)
+                      for file in files if not file.startswith('.')]
+        base_path = path
+    else:
+        file_paths = [file for file in glob.glob(path) if os.path.isfile(file)]
+        base_path = os.path.dirname(path)
+    return [[os.path.relpath(file_path, base_path), cacheu.file_digest(file_path)]
+            for file_path in sorted(file_paths)]
+
+
+def _is_unchanged(job_state, job_key, job_args):
+    """
+    Check whether a job's last successful run had the same key and its outputs still exist.
+    :param job_state: dict; State of the job's last successful run, or None.
+    :param job_key: str; Key of the job run.
+    :param job_args: list of str; etldata command line arguments.
+    :return: bool
+    """
+    if not job_state or job_state.get('key') != job_key:
+        return False
+    return all(os.path.exists(path) for path in _get_arg_paths(job_args, OUTPUT_ARGS))
+
+
+def _load_state(state_path):
+    """
+    Read the state of the last successful job runs.
+    :param state_path: State file path.
+    :return: dict; Job name to state mapping, empty when there is no state file yet.
+    """
+    try:
+        with open(state_path) as state_file:
+            return json.load(state_file)
+    except FileNotFoundError:
+        return {}
+
+
+def _store_state(state_path, state):
+    """
+    Write the state of the last successful job runs, aside and renamed into place.
+    :param state_path: State file path.
+    :param state: dict; Job name to state mapping.
+    :return: None
+    """
+    with atomic_path(state_path) as temp_path:
+        with open(temp_path, 'w') as state_file:
+            json.dump(state, state_file, indent=4, sort_keys=True)
+
+
+if __name__ == '__main__':
+    # Call main process.
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,94 @@
+import os
+import sys
+sys.path.append(os.getcwd())
+import utils.etl_util as etlu
+import utils.file_util as filu
+import argparse
+import logging
+import time
+
+RETURN_SUCCESS = 0
+APP = 'EtlData query'
+CUBE_FILE_TYPES = {'.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'feather'}
+
+
+def main(argv):
+    """
+    Answer a roll-up or slice of a rollup cube built by the '<process>_rollup'
+    feature of etldata, e.g. Total and Percentage by Region and month:
+        -cube ./data/salesCube.parquet -by Region -grain month
+    The result is printed, or written to -output.
+    :param argv: Given argument parameters.
+    :return: Return code.
+    """
+    args = _interpret_args(argv)
+    logging.basicConfig(filename=args.log_path, filemode='a',
+                        format='%(asctime)s - %(message)s',
+                        level=logging.INFO)
+    logging.info(f'Entering {APP}')
+
+    try:
+        file_type = CUBE_FILE_TYPES.get(os.path.splitext(args.cube_path)[1].lower(), 'parquet')
+        df_cube = filu.FileDataStorage().read({'path': args.cube_path, 'file_type': file_type,
+                                               'description': APP})
+
+        start = time.perf_counter()
+        df_result = etlu.query_rollup_feature(df_cube, by=args.by, grain=args.grain,
+                                              where=_parse_where(args.where), start=args.start, end=args.end)
+        logging.info(f'Query of <{len(df_cube.index)}> cube cells answered in '
+                     f'<{1000 * (time.perf_counter() - start):.1f}> ms')
+    except (FileNotFoundError, KeyError, ValueError) as error:
+        logging.info(f'Leaving {APP} incomplete with errors')
+        return f'ERROR: {error.args[0]}'
+
+    if args.output_path:
+        output_type = os.path.splitext(args.output_path)[1].lstrip('.').lower()
+        etlu.write_feature({'path': args.output_path, 'description': APP, 'mode': 'overwrite',
+                            'file_type': 'excel' if output_type == 'xlsx' else output_type}, df_result)
+    else:
+        print(df_result.to_string(index=False))
+
+    logging.info(f'Leaving {APP}')
+    return RETURN_SUCCESS
+
+
+def _interpret_args(argv):
+    """
+    Read and parse given command line arguments.
+    :param argv: Given argument parameters.
+    :return: Parsed arguments.
+    """
+    arg_parser = argparse.ArgumentParser(APP)
+    arg_parser.add_argument('-cube', dest='cube_path', help='Rollup cube path', required=True)
+    arg_parser.add_argument('-by', dest='by', nargs='*', default=[],
+                            help='Dimensions to keep, every other dimension is rolled up')
+    arg_parser.add_argument('-grain', dest='grain',
+                            help='Period to roll the date up to: day, week, month, quarter or year')
+    arg_parser.add_argument('-where', dest='where', nargs='*', default=[],
+                            help='Slices such as Region=Europe Country=France,Germany')
+    arg_parser.add_argument('-start', dest='start', help='Date within the first period to keep, e.g. 2010-01-01')
+    arg_parser.add_argument('-end', dest='end', help='Date within the last period to keep')
+    arg_parser.add_argument('-output', dest='output_path',
+                            help='Optional result path, csv, xlsx or parquet; printed when omitted')
+    arg_parser.add_argument('-log', dest='log_path', help='Fully qualified logging file')
+    return arg_parser.parse_args(argv)
+
+
+def _parse_where(where):
+    """
+    Convert slices given as '<dimension>=<value>[,<value>...]' into a mapping.
+    :param where: List of slice arguments.
+    :return: Dimension to list of values mapping.
+    """
+    slices = {}
+    for condition in where:
+        dimension, separator, values = condition.partition('=')
+        if not separator:
+            raise ValueError(f'Slice <{condition}> is not of <dimension>=<value> form')
+        slices.setdefault(dimension, []).extend(values.split(','))
+    return slices
+
+
+if __name__ == '__main__':
+    # Call main process.
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,254 @@
+import os
+import sys
+sys.path.append(os.getcwd())
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+import etldata
+import utils.etl_util  # noqa: F401 - warm up pandas and ETL features once, before forking workers
+import utils.log_util as logu
+import argparse
+import json
+import logging
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+RETURN_SUCCESS = 0
+APP = 'EtlData worker'
+JOB_SUFFIX = '.json'
+RUNNING_DIR = 'running'
+DONE_DIR = 'done'
+FAILED_DIR = 'failed'
+LOGS_DIR = 'logs'
+# Seconds after which a job in 'running' that its worker stopped touching is taken as left by a stopped worker
+RUNNING_STALE_AFTER = 60
+
+
+def main(argv):
+    """
+    Watch an inbox directory for job files and run them through etldata in a
+    bounded pool of long-running worker processes, which load libraries and
+    configs once and keep them warm between jobs.
+    A job file '<name>.json' holds the etldata command line arguments:
+        {"args": ["-input", "./data/input_ecomm_sales.csv", "-process", "config_extraction", ...]}
+    It is moved to 'running', then to 'done' or 'failed' along with a '<name>.result.json'
+    file. Unless the job passes '-log', it is logged to 'logs/<name>.log'.
+    Several workers can share one inbox. Every worker touches the jobs it is running at each poll, so jobs
+    left in 'running' by a worker that was stopped are told apart and put back into the inbox.
+    :param argv: Given argument parameters.
+    :return: Return code.
+    """
+    args = _interpret_args(argv)
+    logging.basicConfig(filename=args.log_path, filemode='a',
+                        format='%(asctime)s - %(message)s',
+                        level=logging.INFO)
+    logging.info(f'Entering {APP}, watching <{args.inbox}> with <{args.workers}> workers')
+
+    for sub_dir in (RUNNING_DIR, DONE_DIR, FAILED_DIR, LOGS_DIR):
+        os.makedirs(os.path.join(args.inbox, sub_dir), exist_ok=True)
+
+    pending = {}
+    executor = ProcessPoolExecutor(max_workers=args.workers)
+    try:
+        while True:
+            _touch_jobs(pending.values())
+            _requeue_jobs(args.inbox)
+            # Claim new jobs as long as a worker is free.
+            for job_name in _list_jobs(args.inbox)[:max(args.workers - len(pending), 0)]:
+                running_path = _claim_job(args.inbox, job_name)
+                if running_path:
+                    try:
+                        future = executor.submit(run_job, running_path, os.path.join(args.inbox, LOGS_DIR))
+                    except BrokenProcessPool:
+                        # A worker process died, failing its pool; carry on with a fresh one.
+                        logging.warning(f'{APP} worker pool is broken, starting a new one')
+                        executor.shutdown(wait=False)
+                        executor = ProcessPoolExecutor(max_workers=args.workers)
+                        future = executor.submit(run_job, running_path, os.path.join(args.inbox, LOGS_DIR))
+                    pending[future] = running_path
+
+            if not pending and args.once:
+                break
+
+            if pending:
+                done, _ = wait(pending, timeout=args.poll, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _finish_job(args.inbox, pending.pop(future), _get_result(future))
+            else:
+                time.sleep(args.poll)
+    except KeyboardInterrupt:
+        logging.info(f'{APP} interrupted, waiting for <{len(pending)}> running jobs')
+        while pending:
+            done, _ = wait(pending, timeout=args.poll, return_when=FIRST_COMPLETED)
+            for future in done:
+                _finish_job(args.inbox, pending.pop(future), _get_result(future))
+            _touch_jobs(pending.values())
+    finally:
+        executor.shutdown()
+
+    logging.info(f'Leaving {APP}')
+    return RETURN_SUCCESS
+
+
+def _interpret_args(argv):
+    """
+    Read and parse given command line arguments.
+    :param argv: Given argument parameters.
+    :return: Parsed arguments.
+    """
+    arg_parser = argparse.ArgumentParser(APP)
+    arg_parser.add_argument('-inbox', dest='inbox', help='Directory watched for job files', required=True)
+    arg_parser.add_argument('-workers', dest='workers', type=int, default=os.cpu_count(),
+                            help='Maximum number of concurrently running jobs')
+    arg_parser.add_argument('-poll', dest='poll', type=float, default=1.0,
+                            help='Seconds between inbox scans')
+    arg_parser.add_argument('-once', dest='once', action='store_true',
+                            help='Exit once the inbox is empty and all jobs are finished')
+    arg_parser.add_argument('-log', dest='log_path', help='Fully qualified worker logging file')
+    return arg_parser.parse_args(argv)
+
+
+def run_job(job_path, logs_dir):
+    """
+    Run one job in a worker process, logging to the job's own log file.
+    :param job_path: Path of the claimed job file.
+    :param logs_dir: Directory for job log files.
+    :return: dict; Job result, with 'status' of either 'done' or 'failed'.
+    """
+    job_name = os.path.basename(job_path)[:-len(JOB_SUFFIX)]
+    try:
+        with open(job_path) as job_file:
+            job_args = list(json.load(job_file)['args'])
+    except Exception as gen_exc:
+        return {'status': 'failed', 'return': repr(gen_exc), 'traceback': traceback.format_exc(), 'seconds': 0.0}
+    return run_job_args(job_name, job_args, logs_dir)
+
+
+def run_job_args(job_name, job_args, logs_dir):
+    """
+    Run one job's etldata command line in a worker process, logging to the job's own log file.
+    :param job_name: Job name, naming its log file.
+    :param job_args: list of str; etldata command line arguments.
+    :param logs_dir: Directory for job log files.
+    :return: dict; Job result, with 'status' of either 'done' or 'failed'.
+    """
+    started = time.time()
+    try:
+        job_args = list(job_args)
+        if '-log' not in job_args:
+            job_args += ['-log', os.path.join(logs_dir, f'{job_name}.log')]
+
+        # Route this job's logging to its own file, replacing the previous job's handlers.
+        for handler in logging.root.handlers[:]:
+            logging.root.removeHandler(handler)
+            handler.close()
+
+        return_value = etldata.main(job_args)
+        status = 'done' if return_value == etldata.RETURN_SUCCESS else 'failed'
+        result = {'status': status, 'return': return_value}
+    except (Exception, SystemExit) as gen_exc:
+        # argparse exits on bad or unknown arguments, which fails this job only
+        result = {'status': 'failed', 'return': repr(gen_exc), 'traceback': traceback.format_exc()}
+    finally:
+        # A job's stage metrics are reported by the job, and would pile up in a long-running worker
+        logu.disable_metrics()
+    result['seconds'] = time.time() - started
+    return result
+
+
+def _get_result(future):
+    """
+    Get the result of a finished job, failed if its worker process raised or died.
+    :param future: Future of run_job.
+    :return: dict; Job result.
+    """
+    try:
+        return future.result()
+    except (Exception, SystemExit) as gen_exc:
+        return {'status': 'failed', 'return': repr(gen_exc), 'traceback': traceback.format_exc(), 'seconds': 0.0}
+
+
+def _touch_jobs(running_paths):
+    """
+    Mark jobs as still running, keeping other workers from requeueing them.
+    :param running_paths: Claimed job paths.
+    :return: None
+    """
+    for running_path in running_paths:
+        try:
+            os.utime(running_path)
+        except FileNotFoundError:
+            logging.warning(f'Job <{os.path.basename(running_path)}> was requeued while running')
+
+
+def _requeue_jobs(inbox, stale_after=RUNNING_STALE_AFTER):
+    """
+    Put jobs left in the 'running' directory by a stopped worker back into the inbox, to be run again.
+    Jobs touched within stale_after seconds belong to a live worker, possibly another one, and are left alone.
+    :param inbox: Inbox directory.
+    :param stale_after: Seconds since a job was last touched by its worker.
+    :return: list of str; Requeued job file names.
+    """
+    running_dir = os.path.join(inbox, RUNNING_DIR)
+    stale_before = time.time() - stale_after
+    job_names = []
+    for entry in os.scandir(running_dir):
+        try:
+            if not entry.is_file() or not entry.name.endswith(JOB_SUFFIX) or entry.stat().st_mtime > stale_before:
+                continue
+            os.replace(entry.path, os.path.join(inbox, entry.name))
+        except FileNotFoundError:
+            # Finished or requeued by its worker meanwhile
+            continue
+        job_names.append(entry.name)
+        logging.warning(f'Job <{entry.name}> was left running by a stopped worker, requeued')
+    return job_names
+
+
+def _list_jobs(inbox):
+    """
+    List job files waiting in the inbox, oldest first.
+    :param inbox: Inbox directory.
+    :return: list of str; Job file names.
+    """
+    jobs = [entry for entry in os.scandir(inbox) if entry.is_file() and entry.name.endswith(JOB_SUFFIX)]
+    return [entry.name for entry in sorted(jobs, key=lambda entry: entry.stat().st_mtime)]
+
+
+def _claim_job(inbox, job_name):
+    """
+    Claim a job by moving it into the 'running' directory, so it is picked up only once.
+    :param inbox: Inbox directory.
+    :param job_name: Job file name.
+    :return: str; Claimed job path, or None if another worker claimed it first.
+    """
+    running_path = os.path.join(inbox, RUNNING_DIR, job_name)
+    try:
+        # Touched before the move, so the job never shows up in 'running' as stale
+        os.utime(os.path.join(inbox, job_name))
+        os.replace(os.path.join(inbox, job_name), running_path)
+    except FileNotFoundError:
+        return None
+    logging.info(f'Job <{job_name}> started')
+    return running_path
+
+
+def _finish_job(inbox, running_path, result):
+    """
+    Move a finished job into the 'done' or 'failed' directory along with its result.
+    :param inbox: Inbox directory.
+    :param running_path: Claimed job path.
+    :param result: dict; Job result.
+    :return: None
+    """
+    job_name = os.path.basename(running_path)
+    target_dir = os.path.join(inbox, DONE_DIR if result['status'] == 'done' else FAILED_DIR)
+    os.replace(running_path, os.path.join(target_dir, job_name))
+    with open(os.path.join(target_dir, job_name[:-len(JOB_SUFFIX)] + '.result.json'), 'w') as result_file:
+        json.dump(result, result_file, indent=4)
+    logging.info(f'Job <{job_name}> {result["status"]} in <{result["seconds"]:.3f}> seconds')
+
+
+if __name__ == '__main__':
+    # Call main process.
+    sys.exit(main(sys.argv[1:]))
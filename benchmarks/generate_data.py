@@ -0,0 +1,121 @@
+import os
+import sys
+sys.path.append(os.getcwd())
+import argparse
+import numpy as np
+import pandas as pd
+
+APP = 'EtlData sales generator'
+
+# Share of Online Retail II rows per country; the remainder is spread over the other countries
+COUNTRY_WEIGHTS = {'United Kingdom': 0.90, 'EIRE': 0.018, 'Germany': 0.017, 'France': 0.014,
+                   'Netherlands': 0.005, 'Spain': 0.004, 'Switzerland': 0.003, 'Belgium': 0.003,
+                   'Portugal': 0.003, 'Australia': 0.002, 'Channel Islands': 0.002, 'Italy': 0.002,
+                   'Norway': 0.002, 'Sweden': 0.002, 'Cyprus': 0.001, 'Finland': 0.001,
+                   'Austria': 0.001, 'Denmark': 0.001, 'Greece': 0.001, 'Japan': 0.001,
+                   'Poland': 0.001, 'USA': 0.001, 'Unspecified': 0.001, 'Singapore': 0.001,
+                   'United Arab Emirates': 0.001, 'Israel': 0.001, 'Canada': 0.001, 'Malta': 0.001,
+                   'Iceland': 0.0005, 'Lithuania': 0.0005, 'RSA': 0.0005, 'Brazil': 0.0005,
+                   'Korea': 0.0005, 'Bahrain': 0.0005, 'Thailand': 0.0005, 'Lebanon': 0.0005,
+                   'Nigeria': 0.0005, 'West Indies': 0.0005, 'Bermuda': 0.0005, 'European Community': 0.0005,
+                   'Czech Republic': 0.0005, 'Saudi Arabia': 0.0005, 'Hong Kong': 0.0005}
+STOCK_CODES = 5000
+CUSTOMERS = 6000
+LINES_PER_INVOICE = 20
+FIRST_INVOICE = 489434
+FIRST_DATE = np.datetime64('2009-12-01T07:00')
+LAST_DATE = np.datetime64('2011-12-09T12:50')
+CHUNK_ROWS = 1000000
+
+
+def generate_sales(rows, seed=0, chunk_rows=CHUNK_ROWS):
+    """ Generate Online Retail II shaped sales, chunk by chunk. Output only
+        depends on given arguments, so runs of the same size are comparable
+        across versions
+
+    param rows: int
+        total number of rows
+    param seed: int
+        random seed
+    param chunk_rows: int
+        number of rows per generated chunk
+    returns: generator of pandas dataframes
+        chunks with the columns of the extraction 'apply_dtype' config
+    """
+    countries = np.array(list(COUNTRY_WEIGHTS))
+    country_weights = np.array(list(COUNTRY_WEIGHTS.values()))
+    country_weights = country_weights / country_weights.sum()
+    # Popularity of stock codes and customers follows a Zipf-like law
+    stock_weights = 1.0 / np.arange(1, STOCK_CODES + 1)
+    stock_weights = stock_weights / stock_weights.sum()
+    stock_codes = np.array([str(10000 + code) if code % 7 else f'{10000 + code}A'
+                            for code in range(STOCK_CODES)])
+    stock_prices = np.round(np.random.default_rng(seed).lognormal(0.8, 0.9, STOCK_CODES), 2)
+    customer_weights = 1.0 / np.arange(1, CUSTOMERS + 1) ** 0.7
+    customer_weights = customer_weights / customer_weights.sum()
+    total_invoices = max(rows // LINES_PER_INVOICE, 1)
+    span = (LAST_DATE - FIRST_DATE).astype('timedelta64[m]').astype(np.int64)
+
+    for chunk_index, start in enumerate(range(0, rows, chunk_rows)):
+        size = min(chunk_rows, rows - start)
+        rng = np.random.default_rng([seed, chunk_index, chunk_rows])
+
+        # Invoices are consecutive, so date grows with row position as in the real file
+        invoice_numbers = (np.arange(start, start + size) // LINES_PER_INVOICE)
+        # About 2% of invoices are cancellations, marked by a 'C' prefix
+        cancelled = (invoice_numbers * 2654435761) % 100 < 2
+        invoices = (FIRST_INVOICE + invoice_numbers).astype(str).astype(object)
+        invoices[cancelled] = 'C' + invoices[cancelled]
+        minutes = (invoice_numbers * span) // total_invoices
+        dates = FIRST_DATE + minutes.astype('timedelta64[m]')
+
+        stock_index = rng.choice(STOCK_CODES, size=size, p=stock_weights)
+        quantity = rng.geometric(0.15, size).astype(np.int64)
+        quantity[cancelled] = -quantity[cancelled]
+        customers = (12346 + rng.choice(CUSTOMERS, size=size, p=customer_weights)).astype(float)
+        customers[rng.random(size) < 0.2] = np.nan
+
+        yield pd.DataFrame({'Invoice': invoices,
+                            'StockCode': stock_codes[stock_index],
+                            'Description': np.char.add('ITEM ', stock_codes[stock_index]),
+                            'Quantity': quantity,
+                            'InvoiceDate': dates,
+                            'Price': stock_prices[stock_index],
+                            'Customer ID': customers,
+                            'Country': rng.choice(countries, size=size, p=country_weights)})
+
+
+def write_sales(path, rows, seed=0, chunk_rows=CHUNK_ROWS):
+    """ Write generated sales to a csv file, chunk by chunk
+
+    param path: str
+        destination csv path
+    param rows: int
+        total number of rows
+    param seed: int
+        random seed
+    param chunk_rows: int
+        number of rows per generated chunk
+    returns: str
+        destination csv path
+    """
+    with open(path, 'w', newline='') as file:
+        for chunk_index, df_chunk in enumerate(generate_sales(rows, seed, chunk_rows)):
+            df_chunk.to_csv(file, index=False, header=(chunk_index == 0),
+                            date_format='%Y-%m-%d %H:%M:%S')
+    return path
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(APP)
+    arg_parser.add_argument('-rows', dest='rows', type=float, required=True,
+                            help='Number of rows, e.g. 1e6')
+    arg_parser.add_argument('-output', dest='output_path', required=True, help='Output csv path')
+    arg_parser.add_argument('-seed', dest='seed', type=int, default=0, help='Random seed')
+    args = arg_parser.parse_args(argv)
+    write_sales(args.output_path, int(args.rows), args.seed)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
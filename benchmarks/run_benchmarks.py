@@ -0,0 +1,204 @@
+import os
+import sys
+sys.path.append(os.getcwd())
+import argparse
+import copy
+import datetime
+import importlib.util
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import pandas as pd
+import utils.etl_util as etlu
+from benchmarks.generate_data import write_sales
+from utils.file_util import FILE_EXTENSIONS
+
+APP = 'EtlData benchmarks'
+CONFIG_PATH = os.path.join('apps', 'etldata', 'config', 'config.json')
+MAPPING_PATH = os.path.join('data', 'mapping_ecomm_sales.xlsx')
+RESULTS_DIR = os.path.join('benchmarks', 'results')
+FILE_TYPES = ('csv', 'excel', 'parquet', 'feather')
+EXCEL_MAX_DATA_ROWS = 1048575
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(APP)
+    arg_parser.add_argument('-rows', dest='rows', type=float, nargs='+', default=[1e5],
+                            help='Input sizes to benchmark, e.g. 1e5 1e6 1e7')
+    arg_parser.add_argument('-repeat', dest='repeat', type=int, default=3,
+                            help='Runs per benchmark, the fastest one is kept')
+    arg_parser.add_argument('-file_types', dest='file_types', nargs='+', default=list(FILE_TYPES),
+                            help='File types to benchmark write_feature with')
+    arg_parser.add_argument('-data_dir', dest='data_dir', default=tempfile.gettempdir(),
+                            help='Directory for generated input and written output')
+    arg_parser.add_argument('-results', dest='results_dir', default=RESULTS_DIR,
+                            help='Directory to store results in')
+    arg_parser.add_argument('-compare', dest='compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                            help='Compare two stored results instead of running benchmarks')
+    arg_parser.add_argument('-threshold', dest='threshold', type=float, default=1.10,
+                            help='Slowdown ratio reported as a regression when comparing')
+    args = arg_parser.parse_args(argv)
+
+    if args.compare:
+        return compare_results(args.compare[0], args.compare[1], args.threshold)
+
+    with open(CONFIG_PATH) as file_config:
+        config = json.load(file_config)
+
+    results = []
+    for rows in (int(rows) for rows in args.rows):
+        results.extend(run_benchmarks(rows, config, args.file_types, args.repeat, args.data_dir))
+    print(f'Results were stored to <{store_results(results, args.results_dir)}>')
+    return 0
+
+
+def run_benchmarks(rows, config, file_types, repeat, data_dir):
+    """ Benchmark every ETL feature against generated sales of given size
+
+    param rows: int
+        number of generated rows
+    param config: dict
+        feature configuration, as read from config.json
+    param file_types: list of str
+        file types to benchmark write_feature with
+    param repeat: int
+        runs per benchmark
+    param data_dir: str
+        directory for generated input and written output
+    returns: list of dict
+        one result per benchmark
+    """
+    input_path = os.path.join(data_dir, f'bench_sales_{rows}.csv')
+    if not os.path.isfile(input_path):
+        write_sales(input_path, rows)
+
+    extraction = config['extraction']
+    transformation = config['transformation']
+    read_config = dict(extraction['input']['read'], path=input_path, description='benchmark')
+    mapping_config = copy.deepcopy(extraction['mapping'])
+    mapping_config['read'].update(path=MAPPING_PATH, description='benchmark')
+
+    df_read = etlu.read_feature(copy.deepcopy(read_config))
+    df_mapped = etlu.mapping_feature(df_read, copy.deepcopy(mapping_config))
+    df_extracted = etlu.df_col_mods_feature(df_mapped.copy(), copy.deepcopy(extraction))
+
+    benchmarks = [
+        ('read_feature', lambda: (copy.deepcopy(read_config),), etlu.read_feature),
+        ('mapping_feature', lambda: (df_read, copy.deepcopy(mapping_config)), etlu.mapping_feature),
+        ('df_col_mods_feature', lambda: (df_mapped.copy(), copy.deepcopy(extraction)),
+         etlu.df_col_mods_feature)]
+    for agg_type in ('groupby', 'pivot'):
+        agg_config = copy.deepcopy(transformation)
+        agg_config['aggregate']['type'] = agg_type
+        df_transform = df_extracted.copy()
+        df_transform['Line Item Tot'] = df_transform['Quantity'] * df_transform['Price']
+        benchmarks.append((f'transform_feature[{agg_type}]',
+                           lambda agg_config=agg_config: (df_extracted.copy(), copy.deepcopy(agg_config)),
+                           etlu.transform_feature))
+        benchmarks.append((f'aggregate_feature[{agg_type}]',
+                           lambda agg_config=agg_config, df_transform=df_transform:
+                           (df_transform, 'StockCode', copy.deepcopy(agg_config)),
+                           etlu.aggregate_feature))
+        # Same aggregation on every installed embedded engine
+        for engine in ('duckdb', 'polars'):
+            if importlib.util.find_spec(engine) is None:
+                continue
+            engine_config = copy.deepcopy(agg_config)
+            engine_config['aggregate']['engine'] = engine
+            benchmarks.append((f'aggregate_feature[{agg_type},{engine}]',
+                               lambda engine_config=engine_config, df_transform=df_transform:
+                               (df_transform, 'StockCode', copy.deepcopy(engine_config)),
+                               etlu.aggregate_feature))
+        # Same aggregation over worker processes on every core, whatever the input size
+        parallel_config = copy.deepcopy(agg_config)
+        parallel_config['aggregate']['parallel'] = {'enabled': True, 'workers': os.cpu_count(), 'min_rows': 0}
+        benchmarks.append((f'aggregate_feature[{agg_type},parallel]',
+                           lambda parallel_config=parallel_config, df_transform=df_transform:
+                           (df_transform, 'StockCode', copy.deepcopy(parallel_config)),
+                           etlu.aggregate_feature))
+    for file_type in file_types:
+        if file_type == 'excel' and rows > EXCEL_MAX_DATA_ROWS:
+            continue
+        output_path = os.path.join(data_dir, f'bench_output_{rows}.{FILE_EXTENSIONS[file_type]}')
+        write_config = {'path': output_path, 'file_type': file_type, 'mode': 'overwrite',
+                        'description': 'benchmark'}
+        benchmarks.append((f'write_feature[{file_type}]', lambda write_config=write_config:
+                           (dict(write_config), df_extracted), etlu.write_feature))
+
+    results = []
+    for name, setup, feature in benchmarks:
+        seconds = []
+        for _ in range(repeat):
+            feature_args = setup()
+            start = time.perf_counter()
+            feature(*feature_args)
+            seconds.append(time.perf_counter() - start)
+        results.append({'benchmark': name, 'rows': rows, 'seconds': min(seconds),
+                        'rows_per_second': rows / min(seconds) if min(seconds) else None})
+        print(f'{name:<35}{rows:>12}{min(seconds):>12.4f}s')
+    return results
+
+
+def store_results(results, results_dir):
+    """ Store benchmark results along with the environment they were run in
+
+    param results: list of dict
+        one result per benchmark
+    param results_dir: str
+        directory to store results in
+    returns: str
+        path of the stored results
+    """
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                  text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = 'unknown'
+    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, f'{timestamp}-{revision}.json')
+    with open(path, 'w') as file:
+        json.dump({'revision': revision,
+                   'timestamp': timestamp,
+                   'python': platform.python_version(),
+                   'pandas': pd.__version__,
+                   'platform': platform.platform(),
+                   'results': results}, file, indent=4)
+    return path
+
+
+def compare_results(baseline_path, candidate_path, threshold):
+    """ Print timing ratios between two stored results and flag regressions
+
+    param baseline_path: str
+        stored results to compare against
+    param candidate_path: str
+        stored results to compare
+    param threshold: float
+        candidate / baseline ratio above which a benchmark counts as a regression
+    returns: int
+        1 if any benchmark regressed, 0 otherwise
+    """
+    with open(baseline_path) as file:
+        baseline = {(result['benchmark'], result['rows']): result for result in json.load(file)['results']}
+    with open(candidate_path) as file:
+        candidate = json.load(file)['results']
+
+    regressed = False
+    for result in candidate:
+        base_result = baseline.get((result['benchmark'], result['rows']))
+        if not base_result or not base_result['seconds']:
+            continue
+        ratio = result['seconds'] / base_result['seconds']
+        flag = 'REGRESSION' if ratio > threshold else ''
+        regressed = regressed or bool(flag)
+        print(f'{result["benchmark"]:<35}{result["rows"]:>12}{base_result["seconds"]:>12.4f}s'
+              f'{result["seconds"]:>12.4f}s{ratio:>8.2f}x {flag}')
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,41 @@
+import json
+import os
+import shutil
+import sys
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, 'apps', 'etldata', 'src')
+for import_dir in (ROOT_DIR, SRC_DIR):
+    if import_dir not in sys.path:
+        sys.path.insert(0, import_dir)
+
+CONFIG_PATH = os.path.join(ROOT_DIR, 'apps', 'etldata', 'config', 'config.json')
+MAPPING_PATH = os.path.join(ROOT_DIR, 'data', 'mapping_ecomm_sales.xlsx')
+SALES_ROWS = 2000
+
+
+@pytest.fixture
+def config():
+    """ Fresh copy of the shipped config, since workflow steps update its sections in place """
+    with open(CONFIG_PATH) as file_config:
+        return json.load(file_config)
+
+
+@pytest.fixture
+def mapping_path(tmp_path):
+    """ Copy of the shipped mapping file, so its lookup index is cached next to the copy """
+    return shutil.copy(MAPPING_PATH, tmp_path / 'mapping.xlsx')
+
+
+@pytest.fixture
+def sales_path(tmp_path):
+    """ Small generated sales csv, shaped as the extraction input """
+    from benchmarks.generate_data import write_sales
+    return write_sales(str(tmp_path / 'sales.csv'), SALES_ROWS)
+
+
+@pytest.fixture
+def extraction_args(sales_path, mapping_path):
+    """ Extraction arguments as parsed from the command line, without an output """
+    return {'input_path': sales_path, 'mapping_path': str(mapping_path), 'output_path': None, 'mode': 'overwrite'}
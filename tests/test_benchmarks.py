@@ -0,0 +1,23 @@
+import json
+import pandas as pd
+from benchmarks.generate_data import generate_sales
+from benchmarks.run_benchmarks import compare_results
+
+
+def test_generate_sales_is_reproducible():
+    chunks = list(generate_sales(2500, seed=7, chunk_rows=1000))
+
+    assert [len(df_chunk.index) for df_chunk in chunks] == [1000, 1000, 500]
+    assert list(chunks[0].columns) == ['Invoice', 'StockCode', 'Description', 'Quantity', 'InvoiceDate',
+                                       'Price', 'Customer ID', 'Country']
+    pd.testing.assert_frame_equal(pd.concat(chunks), pd.concat(generate_sales(2500, seed=7, chunk_rows=1000)))
+
+
+def test_compare_results_flags_regressions(tmp_path):
+    def store(name, seconds):
+        path = tmp_path / name
+        path.write_text(json.dumps({'results': [{'benchmark': 'read_feature', 'rows': 100, 'seconds': seconds}]}))
+        return str(path)
+
+    assert compare_results(store('base.json', 1.0), store('fast.json', 1.05), threshold=1.10) == 0
+    assert compare_results(store('base.json', 1.0), store('slow.json', 1.5), threshold=1.10) == 1
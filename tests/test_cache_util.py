@@ -0,0 +1,81 @@
+import logging
+import os
+import threading
+import pytest
+import utils.cache_util as cacheu
+
+
+@pytest.fixture(autouse=True)
+def clear_memory():
+    cacheu._OBJECTS.clear()
+    yield
+    cacheu._OBJECTS.clear()
+
+
+def test_every_lookup_is_logged(tmp_path, caplog):
+    cache_dir = str(tmp_path / 'cache')
+    key = cacheu.make_key('read', 'digest')
+    caplog.set_level(logging.INFO)
+
+    assert cacheu.load_cached(cache_dir, key) is None
+    cacheu.store_cached(cache_dir, key, {'rows': 3})
+    assert cacheu.load_cached(cache_dir, key) == {'rows': 3}
+    cacheu._OBJECTS.clear()
+    assert cacheu.load_cached(cache_dir, key) == {'rows': 3}
+
+    assert [record.getMessage() for record in caplog.records] == [f'Cache miss <{key}> in <{cache_dir}>',
+                                                                  f'Cache hit <{key}> in memory',
+                                                                  f'Cache hit <{key}> in <{cache_dir}>']
+
+
+def test_keys_follow_file_content_and_config(tmp_path):
+    path = tmp_path / 'sales.csv'
+    path.write_text('a,b\n1,2\n')
+    digest = cacheu.file_digest(str(path))
+    config = {'apply_dtype': {'a': 'int'}, 'path': str(path)}
+
+    assert cacheu.make_key(digest, cacheu.config_fingerprint(config)) == \
+        cacheu.make_key(digest, cacheu.config_fingerprint(dict(config, path='elsewhere.csv')))
+    assert cacheu.make_key(digest, cacheu.config_fingerprint(config)) != \
+        cacheu.make_key(digest, cacheu.config_fingerprint({'apply_dtype': {'a': 'float'}}))
+
+    path.write_text('a,b\n1,3\n')
+    assert cacheu.file_digest(str(path)) != digest
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache_dir = str(tmp_path)
+    for key in ('old', 'used', 'new'):
+        cacheu.store_cached(cache_dir, key, b'x' * 1000)
+    os.utime(tmp_path / 'old.pkl', (1, 1))
+    os.utime(tmp_path / 'used.pkl', (2, 2))
+    os.utime(tmp_path / 'new.pkl', (3, 3))
+    cacheu.load_cached(cache_dir, 'used')
+
+    assert cacheu.evict_cached(cache_dir, max_bytes=2500) == 1
+    assert sorted(os.listdir(tmp_path)) == ['new.pkl', 'used.pkl']
+    assert 'old' not in cacheu._OBJECTS
+
+
+def test_threads_store_one_key_side_by_side(tmp_path):
+    cache_dir = str(tmp_path)
+    barrier = threading.Barrier(4)
+    errors = []
+
+    def store():
+        barrier.wait(timeout=5)
+        try:
+            for _ in range(20):
+                cacheu.store_cached(cache_dir, 'shared', b'x' * 100000, keep_in_memory=False)
+        except Exception as gen_exc:
+            errors.append(gen_exc)
+
+    threads = [threading.Thread(target=store) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert os.listdir(cache_dir) == ['shared.pkl']
+    assert cacheu.load_cached(cache_dir, 'shared') == b'x' * 100000
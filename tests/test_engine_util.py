@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+from utils.engine_util import aggregate_with_engine
+from utils.file_util import FileDataStorage
+from utils.partition_util import write_partitions
+
+
+@pytest.fixture
+def line_items():
+    return pd.DataFrame({'StockCode': ['B', 'A', 'B', 'C', 'A', None],
+                         'Country': ['UK', 'UK', 'France', 'UK', 'Spain', 'France'],
+                         'Quantity': [2, 1, 3, 1, 4, 5],
+                         'Price': [1.5, 2.0, 1.0, 4.0, 0.5, 9.0]})
+
+
+def _expected(df, category, agg_method, sort_keys):
+    df = df.assign(Total=df['Quantity'] * df['Price'])
+    return df.groupby(category, sort=sort_keys)['Total'].agg(agg_method).reset_index()
+
+
+@pytest.mark.parametrize('engine', ['duckdb', 'polars'])
+@pytest.mark.parametrize('file_type', ['parquet', 'feather', None])
+@pytest.mark.parametrize('agg_method', ['sum', 'count', 'mean'])
+def test_engines_match_pandas(tmp_path, line_items, engine, file_type, agg_method):
+    pytest.importorskip(engine)
+    source = line_items
+    if file_type:
+        path = str(tmp_path / f'line_items.{file_type}')
+        FileDataStorage().write({'path': path, 'file_type': file_type, 'mode': 'overwrite'}, line_items)
+        source = (path, file_type)
+
+    for sort_keys in (True, False):
+        results = aggregate_with_engine(engine, source, ['StockCode', 'Country'], ('Quantity', 'Price'), 'Total',
+                                        agg_method, sort_keys)
+
+        for df_result, category in zip(results, ['StockCode', 'Country']):
+            pd.testing.assert_frame_equal(df_result, _expected(line_items, category, agg_method, sort_keys),
+                                          check_dtype=False)
+
+
+@pytest.mark.parametrize('engine', ['duckdb', 'polars'])
+@pytest.mark.parametrize('file_type', ['parquet', 'feather'])
+def test_engines_scan_partitioned_directories(tmp_path, line_items, engine, file_type):
+    pytest.importorskip(engine)
+    path = str(tmp_path / 'line_items')
+    write_partitions(path, line_items, ['Country'], file_type)
+
+    results = aggregate_with_engine(engine, (path, file_type), ['StockCode', 'Country'], ('Quantity', 'Price'),
+                                    'Total', 'sum', True)
+
+    for df_result, category in zip(results, ['StockCode', 'Country']):
+        pd.testing.assert_frame_equal(df_result, _expected(line_items, category, 'sum', True), check_dtype=False)
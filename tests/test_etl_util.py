@@ -0,0 +1,141 @@
+import copy
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+import utils.etl_util as etlu
+from utils.partition_util import write_partitions
+
+
+def _transform_config(agg_type='pivot', agg_method='sum'):
+    return {'output': {'col_transforms': {'add': 'Line Item Tot', 'from': ['Quantity', 'Price']},
+                       'dest_cols': ['Total', 'Percentage']},
+            'aggregate': {'type': agg_type, 'aggfunc': agg_method}}
+
+
+@pytest.fixture
+def line_items():
+    return pd.DataFrame({'StockCode': ['B', 'A', 'B', 'C', 'A', None, 'C', 'D'],
+                         'Line Item Tot': [1.5, np.nan, 2.0, 4.0, 3.0, 9.0, np.nan, np.nan]})
+
+
+@pytest.mark.parametrize('agg_type', ['pivot', 'groupby'])
+@pytest.mark.parametrize('agg_method', ['sum', 'count', 'mean'])
+def test_aggregate_dimensions_leaves_missing_values_out(line_items, agg_type, agg_method):
+    df_result, = etlu.aggregate_dimensions_feature(line_items, ['StockCode'], _transform_config(agg_type, agg_method))
+
+    expected = line_items.groupby('StockCode', sort=agg_type == 'pivot')['Line Item Tot'].agg(agg_method)
+    assert df_result['StockCode'].tolist() == expected.index.tolist()
+    np.testing.assert_allclose(df_result['Total'].to_numpy(dtype=float), expected.to_numpy(dtype=float))
+
+
+def test_read_feature_applies_configured_types(sales_path, config):
+    read_config = dict(config['extraction']['input']['read'], path=sales_path, description='test')
+
+    df = etlu.read_feature(read_config)
+
+    assert list(df.columns) == list(read_config['apply_dtype'])
+    assert df['Quantity'].dtype == np.int32
+    assert isinstance(df['Country'].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(df['InvoiceDate'])
+    assert pd.api.types.is_float_dtype(df['Customer ID'])
+
+
+def test_merge_state_adds_up_batches_once(tmp_path):
+    config = _transform_config('pivot', 'sum')
+    state_path = str(tmp_path / 'sales.state.pkl')
+    first = pd.DataFrame({'StockCode': ['A', 'B'], 'Total': [1.0, 2.0]})
+    second = pd.DataFrame({'StockCode': ['B', 'C'], 'Total': [3.0, 4.0]})
+
+    etlu.merge_state_feature([first], ['StockCode'], config, state_path, input_key='day0')
+    df_merged, = etlu.merge_state_feature([second], ['StockCode'], config, state_path, input_key='day1')
+    assert df_merged.to_dict('list') == {'StockCode': ['A', 'B', 'C'], 'Total': [1.0, 5.0, 4.0]}
+
+    # An input already merged leaves the state as is
+    df_again, = etlu.merge_state_feature([second], ['StockCode'], config, state_path, input_key='day1')
+    pd.testing.assert_frame_equal(df_again, df_merged)
+
+
+def test_merge_state_rejects_state_of_another_config(tmp_path):
+    state_path = str(tmp_path / 'sales.state.pkl')
+    etlu.merge_state_feature([pd.DataFrame({'StockCode': ['A'], 'Total': [1.0]})], ['StockCode'],
+                             _transform_config('pivot', 'sum'), state_path, input_key='day0')
+
+    with pytest.raises(ValueError):
+        etlu.merge_state_feature([pd.DataFrame({'StockCode': ['A'], 'Total': [1.0]})], ['StockCode'],
+                                 _transform_config('pivot', 'count'), state_path, input_key='day1')
+    with pytest.raises(ValueError):
+        etlu.merge_state_feature([pd.DataFrame({'Country': ['UK'], 'Total': [1.0]})], ['Country'],
+                                 _transform_config('pivot', 'sum'), state_path, input_key='day1')
+
+
+def test_merge_state_rejects_non_additive_functions(tmp_path):
+    with pytest.raises(ValueError):
+        etlu.merge_state_feature([pd.DataFrame({'StockCode': ['A'], 'Total': [1.0]})], ['StockCode'],
+                                 _transform_config('pivot', 'mean'), str(tmp_path / 'sales.state.pkl'))
+
+
+def test_apply_dtype_keeps_matching_arrow_columns():
+    df = pd.DataFrame({'Quantity': [1, 2], 'Country': ['UK', 'France']}).astype(
+        {'Quantity': pd.ArrowDtype(pa.int32()), 'Country': pd.ArrowDtype(pa.dictionary(pa.int32(), pa.string()))})
+
+    df_typed = etlu.apply_dtype_feature(df, {'Quantity': 'int32', 'Country': 'category'})
+
+    assert df_typed.dtypes.tolist() == df.dtypes.tolist()
+
+
+def test_top_k_keeps_largest_groups_and_the_remainder():
+    df = pd.DataFrame({'Country': ['UK', 'France', 'Spain', 'Italy'], 'Total': [10.0, 3.0, 5.0, 2.0]})
+
+    df_top = etlu.top_k_feature(df, 'Country', 2, _transform_config('pivot', 'sum'))
+
+    assert df_top.to_dict('list') == {'Country': ['UK', 'Spain', 'Other'], 'Total': [10.0, 5.0, 5.0]}
+    with pytest.raises(ValueError):
+        etlu.top_k_feature(df, 'Country', 2, _transform_config('pivot', 'mean'))
+
+
+def test_streamed_top_k_matches_whole_input():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'Country': rng.choice(['UK', 'France', 'Spain', 'Italy', 'Germany'], 1000),
+                       'StockCode': rng.choice(list('ABCDEFGH'), 1000),
+                       'Quantity': rng.integers(1, 10, 1000), 'Price': rng.random(1000)})
+    config = _transform_config('pivot', 'sum')
+    config['output'].update(sheet_naming=['Country', 'StockCode'], top_k={'StockCode': 3})
+
+    list_of_streamed_df = etlu.transform_chunks_feature((df.iloc[start:start + 100].copy()
+                                                         for start in range(0, 1000, 100)), copy.deepcopy(config))
+    list_of_whole_df = etlu.transform_feature(df.copy(), copy.deepcopy(config))
+
+    for df_streamed, df_whole in zip(list_of_streamed_df, list_of_whole_df):
+        pd.testing.assert_frame_equal(df_streamed, df_whole, check_dtype=False)
+    assert len(list_of_streamed_df[1].index) == 4
+
+
+def test_filter_on_column_outside_apply_dtype(tmp_path):
+    df = pd.DataFrame({'Invoice': ['1', '2', '3'], 'Quantity': [1, 2, 3],
+                       'Date': pd.to_datetime(['2009-12-01', '2010-01-05', '2010-01-20'])})
+    path = str(tmp_path / 'sales')
+    write_partitions(path, df, ['Date:month'], 'parquet')
+    read_config = {'path': path, 'file_type': 'parquet', 'description': 'test',
+                   'apply_dtype': {'Invoice': 'str', 'Quantity': 'int32', 'Date': 'datetime.date'},
+                   'filter': [['Date_month', '=', '2010-01'], ['Quantity', '>', 2]]}
+
+    df_read = etlu.read_feature(etlu.projection_feature(read_config, ['Invoice', 'Quantity']))
+
+    assert df_read.to_dict('list') == {'Invoice': ['3'], 'Quantity': [3]}
+
+
+def test_compiled_mapping_is_only_stored_in_the_stage_cache(tmp_path):
+    mapping_path = tmp_path / 'mapping.csv'
+    mapping_path.write_text('Country of Order,Region\nFrance,Europe\n')
+    config = {'read': {'path': str(mapping_path), 'file_type': 'csv', 'description': 'test'},
+              'left_on': ['Country'], 'right_on': ['Country of Order'], 'default_value': 'Unmapped'}
+    cache_dir = tmp_path / 'cache'
+
+    etlu.compile_mapping_feature(config)
+    assert sorted(os.listdir(tmp_path)) == ['mapping.csv']
+
+    etlu.compile_mapping_feature(dict(config, default_value='Other'), {'dir': str(cache_dir), 'max_bytes': 2 ** 20})
+    assert len(os.listdir(cache_dir)) == 1
+    assert sorted(os.listdir(tmp_path)) == ['cache', 'mapping.csv']
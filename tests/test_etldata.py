@@ -0,0 +1,162 @@
+import copy
+import os
+import subprocess
+import sys
+import pandas as pd
+import etldata
+from conftest import ROOT_DIR, SRC_DIR
+
+
+def test_chunked_extraction_matches_whole_file(extraction_args, config):
+    df_whole = etldata.run_extraction(extraction_args, config['extraction'])
+
+    config['extraction']['input']['read']['chunk_size'] = 300
+    df_chunked = etldata.run_extraction(extraction_args, config['extraction'], collect=True)
+
+    pd.testing.assert_frame_equal(df_chunked, df_whole, check_dtype=False, check_categorical=False)
+
+
+def test_chunked_extraction_writes_every_chunk(extraction_args, config, tmp_path):
+    output_path = str(tmp_path / 'joined.csv')
+    config['extraction']['output']['file_type'] = 'csv'
+    config['extraction']['input']['read']['chunk_size'] = 300
+
+    assert etldata.run_extraction(dict(extraction_args, output_path=output_path), config['extraction']) is None
+    assert len(pd.read_csv(output_path).index) == len(pd.read_csv(extraction_args['input_path']).index)
+
+
+def _read_sheets(path):
+    return pd.read_excel(path, sheet_name=None)
+
+
+def _assert_same_sheets(sheets, expected_sheets):
+    assert list(sheets) == list(expected_sheets)
+    for sheet_name, df_sheet in sheets.items():
+        pd.testing.assert_frame_equal(df_sheet, expected_sheets[sheet_name], check_dtype=False)
+
+
+def test_pipeline_matches_extraction_then_transformation(extraction_args, config, tmp_path):
+    pipeline_config = copy.deepcopy({'extraction': config['extraction'], 'transformation': config['transformation']})
+    joined_path = str(tmp_path / 'joined.xlsx')
+    etldata.run_extraction(dict(extraction_args, output_path=joined_path), config['extraction'])
+    etldata.run_transformation(dict(extraction_args, input_path=joined_path, output_path=str(tmp_path / 'steps.xlsx')),
+                               config['transformation'])
+
+    pipeline_args = dict(extraction_args, output_path=str(tmp_path / 'pipeline.xlsx'),
+                         intermediate_path=str(tmp_path / 'intermediate.xlsx'))
+    etldata.run_pipeline(pipeline_args, pipeline_config)
+
+    _assert_same_sheets(_read_sheets(tmp_path / 'pipeline.xlsx'), _read_sheets(tmp_path / 'steps.xlsx'))
+    assert (tmp_path / 'intermediate.xlsx').is_file()
+
+
+def _split_input(sales_path, input_dir, parts=3):
+    input_dir.mkdir()
+    df_sales = pd.read_csv(sales_path)
+    part_rows = -(-len(df_sales.index) // parts)
+    for part in range(parts):
+        df_sales.iloc[part * part_rows:(part + 1) * part_rows].to_csv(input_dir / f'day{part}.csv', index=False)
+    return df_sales
+
+
+def test_directory_extraction_combines_every_file(extraction_args, config, tmp_path):
+    df_sales = _split_input(extraction_args['input_path'], tmp_path / 'inbox')
+    config['extraction']['output']['file_type'] = 'csv'
+    output_path = str(tmp_path / 'joined.csv')
+
+    df_extracted = etldata.run_extraction(dict(extraction_args, input_path=str(tmp_path / 'inbox'),
+                                               output_path=output_path, workers=2), config['extraction'])
+
+    assert len(df_extracted.index) == len(df_sales.index)
+    assert df_extracted['Invoice'].tolist() == df_sales['Invoice'].astype(str).tolist()
+    assert len(pd.read_csv(output_path).index) == len(df_sales.index)
+
+
+def test_glob_extraction_splits_output_per_file(extraction_args, config, tmp_path):
+    _split_input(extraction_args['input_path'], tmp_path / 'inbox')
+    config['extraction']['output']['file_type'] = 'csv'
+    config['extraction']['input']['split_output'] = True
+
+    etldata.run_extraction(dict(extraction_args, input_path=str(tmp_path / 'inbox' / 'day*.csv'),
+                                output_path=str(tmp_path / 'joined.csv'), workers=2), config['extraction'])
+
+    assert sorted(path.name for path in (tmp_path / 'joined').iterdir()) == ['day0.csv', 'day1.csv', 'day2.csv']
+
+
+def test_dry_run_does_not_load_pandas(extraction_args, tmp_path):
+    dry_run = ('import sys, etldata; '
+               'result = etldata.main(sys.argv[1:]); '
+               'print(result, "pandas" in sys.modules)')
+    argv = ['-input', extraction_args['input_path'], '-process', 'config_extraction',
+            '-output', str(tmp_path / 'joined.xlsx'), '-mapping', extraction_args['mapping_path'], '-dryrun',
+            '-log', str(tmp_path / 'etldata.log')]
+
+    completed = subprocess.run([sys.executable, '-c', dry_run, *argv], capture_output=True, text=True, check=True,
+                               cwd=ROOT_DIR, env=dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT_DIR, SRC_DIR])))
+    assert completed.stdout.split() == ['0', 'False']
+    assert not (tmp_path / 'joined.xlsx').exists()
+
+
+def test_config_plan_is_cached_and_copied():
+    plan = etldata._load_config('config')
+    plan['extraction']['input']['read']['chunk_size'] = 1
+
+    assert etldata._load_config('config')['extraction']['input']['read'].get('chunk_size') != 1
+    assert isinstance(plan['feature_args']['-input']['required'], bool)
+    plan_dir = os.path.join(os.path.dirname(etldata.get_config_path('config')), etldata.PLAN_CACHE_DIR)
+    assert any(name.startswith('config.') and name.endswith('.plan') for name in os.listdir(plan_dir))
+
+
+def test_new_mode_runs_version_outputs_and_rejects(extraction_args, config, tmp_path):
+    df_sales = pd.read_csv(extraction_args['input_path'], dtype=str)
+    df_sales.loc[0, 'Quantity'] = 'twelve'
+    df_sales.to_csv(extraction_args['input_path'], index=False)
+    config['extraction']['input']['read']['validate'] = {'enabled': True}
+    config['extraction']['output']['file_type'] = 'csv'
+    args = dict(extraction_args, output_path=str(tmp_path / 'joined.csv'), mode='new')
+
+    for _ in range(2):
+        etldata.run_extraction(dict(args), copy.deepcopy(config['extraction']))
+
+    assert (tmp_path / 'joined.csv').is_file() and (tmp_path / 'joined_1.csv').is_file()
+    assert sorted(os.listdir(tmp_path / etldata.REJECT_DIR)) == ['.versions.json', 'joined.csv', 'joined_1.csv']
+    assert pd.read_csv(tmp_path / etldata.REJECT_DIR / 'joined_1.csv')['Reject Reason'].tolist() == \
+        ['invalid_int32:Quantity']
+
+
+def test_overlapped_stages_match_sequential_run(extraction_args, config):
+    config['extraction']['input']['read']['chunk_size'] = 300
+    df_sequential = etldata.run_extraction(extraction_args, copy.deepcopy(config['extraction']), collect=True)
+
+    config['extraction']['io']['overlap'] = True
+    df_overlapped = etldata.run_extraction(extraction_args, config['extraction'], collect=True)
+
+    pd.testing.assert_frame_equal(df_overlapped, df_sequential)
+
+
+def test_unmapped_and_pipeline_rejects_get_files_of_their_own(extraction_args, config, tmp_path):
+    df_sales = pd.read_csv(extraction_args['input_path'], dtype=str)
+    df_sales.loc[0, 'Quantity'] = 'twelve'
+    df_sales.loc[1, 'Country'] = 'Atlantis'
+    df_sales.to_csv(extraction_args['input_path'], index=False)
+    config['extraction']['input']['read']['validate'] = {'enabled': True}
+    config['extraction']['mapping']['reject_unmapped'] = True
+    reject_dir = tmp_path / etldata.REJECT_DIR
+
+    etldata.run_extraction(dict(extraction_args, output_path=str(tmp_path / 'joined.xlsx')),
+                           copy.deepcopy(config['extraction']))
+
+    df_invalid = pd.read_csv(reject_dir / 'joined.csv')
+    df_unmapped = pd.read_csv(reject_dir / f'joined_{etldata.UNMAPPED_REJECTS}.csv')
+    assert list(df_invalid.columns) == list(df_sales.columns) + ['Reject Reason']
+    assert df_invalid['Reject Reason'].tolist() == ['invalid_int32:Quantity']
+    assert df_unmapped['Reject Reason'].tolist() == ['unmapped:Country']
+    assert 'Region' in df_unmapped.columns
+
+    config['transformation']['input']['read']['validate'] = {'enabled': True, 'rules': [['Price', '<', 5]]}
+    etldata.run_pipeline(dict(extraction_args, output_path=str(tmp_path / 'pipeline.xlsx')),
+                         {'extraction': config['extraction'], 'transformation': config['transformation']})
+
+    assert pd.read_csv(reject_dir / 'pipeline_extraction.csv')['Reject Reason'].tolist() == \
+        ['invalid_int32:Quantity']
+    assert set(pd.read_csv(reject_dir / 'pipeline.csv')['Reject Reason']) == {'rule:Price<5'}
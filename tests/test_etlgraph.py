@@ -0,0 +1,92 @@
+import json
+import os
+import pytest
+import etlgraph
+import etlworker
+
+_run_job_args = etlworker.run_job_args
+
+
+@pytest.fixture
+def manifest_path(extraction_args, tmp_path):
+    joined_path = str(tmp_path / 'joined.xlsx')
+    jobs = [{'name': 'transformation',
+             'args': ['-input', joined_path, '-process', 'config_transformation',
+                      '-output', str(tmp_path / 'transformed.xlsx'), '-mapping', extraction_args['mapping_path']]},
+            {'name': 'extraction',
+             'args': ['-input', extraction_args['input_path'], '-process', 'config_extraction',
+                      '-output', joined_path, '-mapping', extraction_args['mapping_path'], '-mode', 'new']}]
+    path = tmp_path / 'nightly.json'
+    path.write_text(json.dumps({'jobs': jobs}))
+    return str(path)
+
+
+def _run(manifest_path):
+    jobs = etlgraph.load_manifest(manifest_path)
+    logs_dir = os.path.join(os.path.dirname(manifest_path), etlgraph.LOGS_DIR)
+    os.makedirs(logs_dir, exist_ok=True)
+    results = etlgraph.run_graph(jobs, etlgraph.infer_dependencies(jobs), 2, 0, logs_dir,
+                                 manifest_path.replace('.json', '.state.json'))
+    return {name: result['status'] for name, result in results.items()}
+
+
+def test_dependencies_follow_outputs_to_inputs(manifest_path):
+    jobs = etlgraph.load_manifest(manifest_path)
+
+    assert etlgraph.infer_dependencies(jobs) == {'transformation': {'extraction'}, 'extraction': set()}
+    assert jobs['extraction']['args'][-2:] == ['-mode', 'overwrite']
+    assert jobs['extraction']['args'].count('-mode') == 1
+
+
+def test_unchanged_jobs_are_skipped_and_reruns_reach_dependents(manifest_path, extraction_args, tmp_path):
+    assert _run(manifest_path) == {'extraction': 'done', 'transformation': 'done'}
+    assert _run(manifest_path) == {'extraction': 'skipped', 'transformation': 'skipped'}
+
+    with open(extraction_args['input_path'], 'a') as sales_file:
+        sales_file.write('489534,85048,ITEM 85048,1,2011-12-02 04:00:00,6.95,13085.0,United Kingdom\n')
+    assert _run(manifest_path) == {'extraction': 'done', 'transformation': 'done'}
+    assert not (tmp_path / 'joined_1.xlsx').exists()
+
+
+def test_jobs_depending_on_failed_jobs_are_blocked(manifest_path, tmp_path):
+    manifest = json.loads((tmp_path / 'nightly.json').read_text())
+    manifest['jobs'][1]['args'][1] = str(tmp_path / 'missing.csv')
+    (tmp_path / 'nightly.json').write_text(json.dumps(manifest))
+
+    assert _run(manifest_path) == {'extraction': 'failed', 'transformation': 'blocked'}
+    assert etlgraph.main(['-manifest', manifest_path]) == etlgraph.RETURN_FAILURE
+
+
+def test_cyclic_manifests_are_rejected(tmp_path):
+    path = tmp_path / 'cycle.json'
+    path.write_text(json.dumps({'jobs': [{'name': 'a', 'args': ['-process', 'config_extraction'], 'after': ['b']},
+                                         {'name': 'b', 'args': ['-process', 'config_extraction'], 'after': ['a']}]}))
+
+    assert etlgraph.main(['-manifest', str(path)]).startswith('ERROR')
+
+
+def _kill_extraction_worker(job_name, job_args, logs_dir):
+    if job_name == 'extraction':
+        os._exit(1)
+    return _run_job_args(job_name, job_args, logs_dir)
+
+
+def test_dead_workers_fail_their_job_only(manifest_path, extraction_args, tmp_path, monkeypatch):
+    monkeypatch.setattr(etlworker, 'run_job_args', _kill_extraction_worker)
+    manifest = json.loads((tmp_path / 'nightly.json').read_text())
+    manifest['jobs'].append({'name': 'independent',
+                             'args': ['-input', extraction_args['input_path'], '-process', 'config_extraction',
+                                      '-output', str(tmp_path / 'other.xlsx'),
+                                      '-mapping', extraction_args['mapping_path']]})
+    (tmp_path / 'nightly.json').write_text(json.dumps(manifest))
+    jobs = etlgraph.load_manifest(manifest_path)
+    logs_dir = str(tmp_path / etlgraph.LOGS_DIR)
+    os.makedirs(logs_dir)
+    state_path = str(tmp_path / 'nightly.state.json')
+
+    results = etlgraph.run_graph(jobs, etlgraph.infer_dependencies(jobs), 1, 0, logs_dir, state_path)
+
+    assert {name: result['status'] for name, result in results.items()} == \
+        {'extraction': 'failed', 'transformation': 'blocked', 'independent': 'done'}
+    assert 'BrokenProcessPool' in results['extraction']['return']
+    assert list(json.loads(open(state_path).read())) == ['independent']
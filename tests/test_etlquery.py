@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+import etlquery
+import utils.etl_util as etlu
+
+
+@pytest.fixture
+def cube():
+    dates = pd.date_range('2010-11-01', '2011-06-30', freq='D')
+    df = pd.DataFrame({'Region': ['Europe', 'Asia'] * (len(dates) // 2) + ['Europe'] * (len(dates) % 2),
+                       'Date': dates, 'Quantity': 1, 'Price': range(len(dates))})
+    config = {'output': {'col_transforms': {'from': ['Quantity', 'Price']}, 'dest_cols': ['Total', 'Percentage']},
+              'rollup': {'dimensions': ['Region'], 'date_column': 'Date', 'grain': 'month'}}
+    return df, etlu.rollup_feature(df, config)
+
+
+def _quarter_totals(df, start, end):
+    periods = df['Date'].dt.to_period('Q')
+    df = df[(periods >= pd.Period(start, 'Q')) & (periods <= pd.Period(end, 'Q'))]
+    return df.groupby(df['Date'].dt.to_period('Q').dt.start_time)['Price'].sum()
+
+
+def test_bounds_keep_whole_periods_of_the_queried_grain(cube):
+    df, df_cube = cube
+
+    df_result = etlu.query_rollup_feature(df_cube, grain='quarter', start='2010-12-15', end='2011-03-01')
+
+    expected = _quarter_totals(df, '2010-12-15', '2011-03-01')
+    assert df_result['Date'].tolist() == expected.index.tolist()
+    assert df_result['Total'].tolist() == expected.tolist()
+    assert df_result['Percentage'].sum() == pytest.approx(100)
+
+
+def test_slices_and_bounds_at_the_cube_grain(cube):
+    df, df_cube = cube
+
+    df_result = etlu.query_rollup_feature(df_cube, by=['Region'], where={'Region': ['Asia']},
+                                          start='2011-01-20', end='2011-02-01')
+
+    df_months = df[(df['Region'] == 'Asia') & (df['Date'] >= '2011-01-01') & (df['Date'] < '2011-03-01')]
+    assert df_result.to_dict('list')['Total'] == [df_months['Price'].sum()]
+    with pytest.raises(KeyError):
+        etlu.query_rollup_feature(df_cube, by=['Country'])
+
+
+def test_query_reads_the_cube_and_writes_the_result(cube, tmp_path):
+    _, df_cube = cube
+    cube_path = str(tmp_path / 'cube.parquet')
+    df_cube.to_parquet(cube_path)
+    output_path = str(tmp_path / 'result.csv')
+
+    assert etlquery.main(['-cube', cube_path, '-by', 'Region', '-grain', 'year', '-where', 'Region=Europe',
+                          '-output', output_path]) == etlquery.RETURN_SUCCESS
+    assert pd.read_csv(output_path)['Date'].tolist() == ['2010-01-01', '2011-01-01']
+    assert etlquery.main(['-cube', cube_path, '-where', 'Region']).startswith('ERROR')
+
+
+def test_parse_where_collects_values_by_dimension():
+    assert etlquery._parse_where(['Region=Europe', 'Country=France,Germany', 'Region=Asia']) == \
+        {'Region': ['Europe', 'Asia'], 'Country': ['France', 'Germany']}
@@ -0,0 +1,81 @@
+import json
+import os
+import time
+import etlworker
+import utils.log_util as logu
+
+
+def _drop_job(directory, name, job_args, age=0.0):
+    job_path = os.path.join(directory, f'{name}.json')
+    with open(job_path, 'w') as job_file:
+        json.dump({'args': job_args}, job_file)
+    # Jobs are claimed oldest first
+    os.utime(job_path, (time.time() - age, time.time() - age))
+    return job_path
+
+
+def _extraction_job_args(extraction_args, output_path):
+    return ['-input', extraction_args['input_path'], '-process', 'config_extraction', '-output', output_path,
+            '-mapping', extraction_args['mapping_path'], '-mode', 'overwrite']
+
+
+def _run_worker(inbox):
+    return etlworker.main(['-inbox', str(inbox), '-workers', '1', '-poll', '0.05', '-once'])
+
+
+def _job_files(inbox, sub_dir):
+    return sorted(os.listdir(inbox / sub_dir))
+
+
+def test_malformed_job_fails_without_stopping_the_worker(extraction_args, tmp_path):
+    inbox = tmp_path / 'inbox'
+    inbox.mkdir()
+    _drop_job(inbox, 'malformed', ['-process', 'config_extraction', '-unknown', 'value'], age=10)
+    _drop_job(inbox, 'valid', _extraction_job_args(extraction_args, str(tmp_path / 'joined.xlsx')))
+
+    assert _run_worker(inbox) == etlworker.RETURN_SUCCESS
+
+    assert _job_files(inbox, etlworker.FAILED_DIR) == ['malformed.json', 'malformed.result.json']
+    assert _job_files(inbox, etlworker.DONE_DIR) == ['valid.json', 'valid.result.json']
+    assert _job_files(inbox, etlworker.RUNNING_DIR) == []
+    with open(inbox / etlworker.FAILED_DIR / 'malformed.result.json') as result_file:
+        assert 'SystemExit' in json.load(result_file)['return']
+    assert (tmp_path / 'joined.xlsx').is_file()
+
+
+def test_jobs_left_running_are_requeued(extraction_args, tmp_path):
+    inbox = tmp_path / 'inbox'
+    (inbox / etlworker.RUNNING_DIR).mkdir(parents=True)
+    _drop_job(inbox / etlworker.RUNNING_DIR, 'stranded',
+              _extraction_job_args(extraction_args, str(tmp_path / 'joined.xlsx')),
+              age=etlworker.RUNNING_STALE_AFTER + 1)
+
+    assert _run_worker(inbox) == etlworker.RETURN_SUCCESS
+
+    assert _job_files(inbox, etlworker.DONE_DIR) == ['stranded.json', 'stranded.result.json']
+    assert _job_files(inbox, etlworker.RUNNING_DIR) == []
+
+
+def test_run_job_args_fails_on_bad_arguments(tmp_path):
+    result = etlworker.run_job_args('malformed', ['-process', 'config_extraction', '-unknown'], str(tmp_path))
+    assert result['status'] == 'failed'
+
+
+def test_jobs_running_in_another_worker_are_left_alone(tmp_path):
+    (tmp_path / etlworker.RUNNING_DIR).mkdir()
+    _drop_job(tmp_path / etlworker.RUNNING_DIR, 'live', ['-process', 'config_extraction'])
+    _drop_job(tmp_path / etlworker.RUNNING_DIR, 'stranded', ['-process', 'config_extraction'],
+              age=etlworker.RUNNING_STALE_AFTER + 1)
+
+    assert etlworker._requeue_jobs(str(tmp_path)) == ['stranded.json']
+    assert _job_files(tmp_path, etlworker.RUNNING_DIR) == ['live.json']
+
+
+def test_run_job_args_drops_the_job_metrics(extraction_args, tmp_path):
+    metrics_path = str(tmp_path / 'metrics.json')
+    job_args = _extraction_job_args(extraction_args, str(tmp_path / 'joined.xlsx')) + ['-metrics', metrics_path]
+
+    assert etlworker.run_job_args('metered', job_args, str(tmp_path))['status'] == 'done'
+
+    assert os.path.isfile(metrics_path)
+    assert logu.get_metrics() == []
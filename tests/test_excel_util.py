@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from utils.excel_util import EXCEL_MAX_SHEET_NAME, ExcelStreamWriter, get_sheet_title, split_sheets
+
+LONG_SHEET_NAME = 'Revenue by customer and stock code'
+
+
+def test_split_sheets_continues_in_numbered_sheets():
+    df = pd.DataFrame({'Total': range(5)})
+
+    parts = list(split_sheets(df, 'Invoice', max_rows=3))
+
+    assert [name for name, _ in parts] == ['Invoice', 'Invoice_2', 'Invoice_3']
+    assert [len(df_part.index) for _, df_part in parts] == [2, 2, 1]
+
+
+def test_sheet_titles_fit_the_name_limit():
+    titles = [get_sheet_title(LONG_SHEET_NAME, part) for part in (1, 2, 10)]
+
+    assert titles == [LONG_SHEET_NAME[:31], LONG_SHEET_NAME[:29] + '_2', LONG_SHEET_NAME[:28] + '_10']
+    assert all(len(title) <= EXCEL_MAX_SHEET_NAME for title in titles)
+
+
+@pytest.mark.parametrize('engine', ['xlsxwriter', 'openpyxl'])
+def test_stream_writer_splits_long_sheet_names(tmp_path, engine):
+    path = tmp_path / 'sales.xlsx'
+    with ExcelStreamWriter(str(path), engine, max_rows=3) as writer:
+        writer.write(pd.DataFrame({'Total': range(5)}), LONG_SHEET_NAME)
+
+    assert load_workbook(path, read_only=True).sheetnames == [LONG_SHEET_NAME[:31], LONG_SHEET_NAME[:29] + '_2',
+                                                              LONG_SHEET_NAME[:29] + '_3']
@@ -0,0 +1,89 @@
+import pandas as pd
+import pytest
+from utils.file_util import FileDataStorage
+from utils.partition_util import write_partitions
+
+
+@pytest.fixture
+def sales_df():
+    return pd.DataFrame({'Invoice': ['489434', '489435', 'C489436'],
+                         'Quantity': [12, 6, -2],
+                         'Price': [6.95, 2.1, 1.25],
+                         'Date': pd.to_datetime(['2009-12-01', '2009-12-01', '2009-12-02'])})
+
+
+@pytest.mark.parametrize('file_type', ['parquet', 'arrow', 'feather'])
+def test_columnar_round_trip(tmp_path, sales_df, file_type):
+    path = str(tmp_path / f'sales.{file_type}')
+    FileDataStorage().write({'path': path, 'file_type': file_type, 'mode': 'overwrite'}, sales_df)
+
+    df_read = FileDataStorage().read({'path': path, 'file_type': file_type})
+    pd.testing.assert_frame_equal(df_read, sales_df, check_dtype=False)
+
+    df_projected = FileDataStorage().read({'path': path, 'file_type': file_type, 'use_cols': 'Invoice, Price'})
+    assert list(df_projected.columns) == ['Invoice', 'Price']
+
+
+@pytest.mark.parametrize('file_type', ['parquet', 'feather'])
+def test_new_mode_versions_columnar_outputs(tmp_path, sales_df, file_type):
+    path = str(tmp_path / f'sales.{file_type}')
+    for _ in range(2):
+        FileDataStorage().write({'path': path, 'file_type': file_type, 'mode': 'new'}, sales_df)
+
+    assert (tmp_path / f'sales.{file_type}').is_file()
+    assert (tmp_path / f'sales_1.{file_type}').is_file()
+
+
+def test_read_dtypes_leave_integers_to_apply_dtype():
+    apply_dtype = {'Invoice': 'str', 'Quantity': 'int32', 'Price': 'float', 'Date': 'datetime.date',
+                   'Country': 'category', 'Weight': 'float32'}
+
+    dtype, parse_dates = FileDataStorage.get_read_dtypes(apply_dtype)
+    assert dtype == {'Invoice': 'str', 'Price': 'float64', 'Country': 'category', 'Weight': 'float32'}
+    assert parse_dates == ['Date']
+
+    # Validated reads only apply types every value converts to, so invalid values reach validation
+    dtype, parse_dates = FileDataStorage.get_read_dtypes(apply_dtype, validated=True)
+    assert dtype == {'Invoice': 'str', 'Country': 'category'}
+    assert parse_dates is None
+
+
+def test_memory_mapped_read_keeps_arrow_columns(tmp_path, sales_df):
+    path = str(tmp_path / 'sales.feather')
+    FileDataStorage().write({'path': path, 'file_type': 'feather', 'mode': 'overwrite', 'compression': 'uncompressed'},
+                            sales_df)
+
+    df_mapped = FileDataStorage().read({'path': path, 'file_type': 'feather', 'memory_map': True,
+                                        'use_cols': ['Invoice', 'Quantity']})
+
+    assert list(df_mapped.columns) == ['Invoice', 'Quantity']
+    assert all(isinstance(dtype, pd.ArrowDtype) for dtype in df_mapped.dtypes)
+    assert df_mapped['Quantity'].tolist() == sales_df['Quantity'].tolist()
+
+
+@pytest.mark.parametrize('file_type', ['parquet', 'feather'])
+def test_partitioned_directory_reads_in_chunks(tmp_path, sales_df, file_type):
+    path = str(tmp_path / 'sales')
+    write_partitions(path, sales_df, ['Date:month'], file_type)
+    config = {'path': path, 'file_type': file_type, 'chunk_size': 2, 'filter': [['Quantity', '>', 0]]}
+
+    df_chunked = pd.concat(FileDataStorage().read_chunks(config), ignore_index=True)
+
+    assert sorted(df_chunked['Invoice']) == ['489434', '489435']
+    assert set(df_chunked['Date_month']) == {'2009-12'}
+
+
+def test_version_scan_skips_other_suffixes():
+    files = ['sales.csv', 'sales_1.csv', 'sales_rejects.csv', 'sales_day1.csv', 'sales_3.xlsx']
+    assert FileDataStorage.get_avail_version_number('csv', 'sales', files) == '_2'
+
+
+def test_csv_chunks_write_one_header_after_empty_chunks(tmp_path, sales_df):
+    path = str(tmp_path / 'sales.csv')
+    chunks = [sales_df.iloc[:0], sales_df.iloc[:0], sales_df.iloc[:2], sales_df.iloc[2:]]
+
+    FileDataStorage().write_chunks({'path': path, 'file_type': 'csv', 'mode': 'overwrite'}, chunks)
+
+    with open(path) as file:
+        assert [line.split(',')[0] for line in file.read().splitlines()] == \
+            ['Invoice', '489434', '489435', 'C489436']
@@ -0,0 +1,45 @@
+import threading
+import pytest
+from utils.io_util import background, prefetch
+
+
+def _prefetch_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'test-prefetch']
+
+
+def test_prefetch_yields_every_item_in_order():
+    assert list(prefetch(iter(range(10)), queue_size=2, name='test-prefetch')) == list(range(10))
+    assert not _prefetch_threads()
+
+
+def test_prefetch_starts_no_thread_until_iterated():
+    started = threading.Event()
+
+    def produce():
+        started.set()
+        yield 1
+
+    items = prefetch(produce(), name='test-prefetch')
+    assert not _prefetch_threads() and not started.is_set()
+    del items
+    assert not _prefetch_threads()
+
+
+def test_prefetch_stops_producer_when_consumer_stops_early():
+    items = prefetch(iter(range(1000)), queue_size=1, name='test-prefetch')
+    assert next(items) == 0
+    items.close()
+    assert not _prefetch_threads()
+
+
+def test_prefetch_raises_producer_errors():
+    def produce():
+        yield 1
+        raise ValueError('bad chunk')
+
+    with pytest.raises(ValueError, match='bad chunk'):
+        list(prefetch(produce(), name='test-prefetch'))
+
+
+def test_background_returns_task_result():
+    assert background(sum, [1, 2, 3]).result(timeout=5) == 6
@@ -0,0 +1,70 @@
+import json
+import threading
+import pandas as pd
+import pytest
+import utils.log_util as logu
+from utils.log_util import log_trace
+
+
+@log_trace
+def _outer_stage(df):
+    return _inner_stage(df)
+
+
+@log_trace
+def _inner_stage(df):
+    return df[df['Total'] > 1]
+
+
+@pytest.fixture
+def metrics():
+    logu.enable_metrics()
+    yield
+    logu.disable_metrics()
+
+
+def test_log_trace_records_stage_metrics(metrics):
+    _outer_stage(pd.DataFrame({'Total': [1.0, 2.0, 3.0]}))
+
+    inner, outer = logu.get_metrics()
+    assert (inner['stage'], inner['depth'], inner['input_rows'], inner['output_rows']) == ('_inner_stage', 2, 3, 2)
+    assert (outer['stage'], outer['depth']) == ('_outer_stage', 1)
+    assert outer['wall_seconds'] >= inner['wall_seconds'] >= 0
+
+
+@pytest.mark.parametrize('report_name', ['metrics.json', 'metrics.prom'])
+def test_metrics_report_summarizes_stages(metrics, tmp_path, report_name):
+    _outer_stage(pd.DataFrame({'Total': [1.0, 2.0, 3.0]}))
+    report_path = str(tmp_path / report_name)
+
+    logu.write_metrics_report(report_path)
+
+    with open(report_path) as report_file:
+        if report_name.endswith('.prom'):
+            assert 'etl_stage_output_rows{stage="_inner_stage"} 2' in report_file.read()
+        else:
+            assert json.load(report_file)['stages']['_outer_stage']['calls'] == 1
+
+
+def test_metrics_are_not_recorded_unless_enabled():
+    _outer_stage(pd.DataFrame({'Total': [1.0]}))
+    assert logu.get_metrics() == []
+
+
+@log_trace
+def _waiting_stage(barrier, df):
+    barrier.wait(timeout=5)
+    return _inner_stage(df)
+
+
+def test_log_trace_depth_is_kept_per_thread(metrics):
+    barrier = threading.Barrier(2)
+    threads = [threading.Thread(target=_waiting_stage, args=(barrier, pd.DataFrame({'Total': [2.0]})))
+               for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted((record['stage'], record['depth']) for record in logu.get_metrics()) == \
+        [('_inner_stage', 2), ('_inner_stage', 2), ('_waiting_stage', 1), ('_waiting_stage', 1)]
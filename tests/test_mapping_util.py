@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.mapping_util import MappingIndex
+
+
+@pytest.fixture
+def mapping_index():
+    df_mapping = pd.DataFrame({'Country of Order': ['France', 'Japan', 'France'],
+                               'Region': ['Europe', 'Asia', 'Duplicate']})
+    return MappingIndex(df_mapping, 'Country of Order', 'Other')
+
+
+@pytest.mark.parametrize('dtype', ['str', 'category'])
+def test_apply_maps_keys_and_defaults_missing_ones(mapping_index, dtype):
+    df = pd.DataFrame({'Country': pd.Series(['Japan', 'Peru', 'France', 'Japan'], dtype=dtype)})
+
+    df_mapped = mapping_index.apply(df, 'Country')
+
+    # The first row of a duplicated key wins, as in a left merge followed by drop_duplicates
+    assert df_mapped['Region'].tolist() == ['Asia', 'Other', 'Europe', 'Asia']
+    assert df_mapped['Country'].tolist() == df['Country'].tolist()
+
+
+def test_get_indexer_flags_missing_keys(mapping_index):
+    indexer = mapping_index.get_indexer(pd.Series(['France', 'Peru']))
+    np.testing.assert_array_equal(indexer, [0, -1])
+
+
+def test_default_fills_only_the_fill_columns():
+    df_mapping = pd.DataFrame({'Country of Order': ['France'], 'Region': ['Europe'], 'Currency': ['EUR']})
+    mapping_index = MappingIndex(df_mapping, 'Country of Order', 'Other', fill_columns=['Region'])
+
+    df_mapped = mapping_index.apply(pd.DataFrame({'Country': ['France', 'Peru']}), 'Country')
+
+    assert df_mapped['Region'].tolist() == ['Europe', 'Other']
+    assert df_mapped['Currency'].iloc[0] == 'EUR' and pd.isna(df_mapped['Currency'].iloc[1])
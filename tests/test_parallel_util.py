@@ -0,0 +1,79 @@
+import functools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import pytest
+import utils.etl_util as etlu
+import utils.parallel_util as parallelu
+
+
+def _transform_config(agg_type, agg_method, parallel):
+    return {'output': {'col_transforms': {'add': 'Line Item Tot', 'from': ['Quantity', 'Price']},
+                       'dest_cols': ['Total', 'Percentage']},
+            'aggregate': {'type': agg_type, 'aggfunc': agg_method, 'parallel': parallel}}
+
+
+def _line_items(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'StockCode': pd.Series(rng.integers(0, 5000, rows).astype(str), dtype='str'),
+                       'Customer ID': rng.integers(10000, 20000, rows).astype(float),
+                       'Line Item Tot': rng.random(rows) * 100})
+    for column in df.columns:
+        df.loc[rng.random(rows) < 0.01, column] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('agg_type', ['pivot', 'groupby'])
+@pytest.mark.parametrize('agg_method', ['sum', 'count', 'mean'])
+def test_parallel_aggregation_matches_single_process(agg_type, agg_method):
+    df = _line_items(30000)
+    categories = ['StockCode', 'Customer ID']
+
+    list_of_serial_df = etlu.aggregate_dimensions_feature(df, categories, _transform_config(
+        agg_type, agg_method, {'enabled': False}))
+    list_of_parallel_df = etlu.aggregate_dimensions_feature(df, categories, _transform_config(
+        agg_type, agg_method, {'enabled': True, 'workers': 3, 'min_rows': 0}))
+
+    for df_serial, df_parallel in zip(list_of_serial_df, list_of_parallel_df):
+        pd.testing.assert_frame_equal(df_parallel, df_serial, check_dtype=False)
+
+
+def test_object_keys_are_shared_as_strings_under_spawn(monkeypatch):
+    # Spawned workers share no memory with the parent, as on macOS and Windows
+    monkeypatch.setattr(parallelu, 'ProcessPoolExecutor',
+                        functools.partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context('spawn')))
+    df = _line_items(3000)
+    df['StockCode'] = ('SKU-' + df['StockCode']).astype(object)
+    config = _transform_config('pivot', 'sum', {'enabled': True, 'workers': 2, 'min_rows': 0})
+
+    df_parallel, = etlu.aggregate_dimensions_feature(df, ['StockCode'], config)
+
+    expected = df.groupby('StockCode')['Line Item Tot'].sum()
+    assert df_parallel['StockCode'].tolist() == expected.index.tolist()
+    np.testing.assert_allclose(df_parallel['Total'].to_numpy(), expected.to_numpy())
+
+
+def test_mixed_object_keys_stay_in_process():
+    assert parallelu.can_partition(pd.Series(['A', None], dtype=object))
+    assert not parallelu.can_partition(pd.Series(['A', 1], dtype=object))
+
+
+@pytest.mark.skipif((os.cpu_count() or 1) < 8, reason='speed-up needs at least 8 cores')
+def test_parallel_aggregation_is_faster_above_min_rows():
+    df = _line_items(8000000)
+    config = _transform_config('pivot', 'sum', {'enabled': False})
+
+    def fastest(feature_config):
+        seconds = []
+        for _ in range(3):
+            start = time.perf_counter()
+            etlu.aggregate_dimensions_feature(df, ['Customer ID'], feature_config)
+            seconds.append(time.perf_counter() - start)
+        return min(seconds)
+
+    serial_seconds = fastest(config)
+    parallel_seconds = fastest(_transform_config('pivot', 'sum', {'enabled': True, 'workers': 8}))
+    assert parallel_seconds < serial_seconds
@@ -0,0 +1,36 @@
+import numpy as np
+from utils.sketch_util import HeavyHitters
+
+
+def test_heavy_hitters_are_exact_within_capacity():
+    sketch = HeavyHitters(capacity=3)
+    sketch.update(['A', 'B', 'A'], [1.0, 2.0, 3.0])
+    sketch.update(['C', 'B'], [0.5, 1.0])
+
+    assert sketch.top(2).to_dict() == {'A': 4.0, 'B': 3.0}
+    assert (sketch.total, sketch.error) == (7.5, 0.0)
+
+
+def test_heavy_hitters_underestimate_within_error_bound():
+    rng = np.random.default_rng(0)
+    keys = rng.zipf(1.5, 20000) % 500
+    exact = np.bincount(keys, minlength=500).astype(float)
+    sketch = HeavyHitters(capacity=50)
+    for chunk in np.array_split(keys, 10):
+        sketch.update(chunk, np.ones(len(chunk)))
+
+    top = sketch.top(5)
+    assert list(top.index) == list(np.argsort(-exact, kind='stable')[:5])
+    for key, estimate in top.items():
+        assert exact[key] - sketch.error <= estimate <= exact[key]
+    assert sketch.error <= sketch.total / (sketch.capacity + 1)
+
+
+def test_negative_weights_net_out_or_are_clipped():
+    sketch = HeavyHitters(capacity=3)
+    sketch.update(['A', 'B'], [5.0, 2.0])
+    sketch.update(['A', 'C', 'B'], [-1.0, -4.0, -3.0])
+
+    # A nets out exactly; the cancelled C and the part of B below zero are clipped
+    assert sketch.counters.to_dict() == {'A': 4.0}
+    assert (sketch.total, sketch.clipped) == (-1.0, 5.0)
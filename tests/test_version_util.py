@@ -0,0 +1,67 @@
+import os
+import threading
+import pytest
+import utils.version_util as versionu
+from utils.version_util import allocate_path, atomic_path, file_lock
+
+
+def _no_prior_versions(files):
+    return ''
+
+
+def test_concurrent_allocations_get_distinct_paths(tmp_path):
+    paths = []
+
+    def allocate():
+        paths.append(allocate_path(str(tmp_path), 'sales', 'csv', _no_prior_versions))
+
+    threads = [threading.Thread(target=allocate) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(os.path.basename(path) for path in paths) == \
+        ['sales.csv'] + [f'sales_{number}.csv' for number in range(1, 8)]
+    assert not (tmp_path / versionu.LOCK_NAME).exists()
+
+
+def test_allocation_skips_names_taken_outside_the_manifest(tmp_path):
+    (tmp_path / 'sales.csv').write_text('')
+    (tmp_path / 'sales_1.csv').write_text('')
+
+    assert allocate_path(str(tmp_path), 'sales', 'csv', lambda files: '_1') == str(tmp_path / 'sales_2.csv')
+
+
+def test_atomic_path_replaces_the_output_once_written(tmp_path):
+    final_path = tmp_path / 'sales.csv'
+    final_path.write_text('old')
+
+    with atomic_path(str(final_path)) as temp_path:
+        with open(temp_path, 'w') as file:
+            file.write('new')
+        assert final_path.read_text() == 'old'
+
+    assert final_path.read_text() == 'new'
+    assert os.listdir(tmp_path) == ['sales.csv']
+
+
+def test_atomic_path_drops_partial_output_and_placeholder_on_failure(tmp_path):
+    final_path = allocate_path(str(tmp_path), 'sales', 'csv', _no_prior_versions)
+
+    with pytest.raises(ValueError):
+        with atomic_path(final_path) as temp_path:
+            with open(temp_path, 'w') as file:
+                file.write('partial')
+            raise ValueError('write failed')
+
+    assert os.listdir(tmp_path) == [versionu.MANIFEST_NAME]
+
+
+def test_file_lock_times_out_while_held(tmp_path):
+    lock_path = str(tmp_path / 'test.lock')
+    with file_lock(lock_path):
+        with pytest.raises(TimeoutError):
+            with file_lock(lock_path, timeout=0.05):
+                pass
+    assert not os.path.exists(lock_path)
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+from utils.version_util import atomic_path
+
+# Directory name of caches kept next to the files they derive from
+CACHE_DIR_NAME = '.etl_cache'
+# Size bound of a stage result cache directory, least recently used entries are evicted past it
+DEFAULT_MAX_SIZE_MB = 1024
+# Configuration entries that name where data lives rather than what is computed from it
+LOCATION_KEYS = ('path', 'description', 'mode')
+
+# In-process caches, so repeated lookups within one run only cost a stat call
+_DIGESTS = {}
+_OBJECTS = {}
+
+
+def file_digest(path):
+    """ Compute the sha256 content hash of a file. The hash is remembered
+        for the file's path, mtime and size, so an unchanged file is only
+        hashed once per process
+
+    param path: str
+        path of the file to hash
+    return: str
+        hexadecimal digest of the file content
+    """
+    stat = os.stat(path)
+    fingerprint = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if fingerprint not in _DIGESTS:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        _DIGESTS[fingerprint] = digest.hexdigest()
+    return _DIGESTS[fingerprint]
+
+
+def make_key(*parts):
+    """ Build a cache key out of any JSON serializable parts
+
+    param parts: various
+        values the cached object depends on
+    return: str
+        hexadecimal digest of the given parts
+    """
+    serialized = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+def config_fingerprint(config):
+    """ Reduce a configuration to what determines a computed result, leaving
+        out file locations and naming callables by their qualified name
+
+    param config: various
+        configuration mapping, or any value within one
+    return: various
+        JSON serializable fingerprint, for make_key
+    """
+    if isinstance(config, dict):
+        return {key: config_fingerprint(value) for key, value in config.items() if key not in LOCATION_KEYS}
+    if isinstance(config, (list, tuple)):
+        return [config_fingerprint(value) for value in config]
+    if callable(config):
+        return f'{getattr(config, "__module__", "")}.{getattr(config, "__qualname__", repr(config))}'
+    return config
+
+
+def load_cached(cache_dir, key, keep_in_memory=True):
+    """ Look up a cached object, first in process memory then in cache directory.
+        A hit refreshes the entry's modification time, which orders evictions
+
+    param cache_dir: str
+        directory holding the cached objects, None to look in process memory only
+    param key: str
+        cache key of the object
+    param keep_in_memory: bool
+        keep the object loaded from cache directory in process memory too
+    return: various
+        cached object, or None on a miss
+    """
+    cache_path = os.path.join(cache_dir, key + '.pkl') if cache_dir else None
+    if key in _OBJECTS:
+        try:
+            if cache_path:
+                os.utime(cache_path)
+        except FileNotFoundError:
+            pass
+        logging.info(f'Cache hit <{key}> in memory')
+        return _OBJECTS[key]
+    if cache_path is None:
+        logging.info(f'Cache miss <{key}> in memory')
+        return None
+    if os.path.isfile(cache_path):
+        with open(cache_path, 'rb') as file:
+            obj = pickle.load(file)
+        os.utime(cache_path)
+        if keep_in_memory:
+            _OBJECTS[key] = obj
+        logging.info(f'Cache hit <{key}> in <{cache_dir}>')
+        return obj
+    logging.info(f'Cache miss <{key}> in <{cache_dir}>')
+    return None
+
+
+def store_cached(cache_dir, key, obj, keep_in_memory=True):
+    """ Store an object in process memory and in cache directory
+
+    param cache_dir: str
+        directory holding the cached objects, None to keep the object in process memory only
+    param key: str
+        cache key of the object
+    param obj: various
+        picklable object to cache
+    param keep_in_memory: bool
+        keep the object in process memory too, for objects small enough to hold on to
+    return: None
+    """
+    if keep_in_memory:
+        _OBJECTS[key] = obj
+    if not cache_dir:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, key + '.pkl')
+    with atomic_path(cache_path) as temp_path:
+        with open(temp_path, 'wb') as file:
+            pickle.dump(obj, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def evict_cached(cache_dir, max_bytes):
+    """ Remove least recently used entries of cache directory, until its
+        entries take no more than max_bytes
+
+    param cache_dir: str
+        directory holding the cached objects
+    param max_bytes: int
+        size bound of the cache directory
+    return: int
+        number of evicted entries
+    """
+    entries = []
+    for entry in os.scandir(cache_dir):
+        # Hidden entries are objects still being written, see atomic_path
+        if entry.name.endswith('.pkl') and not entry.name.startswith('.'):
+            stat = entry.stat()
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    total_bytes = sum(size for _, size, _ in entries)
+
+    evicted = 0
+    for _, size, path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        _OBJECTS.pop(os.path.basename(path)[:-len('.pkl')], None)
+        total_bytes -= size
+        evicted += 1
+    if evicted:
+        logging.info(f'Cache evicted <{evicted}> entries from <{cache_dir}>, keeping <{total_bytes}> bytes')
+    return evicted
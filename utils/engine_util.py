@@ -0,0 +1,132 @@
+import os
+from utils.partition_util import open_dataset
+
+# Aggregation functions every engine supports, by pandas name
+ENGINE_AGG_FUNCS = {'sum': ('SUM', 'sum'),
+                    'count': ('COUNT', 'count'),
+                    'mean': ('AVG', 'mean'),
+                    'min': ('MIN', 'min'),
+                    'max': ('MAX', 'max')}
+# Columnar file types an engine scans directly
+SCAN_FILE_TYPES = ('parquet', 'arrow', 'feather')
+ROW_NUMBER_COL = '__row_number'
+
+
+def aggregate_with_engine(engine, source, categories, value_expr, value_col, agg_method, sort_keys):
+    """ Aggregate a value by each of the given categories on an embedded
+        multi-threaded engine, with the semantics of the pandas path:
+        missing keys are left out, groups are sorted by key when sort_keys
+        is set and in order of first appearance otherwise
+
+    param engine: str
+        'duckdb' or 'polars'
+    param source: pandas dataframe or tuple of (str, str)
+        dataframe, or (path, file_type) of a columnar file or partitioned
+        dataset directory to scan directly
+    param categories: list of str
+        aggregation index names
+    param value_expr: str or tuple of (str, str)
+        column to aggregate, or two columns to aggregate the product of
+    param value_col: str
+        name of the aggregated column in results
+    param agg_method: str
+        'sum', 'count', 'mean', 'min' or 'max'
+    param sort_keys: bool
+        sort groups by key rather than by first appearance
+    returns: list of pandas dataframes
+        one [category, value_col] df per given category
+    """
+    if agg_method not in ENGINE_AGG_FUNCS:
+        raise ValueError(f'Aggregation function <{agg_method}> is not supported by engine <{engine}>')
+    if engine == 'duckdb':
+        return _aggregate_duckdb(source, categories, value_expr, value_col, agg_method, sort_keys)
+    if engine == 'polars':
+        return _aggregate_polars(source, categories, value_expr, value_col, agg_method, sort_keys)
+    raise ValueError(f'Unknown aggregation engine <{engine}>')
+
+
+def _aggregate_duckdb(source, categories, value_expr, value_col, agg_method, sort_keys):
+    """ DuckDB aggregation of every category in a single scan, using grouping sets """
+    import duckdb
+
+    connection = duckdb.connect()
+    try:
+        if isinstance(source, tuple):
+            path, file_type = source
+            if os.path.isdir(path) and file_type == 'parquet':
+                # Partitioned dataset directory, as written with 'partition_by'
+                relation = connection.read_parquet(os.path.join(path, '**', '*.parquet'), hive_partitioning=True)
+            elif os.path.isdir(path):
+                relation = connection.from_arrow(open_dataset(path, file_type))
+            elif file_type == 'parquet':
+                relation = connection.read_parquet(path)
+            else:
+                import pyarrow.feather
+                relation = connection.from_arrow(pyarrow.feather.read_table(path, memory_map=True))
+        else:
+            relation = connection.from_df(source)
+        connection.register('source', relation)
+
+        if isinstance(value_expr, str):
+            value_sql = _quote(value_expr)
+        else:
+            value_sql = f'{_quote(value_expr[0])} * {_quote(value_expr[1])}'
+        agg_sql = f'{ENGINE_AGG_FUNCS[agg_method][0]}({value_sql})'
+        if agg_method == 'sum':
+            agg_sql = f'COALESCE({agg_sql}, 0)'
+
+        quoted = [_quote(category) for category in categories]
+        select_keys = ', '.join(quoted)
+        grouping = ', '.join(f'GROUPING({column}) AS {_quote("__grouping_" + str(index))}'
+                             for index, column in enumerate(quoted))
+        sets = ', '.join(f'({column})' for column in quoted)
+        df_result = connection.execute(
+            f'SELECT {select_keys}, {grouping}, {agg_sql} AS {_quote(value_col)}, '
+            f'MIN({ROW_NUMBER_COL}) AS {ROW_NUMBER_COL} '
+            f'FROM (SELECT *, ROW_NUMBER() OVER () AS {ROW_NUMBER_COL} FROM source) '
+            f'GROUP BY GROUPING SETS ({sets})').df()
+    finally:
+        connection.close()
+
+    list_of_aggregated_df = []
+    for index, category in enumerate(categories):
+        # Rows of this category's grouping set, without the missing key group
+        df_category = df_result[(df_result[f'__grouping_{index}'] == 0) & df_result[category].notna()]
+        df_category = df_category.sort_values(category if sort_keys else ROW_NUMBER_COL, kind='stable')
+        list_of_aggregated_df.append(df_category[[category, value_col]].reset_index(drop=True))
+    return list_of_aggregated_df
+
+
+def _aggregate_polars(source, categories, value_expr, value_col, agg_method, sort_keys):
+    """ Polars lazy aggregation of every category, collected together so the scan is shared """
+    import polars as pl
+
+    if isinstance(source, tuple):
+        path, file_type = source
+        if os.path.isdir(path) and file_type == 'parquet':
+            # Partitioned dataset directory, as written with 'partition_by'
+            frame = pl.scan_parquet(os.path.join(path, '**', '*.parquet'), hive_partitioning=True)
+        elif os.path.isdir(path):
+            frame = pl.scan_pyarrow_dataset(open_dataset(path, file_type))
+        else:
+            frame = pl.scan_parquet(path) if file_type == 'parquet' else pl.scan_ipc(path)
+    else:
+        frame = pl.from_pandas(source).lazy()
+
+    if isinstance(value_expr, str):
+        value = pl.col(value_expr)
+    else:
+        value = pl.col(value_expr[0]) * pl.col(value_expr[1])
+    value = getattr(value, ENGINE_AGG_FUNCS[agg_method][1])().alias(value_col)
+
+    queries = []
+    for category in categories:
+        query = frame.filter(pl.col(category).is_not_null()) \
+                     .group_by(category, maintain_order=True).agg(value)
+        queries.append(query.sort(category) if sort_keys else query)
+    return [df_result.to_pandas() for df_result in pl.collect_all(queries)]
+
+
+def _quote(identifier):
+    """ Quote an identifier for SQL """
+    return '"' + identifier.replace('"', '""') + '"'
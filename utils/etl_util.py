@@ -1,11 +1,35 @@
+import logging
 import os
 import sys
+import numpy as np
 import pandas as pd
 import datetime
 sys.path.append(os.getcwd())
+import utils.cache_util as cacheu
+import utils.engine_util as engineu
 import utils.misc_util as miscu
-from utils.file_util import FileDataStorage
+import utils.parallel_util as parallelu
+from utils.file_util import FileDataStorage, INT_TYPES, FLOAT_TYPES, CATEGORY_TYPE
+from utils.mapping_util import MappingIndex
+from utils.sketch_util import HeavyHitters, MIN_SKETCH_SIZE
 from utils.log_util import log_trace
+from utils.version_util import atomic_path
+
+# Time grains of rollup cubes, with the grains a cube of each one rolls up to
+TIME_GRAINS = {'day': ('day', 'week', 'month', 'quarter', 'year'),
+               'week': ('week',),
+               'month': ('month', 'quarter', 'year'),
+               'quarter': ('quarter', 'year'),
+               'year': ('year',)}
+PERIOD_FREQUENCIES = {'week': 'W', 'month': 'M', 'quarter': 'Q', 'year': 'Y'}
+# Row count measure of rollup cubes
+ROLLUP_ROWS_COL = 'Rows'
+# Operators of the 'filter' read configuration
+FILTER_OPS = ('=', '==', '!=', '<', '<=', '>', '>=', 'in', 'not in', 'startswith', 'not startswith')
+# Reason code column of records rejected by validation
+REJECT_REASON_COL = 'Reject Reason'
+# Mapped columns taking the mapping default value for keys missing from the mapping
+MAPPING_FILL_COLUMNS = ('Region',)
 
 
 def apply_dtype_feature(df, config):
@@ -18,12 +42,17 @@ def apply_dtype_feature(df, config):
     "apply_dtype": {
         "INSURANCE_CODE": "str",
         "INSURANCE_AMOUNT": "float",
-        "CLIENT_TYPE": "int"
+        "CLIENT_TYPE": "int",
+        "CLIENT_STATE": "category",
+        "CLIENT_AGE": "int8"
     }
     """
     if config and isinstance(config, dict):
         for column_key, type_value in config.items():
             if column_key in df:
+                # Columnar sources keep their types, so there is nothing to re-cast.
+                if _matches_dtype(df[column_key], type_value):
+                    continue
                 # str type.
                 if type_value is str or type_value == 'str':
                     df[column_key] = df[column_key].fillna('')
@@ -39,6 +68,15 @@ def apply_dtype_feature(df, config):
                 # datetime type
                 elif type_value is datetime.date or type_value == 'datetime.date':
                     df[column_key] = pd.to_datetime(df[column_key])
+                # category type, for low-cardinality strings.
+                elif type_value == CATEGORY_TYPE:
+                    df[column_key] = df[column_key].astype(CATEGORY_TYPE)
+                # Downcast int types.
+                elif type_value in INT_TYPES:
+                    df[column_key] = df[column_key].fillna(0).astype(type_value)
+                # Downcast float types.
+                elif type_value in FLOAT_TYPES:
+                    df[column_key] = df[column_key].fillna(0.0).astype(type_value)
             else:
                 raise KeyError(f'Column <{column_key}> is missing from given dataframe')
 
@@ -47,42 +85,369 @@ def apply_dtype_feature(df, config):
     return df
 
 
+def _matches_dtype(series, type_value):
+    """
+    Check whether given column already holds the configured type without missing values
+    :param series: pd.Series; Provided column
+    :param type_value: type or str; Configured type
+    :return: bool; True if no cast is needed
+    """
+    if type_value is datetime.date or type_value == 'datetime.date':
+        return pd.api.types.is_datetime64_any_dtype(series)
+    if type_value is str or type_value == 'str':
+        matches = pd.api.types.is_string_dtype(series)
+    elif type_value is int or type_value == 'int':
+        matches = pd.api.types.is_integer_dtype(series)
+    elif type_value is float or type_value == 'float':
+        matches = pd.api.types.is_float_dtype(series)
+    elif type_value == CATEGORY_TYPE:
+        # Dictionary encoded Arrow columns of memory mapped inputs are categories too
+        if isinstance(series.dtype, pd.ArrowDtype):
+            import pyarrow as pa
+            return pa.types.is_dictionary(series.dtype.pyarrow_dtype)
+        return isinstance(series.dtype, pd.CategoricalDtype)
+    elif type_value in INT_TYPES + FLOAT_TYPES:
+        dtype = series.dtype.numpy_dtype if isinstance(series.dtype, pd.ArrowDtype) else series.dtype
+        matches = dtype == type_value
+    else:
+        matches = False
+    return matches and not series.hasnans
+
+
 @log_trace
-def mapping_feature(df, config):
+def mapping_feature(df, config, mapping_index=None, rejects=None):
     """
     ETL feature to merge given dataframe with extracted mapping dataframe
+    A single key mapping is applied through a cached lookup index, while multiple keys fall back to a merge
+    With 'reject_unmapped' set, records missing from the mapping are rejected (unmapped:<left_on>) instead
+    of taking the default value
     :param df: pd.DataFrame; Provided dataframe
     :param config: dict; Provided feature configuration
+    :param mapping_index: MappingIndex; default=None; Already compiled index, compiled from config if not given
+    :param rejects: list; default=None; List rejected records are appended to
     :return: df_target: pd.DataFrame; Resulted dataframe
     """
-    df_mapping = read_feature(config['read'])
-    df_target = pd.merge(df, df_mapping, how='left',
-                         left_on=miscu.eval_elem_mapping(config, 'left_on'),
-                         right_on=miscu.eval_elem_mapping(config, 'right_on'))
-    df_target['Region'] = df_target['Region'].fillna('Other')
-    df_target.drop(columns=miscu.eval_elem_mapping(config, 'right_on'), inplace=True)
+    left_on = miscu.eval_elem_mapping(config, 'left_on')
+    right_on = miscu.eval_elem_mapping(config, 'right_on')
+    default_value = miscu.eval_elem_mapping(config, 'default_value', default_value='Other')
+    reject_unmapped = miscu.eval_elem_mapping(config, 'reject_unmapped', default_value=False)
+
+    if len(left_on) == 1 and len(right_on) == 1:
+        if mapping_index is None:
+            mapping_index = compile_mapping_feature(config)
+        if not reject_unmapped:
+            return mapping_index.apply(df, left_on[0])
+        unmapped = mapping_index.get_indexer(df[left_on[0]]) == -1
+        df_target = mapping_index.apply(df, left_on[0])
+    else:
+        df_mapping = read_feature(config['read'])
+        df_target = pd.merge(df, df_mapping, how='left', left_on=left_on, right_on=right_on,
+                             indicator=reject_unmapped)
+        for column in MAPPING_FILL_COLUMNS:
+            df_target[column] = df_target[column].fillna(default_value)
+        df_target.drop(columns=right_on, inplace=True)
+        if not reject_unmapped:
+            return df_target
+        unmapped = (df_target.pop('_merge') == 'left_only').to_numpy()
 
+    if unmapped.any():
+        logging.warning(f'Mapping rejected <{int(unmapped.sum())}> unmapped records')
+        if rejects is not None:
+            rejects.append(df_target[unmapped].assign(**{REJECT_REASON_COL: f'unmapped:{",".join(left_on)}'})
+                           .reset_index(drop=True))
+        df_target = df_target[~unmapped].reset_index(drop=True)
     return df_target
 
 
 @log_trace
-def read_feature(config):
+def compile_mapping_feature(config, stage_cache=None):
+    """
+    ETL feature to compile the mapping file into a lookup index keyed on its single 'right_on' column
+    The index is cached by the file's content hash and read configuration in process memory, and in the stage
+    cache directory when one is given, so unchanged mapping files are not re-read
+    :param config: dict; Provided mapping feature configuration
+    :param stage_cache: dict; default=None; Stage cache with its 'dir' and 'max_bytes' bound, see etldata -cache
+    :return: MappingIndex; Compiled lookup index
+    """
+    read_config = config['read']
+    path = miscu.eval_elem_mapping(read_config, 'path')
+    right_on = miscu.eval_elem_mapping(config, 'right_on')
+    default_value = miscu.eval_elem_mapping(config, 'default_value', default_value='Other')
+    cache_dir = miscu.eval_elem_mapping(stage_cache, 'dir')
+
+    FileDataStorage.validate_path(path)
+    read_settings = {key: value for key, value in read_config.items() if key not in ('path', 'description')}
+    cache_key = cacheu.make_key('mapping', cacheu.file_digest(path), read_settings, right_on, default_value,
+                                MAPPING_FILL_COLUMNS)
+
+    mapping_index = cacheu.load_cached(cache_dir, cache_key)
+    if mapping_index is None:
+        df_mapping = read_feature(read_config)
+        mapping_index = MappingIndex(df_mapping, right_on[0], default_value, MAPPING_FILL_COLUMNS)
+        cacheu.store_cached(cache_dir, cache_key, mapping_index)
+        if cache_dir:
+            cacheu.evict_cached(cache_dir, stage_cache['max_bytes'])
+
+    return mapping_index
+
+
+@log_trace
+def read_feature(config, rejects=None):
     """
     ETL feature to read a file, based on provided ETL configuration section
-    This is a composite feature, since it can call apply_dtype_feature, if appropriate config section exists
+    This is a composite feature, since it calls prepare_feature to type, validate and filter the records read
     :param config: dict; Provided configuration mapping
+    :param rejects: list; default=None; List rejected records are appended to, when validation is enabled
     :return: pd.DataFrame; Resulted dataframe
     """
     df_target = FileDataStorage().read(config=config)
 
-    df_target.columns = df_target.columns.str.strip()
+    return prepare_feature(df_target, config, rejects)
 
-    # Call apply_dtype_feature, if appropriate config section exists
+
+def read_chunks_feature(config, rejects=None):
+    """
+    ETL feature to read a file in chunks, based on provided ETL configuration section
+    Each chunk goes through the same prepare_feature as the records of read_feature
+    :param config: dict; Provided configuration mapping, including 'chunk_size'
+    :param rejects: list; default=None; List rejected records are appended to, when validation is enabled
+    :return: generator of pd.DataFrame; Resulted dataframe chunks
+    """
+    for df_chunk in FileDataStorage().read_chunks(config=config):
+        yield prepare_feature(df_chunk, config, rejects)
+
+
+def prepare_feature(df, config, rejects=None):
+    """
+    ETL feature to strip column names, then validate, type and filter records, based on a read configuration
+    Validation, if enabled, takes the records failing it out before apply_dtype_feature casts the rest
+    :param df: pd.DataFrame; Provided dataframe
+    :param config: dict; Provided read configuration mapping
+    :param rejects: list; default=None; List rejected records are appended to, when validation is enabled
+    :return: pd.DataFrame; Resulted dataframe
+    """
+    df.columns = df.columns.str.strip()
+
+    # Call validate_feature, if enabled in appropriate config section
     apply_dtype_config = miscu.eval_elem_mapping(config, 'apply_dtype')
+    validate_config = miscu.eval_elem_mapping(config, 'validate')
+    if miscu.eval_elem_mapping(validate_config, 'enabled'):
+        df, df_rejected = validate_feature(df, apply_dtype_config, validate_config)
+        if rejects is not None and len(df_rejected.index):
+            rejects.append(df_rejected)
+
+    # Filtered columns left out of apply_dtype, e.g. partition keys, are carried along until filtered on
+    filters = miscu.eval_elem_mapping(config, 'filter')
+    untyped_columns = [column for column in dict.fromkeys(column for column, _, _ in filters or [])
+                       if apply_dtype_config and column not in apply_dtype_config and column in df]
+
+    # Call apply_dtype_feature, if appropriate config section exists
     if apply_dtype_config:
-        df_target = apply_dtype_feature(df_target, apply_dtype_config)
+        df_typed = apply_dtype_feature(df, apply_dtype_config)
+        df = pd.concat([df_typed, df[untyped_columns]], axis=1) if untyped_columns else df_typed
 
-    return df_target
+    # Call filter_feature, if appropriate config section exists
+    if filters:
+        df = filter_feature(df, filters)
+    if untyped_columns:
+        df = df.drop(columns=untyped_columns)
+
+    return df
+
+
+def validate_feature(df, apply_dtype, config):
+    """
+    ETL feature to split a dataframe into valid and rejected records, in bulk.
+    Columns are coerced to their 'apply_dtype' type with invalid values turned into missing ones, and a record
+    is rejected when a value of it does not coerce (invalid_<type>:<column>), breaks a configured rule
+    (rule:<column><operator><value>) or its column is missing altogether (missing_column:<column>).
+    Rules take the form of filter conditions, which every record with a value in the column has to meet.
+    :param df: pd.DataFrame; Provided dataframe
+    :param apply_dtype: dict; Provided column to type mapping, as for apply_dtype_feature
+    :param config: dict; Provided validation configuration, with 'rules'
+    :return: tuple of pd.DataFrame; Valid records with coerced columns, and rejected records as read,
+             with their reason codes in REJECT_REASON_COL
+    Sample:
+    "validate": {
+        "enabled": true,
+        "rules": [
+            ["Quantity", ">=", 0],
+            ["Price", ">=", 0]
+        ]
+    }
+    """
+    num_records = len(df.index)
+    coerced = {}
+    violations = []
+    for column_key, type_value in (apply_dtype or {}).items():
+        if column_key not in df:
+            violations.append((f'missing_column:{column_key}', np.ones(num_records, dtype=bool)))
+            coerced[column_key] = pd.Series(np.nan, index=df.index, dtype=object)
+            continue
+        series, invalid = _coerce_column(df[column_key], type_value)
+        if series is not None:
+            coerced[column_key] = series
+            violations.append((f'invalid_{_get_type_name(type_value)}:{column_key}', invalid))
+
+    df_coerced = df.assign(**coerced)
+    for column, operator, value in miscu.eval_elem_mapping(config, 'rules', default_value=[]):
+        if column not in df_coerced:
+            raise KeyError(f'Validation rule column <{column}> is missing from given dataframe')
+        series = df_coerced[column]
+        violations.append((f'rule:{column}{operator}{value}',
+                           ~_get_condition(series, column, operator, value) & series.notna().to_numpy()))
+
+    rejected = np.zeros(num_records, dtype=bool)
+    for _, violation in violations:
+        rejected |= violation
+    if not rejected.any():
+        return df_coerced, df.iloc[:0].assign(**{REJECT_REASON_COL: pd.Series(dtype=str)})
+
+    # Reason codes are only built for rejected records, one vectorized concatenation per check
+    reasons = np.full(int(rejected.sum()), '', dtype=object)
+    for reason_code, violation in violations:
+        violation = violation[rejected]
+        reasons[violation] = reasons[violation] + ';' + reason_code
+    df_rejected = df[rejected].assign(**{REJECT_REASON_COL: [reason[1:] for reason in reasons]})
+
+    logging.warning(f'Validation rejected <{len(df_rejected.index)}> of <{num_records}> records')
+    return df_coerced[~rejected].reset_index(drop=True), df_rejected.reset_index(drop=True)
+
+
+def _coerce_column(series, type_value):
+    """
+    Coerce a column to a configured type, turning values that do not convert into missing ones
+    :param series: pd.Series; Provided column
+    :param type_value: type or str; Configured type
+    :return: tuple of (pd.Series, np.ndarray); Coerced column and its invalid value mask,
+             (None, None) for types every value converts to
+    """
+    if _matches_dtype(series, type_value) or type_value in (str, 'str', CATEGORY_TYPE):
+        return None, None
+    if type_value is datetime.date or type_value == 'datetime.date':
+        coerced = pd.to_datetime(series, errors='coerce')
+        return coerced, (series.notna() & coerced.isna()).to_numpy()
+
+    coerced = pd.to_numeric(series, errors='coerce')
+    invalid = series.notna() & coerced.isna()
+    if type_value in (int, 'int') or type_value in INT_TYPES:
+        # Integers also have to be whole and within the range of the configured type
+        bounds = np.iinfo('int64' if type_value in (int, 'int') else type_value)
+        invalid |= coerced.notna() & ((coerced % 1 != 0) | (coerced < bounds.min) | (coerced > bounds.max))
+    return coerced, invalid.to_numpy()
+
+
+def _get_type_name(type_value):
+    """ Name of a configured type in reason codes """
+    if type_value is datetime.date or type_value == 'datetime.date':
+        return 'date'
+    return getattr(type_value, '__name__', type_value)
+
+
+def filter_feature(df, filters):
+    """
+    ETL feature to keep the rows of a dataframe that meet every given filter, in one vectorized mask.
+    Values are compared as the column's type, so a date column is compared with a date string as a date.
+    :param df: pd.DataFrame; Provided dataframe
+    :param filters: list; [column, operator, value] filters, operators as in FILTER_OPS
+    :return: pd.DataFrame; Resulted dataframe
+    Sample:
+    "filter": [
+        ["Date", ">=", "2010-01-01"],
+        ["Invoice", "not startswith", "C"],
+        ["Country", "in", ["France", "Germany"]]
+    ]
+    """
+    mask = np.ones(len(df.index), dtype=bool)
+    for column, operator, value in filters:
+        if column not in df:
+            raise KeyError(f'Filter column <{column}> is missing from given dataframe')
+        mask &= _get_condition(df[column], column, operator, value)
+
+    if mask.all():
+        return df
+    logging.info(f'Filter kept <{int(mask.sum())}> of <{len(mask)}> records')
+    return df[mask].reset_index(drop=True)
+
+
+def _get_condition(series, column, operator, value):
+    """
+    Evaluate one [column, operator, value] condition on a column, in bulk
+    :param series: pd.Series; Provided column
+    :param column: str; Column name, for error messages
+    :param operator: str; Condition operator, as in FILTER_OPS
+    :param value: various; Condition value, a list for 'in' and 'not in'
+    :return: np.ndarray; Boolean mask of the records meeting the condition, False for missing values
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Unordered categories only support equality, so compare their values instead
+        series = series.astype(series.cat.categories.dtype)
+    if operator in ('in', 'not in'):
+        condition = series.isin([_get_filter_value(series, item) for item in value])
+        condition = ~condition if operator == 'not in' else condition
+    elif operator in ('startswith', 'not startswith'):
+        condition = series.astype(str).str.startswith(str(value))
+        condition = ~condition if operator == 'not startswith' else condition
+    elif operator in ('=', '=='):
+        condition = series == _get_filter_value(series, value)
+    elif operator == '!=':
+        condition = series != _get_filter_value(series, value)
+    elif operator == '<':
+        condition = series < _get_filter_value(series, value)
+    elif operator == '<=':
+        condition = series <= _get_filter_value(series, value)
+    elif operator == '>':
+        condition = series > _get_filter_value(series, value)
+    elif operator == '>=':
+        condition = series >= _get_filter_value(series, value)
+    else:
+        raise ValueError(f'Unknown filter operator <{operator}> of <{column}>, elect one of {list(FILTER_OPS)}')
+    return condition.to_numpy(dtype=bool, na_value=False)
+
+
+def _get_filter_value(series, value):
+    """ Cast a configured filter value to the type of the filtered column """
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return pd.Timestamp(value)
+    if pd.api.types.is_numeric_dtype(series.dtype) and isinstance(value, str):
+        return float(value)
+    return value
+
+
+def projection_feature(read_config, used_columns, input_plugin=None):
+    """
+    ETL feature to plan the columns a run reads: the given used columns and the filtered columns.
+    They become 'use_cols' of the read configuration, and 'apply_dtype' is limited to them, so the
+    reader parses and casts only those. A configured 'use_cols' or an input plugin, which may
+    need any column, leaves the read configuration as is.
+    :param read_config: dict; Provided read configuration, updated in place
+    :param used_columns: list; Columns the feature uses, in order
+    :param input_plugin: callable; Input plugin of the run, if any
+    :return: dict; Resulted read configuration
+    """
+    if input_plugin or not used_columns or miscu.eval_elem_mapping(read_config, 'use_cols'):
+        return read_config
+
+    filters = miscu.eval_elem_mapping(read_config, 'filter', default_value=[])
+    planned_columns = list(dict.fromkeys(list(used_columns) + [column for column, _, _ in filters]))
+    read_config['use_cols'] = planned_columns
+
+    apply_dtype_config = miscu.eval_elem_mapping(read_config, 'apply_dtype')
+    if apply_dtype_config:
+        read_config['apply_dtype'] = {column: type_value for column, type_value in apply_dtype_config.items()
+                                      if column in planned_columns}
+    logging.info(f'Planned read of columns <{planned_columns}>')
+    return read_config
+
+
+@log_trace
+def combine_chunks_feature(chunks):
+    """
+    ETL feature to combine dataframe chunks into one dataframe
+    :param chunks: list of pd.DataFrame; Provided dataframe chunks
+    :return: pd.DataFrame; Resulted dataframe
+    """
+    return pd.concat(chunks, ignore_index=True)
 
 
 @log_trace
@@ -129,13 +494,34 @@ def write_feature(config, df):
 
 
 @log_trace
-def transform_feature(df, config):
+def write_chunks_feature(config, chunks):
+    """ Write given dataframe chunks incrementally to local destination
+        using the correct configuration
+
+    param config: dict
+        file write configurations
+    param chunks: iterable of pandas dataframes
+        dataframe chunks to append to disk, in order
+    returns: None
+    """
+
+    FileDataStorage().write_chunks(config=config, chunks=chunks)
+    return
+
+
+@log_trace
+def transform_feature(df, config, state_path=None, input_key=None):
     """ Make transformations to df
 
     param df: pandas dataframe
         df to be transformed
     param config:
         map of transformation configs
+    param state_path: str
+        optional aggregate state file; when given, df only holds new rows
+        and its aggregates are merged into the persisted ones
+    param input_key: str
+        optional identifier of df's source, to not merge the same input twice
     returns: pandas dataframe
         df with necessary transformations
     """
@@ -149,25 +535,376 @@ def transform_feature(df, config):
     # Get destination sheet names
     dest_sheet_names = miscu.eval_elem_mapping(output_transform_configs, 'sheet_naming')
 
-    # Get destination columns names
-    dest_col_names = miscu.eval_elem_mapping(output_transform_configs, 'dest_cols')
-
     # Begin transformations
     # First adding a line item for total price (quantity * unit price)
     # Performing the necessary aggregations
     # Returning final dataframes
     df[column_to_add] = df[columns_to_use_for_transformation[0]] * df[columns_to_use_for_transformation[1]]
-    list_of_transformed_df = []
-    for category in dest_sheet_names:
-        transforming_df = df.copy()
-        transforming_df = aggregate_feature(transforming_df, category, config)
+    list_of_transformed_df = aggregate_dimensions_feature(df, dest_sheet_names, config)
+
+    return _finish_transform(list_of_transformed_df, config, state_path, input_key)
+
+
+@log_trace
+def transform_scan_feature(read_config, config, state_path=None, input_key=None):
+    """ Make the transformations of transform_feature straight from a
+        columnar input file, which the configured aggregation engine scans
+        without loading it into a pandas dataframe first
+
+    param read_config: dict
+        input read configurations, with a parquet, arrow or feather file_type
+    param config:
+        map of transformation configs, with a non pandas aggregate engine
+    param state_path: str
+        optional aggregate state file, see transform_feature
+    param input_key: str
+        optional identifier of the input, see transform_feature
+    returns: list of pandas dataframes
+        one transformed df per destination sheet
+    """
+
+    output_transform_configs = miscu.eval_elem_mapping(config, 'output')
+    col_transformation_configs = miscu.eval_elem_mapping(output_transform_configs, 'col_transforms')
+    columns_to_use_for_transformation = miscu.eval_elem_mapping(col_transformation_configs, "from")
+    dest_sheet_names = miscu.eval_elem_mapping(output_transform_configs, 'sheet_naming')
+    dest_col_names = miscu.eval_elem_mapping(output_transform_configs, 'dest_cols')
+
+    agg_configs = miscu.eval_elem_mapping(config, 'aggregate')
+    source = (miscu.eval_elem_mapping(read_config, 'path'), miscu.eval_elem_mapping(read_config, 'file_type'))
+    list_of_transformed_df = engineu.aggregate_with_engine(
+        miscu.eval_elem_mapping(agg_configs, 'engine', default_value='pandas'), source, dest_sheet_names,
+        tuple(columns_to_use_for_transformation[:2]), dest_col_names[0],
+        miscu.eval_elem_mapping(agg_configs, 'aggfunc'),
+        miscu.eval_elem_mapping(agg_configs, 'type').lower() == 'pivot')
+
+    return _finish_transform(list_of_transformed_df, config, state_path, input_key)
+
+
+def _finish_transform(list_of_transformed_df, config, state_path, input_key, ranked_categories=()):
+    """ Merge aggregates into the persisted state, if any, keep the top_k
+        groups of configured categories not ranked yet and add the percentage column
+    """
+
+    output_transform_configs = miscu.eval_elem_mapping(config, 'output')
+    dest_sheet_names = miscu.eval_elem_mapping(output_transform_configs, 'sheet_naming')
+    dest_col_names = miscu.eval_elem_mapping(output_transform_configs, 'dest_cols')
+    top_k = miscu.eval_elem_mapping(output_transform_configs, 'top_k', default_value={})
+
+    if state_path:
+        list_of_transformed_df = merge_state_feature(list_of_transformed_df, dest_sheet_names, config,
+                                                     state_path, input_key)
+    for index, category in enumerate(dest_sheet_names):
+        if top_k.get(category) and category not in ranked_categories:
+            list_of_transformed_df[index] = top_k_feature(list_of_transformed_df[index], category,
+                                                          top_k[category], config)
+    for transforming_df in list_of_transformed_df:
         transforming_df[dest_col_names[1]] = 100 * transforming_df[dest_col_names[0]] / transforming_df[
                                                 dest_col_names[0]].sum()
-        list_of_transformed_df.append(transforming_df)
 
     return list_of_transformed_df
 
 
+@log_trace
+def transform_chunks_feature(chunks, config, state_path=None, input_key=None):
+    """ Make the transformations of transform_feature over a stream of
+        chunks, holding one chunk and the running aggregates at a time.
+        Categories with a 'top_k' are ranked by a bounded memory heavy-hitter
+        sketch of 'sketch_size' counters (aggregate config, by default
+        10 * top_k and at least MIN_SKETCH_SIZE), whose totals may be
+        underestimated by up to the logged error bound; every other category
+        is aggregated exactly. Only additive aggregation functions ('sum' and
+        'count') can be streamed
+
+    param chunks: iterable of pandas dataframes
+        chunks of the input to be transformed
+    param config:
+        map of transformation configs
+    param state_path: str
+        optional aggregate state file, see transform_feature; it can not be
+        combined with sketched categories
+    param input_key: str
+        optional identifier of the input, see transform_feature
+    returns: list of pandas dataframes
+        one transformed df per destination sheet
+    """
+
+    output_transform_configs = miscu.eval_elem_mapping(config, 'output')
+    col_transformation_configs = miscu.eval_elem_mapping(output_transform_configs, 'col_transforms')
+    column_to_add = miscu.eval_elem_mapping(col_transformation_configs, "add")
+    columns_to_use_for_transformation = miscu.eval_elem_mapping(col_transformation_configs, "from")
+    dest_sheet_names = miscu.eval_elem_mapping(output_transform_configs, 'sheet_naming')
+    dest_col_names = miscu.eval_elem_mapping(output_transform_configs, 'dest_cols')
+    top_k = miscu.eval_elem_mapping(output_transform_configs, 'top_k', default_value={})
+    top_k_label = miscu.eval_elem_mapping(output_transform_configs, 'top_k_label', default_value='Other')
+
+    agg_configs = miscu.eval_elem_mapping(config, 'aggregate')
+    agg_method = miscu.eval_elem_mapping(agg_configs, 'aggfunc')
+    sort_keys = miscu.eval_elem_mapping(agg_configs, 'type').lower() == 'pivot'
+    sketch_size = miscu.eval_elem_mapping(agg_configs, 'sketch_size')
+
+    if agg_method not in ('sum', 'count'):
+        raise ValueError(f'Aggregation function <{agg_method}> can not be streamed in chunks')
+    sketched_categories = [category for category in dest_sheet_names if top_k.get(category)]
+    if state_path and sketched_categories:
+        raise ValueError(f'Sketched top_k categories {sketched_categories} can not be merged incrementally')
+
+    sketches = {category: HeavyHitters(sketch_size or max(10 * top_k[category], MIN_SKETCH_SIZE))
+                for category in sketched_categories}
+    totals = {}
+    for df_chunk in chunks:
+        df_chunk[column_to_add] = df_chunk[columns_to_use_for_transformation[0]] \
+            * df_chunk[columns_to_use_for_transformation[1]]
+        for category, aggregated_df in zip(dest_sheet_names,
+                                           aggregate_dimensions_feature(df_chunk, dest_sheet_names, config)):
+            if category in sketches:
+                sketches[category].update(aggregated_df[category], aggregated_df[dest_col_names[0]])
+            elif category in totals:
+                # Groups seen before come first, so 'groupby' type keeps first appearance order
+                aggregated_df = pd.concat([totals[category], aggregated_df], ignore_index=True)
+                totals[category] = aggregated_df.groupby(category, sort=sort_keys, observed=True)[
+                                       dest_col_names[0]].sum().reset_index()
+            else:
+                totals[category] = aggregated_df
+
+    list_of_transformed_df = []
+    for category in dest_sheet_names:
+        if category in sketches:
+            sketch = sketches[category]
+            top = sketch.top(top_k[category])
+            transformed_df = pd.DataFrame({category: top.index.astype(object), dest_col_names[0]: top.to_numpy()})
+            if sketch.total - top.sum() or len(sketch.counters.index) > len(top.index):
+                transformed_df.loc[len(transformed_df.index)] = [top_k_label, sketch.total - top.sum()]
+            logging.info(f'Top <{top_k[category]}> of <{category}> were sketched with an error bound of '
+                         f'<{sketch.error}>, leaving out <{sketch.clipped}> of negative totals')
+        else:
+            transformed_df = totals.get(category, pd.DataFrame({category: [], dest_col_names[0]: []}))
+        list_of_transformed_df.append(transformed_df)
+
+    return _finish_transform(list_of_transformed_df, config, state_path, input_key,
+                             ranked_categories=sketched_categories)
+
+
+@log_trace
+def top_k_feature(df, category, k, config):
+    """ Keep the k largest groups of an aggregated df, largest first, and sum
+        every other group into one remainder row ('top_k_label' output config,
+        'Other' by default), so the total over the df is unchanged
+
+    param df: pandas dataframe
+        [category, total] df, as returned by aggregate_dimensions_feature
+    param category: str
+        aggregation index name
+    param k: int
+        number of groups to keep
+    param config: dict
+        transformation configurations
+    returns: pandas dataframe
+        df of at most k + 1 rows
+    """
+
+    output_configs = miscu.eval_elem_mapping(config, 'output')
+    dest_cols = miscu.eval_elem_mapping(output_configs, 'dest_cols')
+    top_k_label = miscu.eval_elem_mapping(output_configs, 'top_k_label', default_value='Other')
+    agg_method = miscu.eval_elem_mapping(miscu.eval_elem_mapping(config, 'aggregate'), 'aggfunc')
+
+    if agg_method not in ('sum', 'count'):
+        raise ValueError(f'Aggregation function <{agg_method}> has no remainder to keep top_k groups with')
+    if len(df.index) <= k:
+        return df
+
+    df_top = df.nlargest(k, dest_cols[0])
+    remainder = df[dest_cols[0]].drop(df_top.index).sum()
+    df_other = pd.DataFrame({category: [top_k_label], dest_cols[0]: [remainder]})
+    # The remainder label is not one of the keys, so keys lose a categorical or numeric type
+    return pd.concat([df_top.astype({category: object}), df_other], ignore_index=True)
+
+
+@log_trace
+def rollup_feature(df, config):
+    """ Pre-aggregate df into a rollup cube: the total of the added column and
+        the row count for every combination of the rollup 'dimensions' and the
+        period of the 'date_column' at the cube's 'grain' (rollup config). Any
+        coarser roll-up or slice of it is then answered from the cube alone by
+        query_rollup_feature. The cube describes itself in df.attrs, which
+        parquet and feather files keep
+
+    param df: pandas dataframe
+        df to be pre-aggregated
+    param config: dict
+        rollup configurations
+    returns: pandas dataframe
+        cube of dimensions, period start, total and row count columns
+    """
+
+    output_configs = miscu.eval_elem_mapping(config, 'output')
+    col_transforms = miscu.eval_elem_mapping(output_configs, 'col_transforms')
+    from_cols = miscu.eval_elem_mapping(col_transforms, 'from')
+    dest_cols = miscu.eval_elem_mapping(output_configs, 'dest_cols')
+
+    rollup_configs = miscu.eval_elem_mapping(config, 'rollup')
+    dimensions = miscu.eval_elem_mapping(rollup_configs, 'dimensions', default_value=[])
+    date_column = miscu.eval_elem_mapping(rollup_configs, 'date_column', default_value='Date')
+    grain = miscu.eval_elem_mapping(rollup_configs, 'grain', default_value='day')
+
+    if grain not in TIME_GRAINS:
+        raise ValueError(f'Unknown rollup grain <{grain}>, elect one of {list(TIME_GRAINS)}')
+
+    df_keys = pd.DataFrame({dimension: df[dimension] for dimension in dimensions})
+    df_keys[date_column] = _get_period_start(df[date_column], grain)
+    df_keys[dest_cols[0]] = df[from_cols[0]] * df[from_cols[1]]
+    df_cube = df_keys.groupby(dimensions + [date_column], sort=True, observed=True, dropna=False) \
+                     .agg(**{dest_cols[0]: (dest_cols[0], 'sum'), ROLLUP_ROWS_COL: (dest_cols[0], 'size')}) \
+                     .reset_index()
+    df_cube.attrs['rollup'] = {'dimensions': dimensions, 'date_column': date_column, 'grain': grain,
+                               'measures': [dest_cols[0], ROLLUP_ROWS_COL], 'percentage': dest_cols[1]}
+
+    logging.info(f'Rollup cube of <{len(df.index)}> rows has <{len(df_cube.index)}> cells')
+    return df_cube
+
+
+@log_trace
+def query_rollup_feature(df_cube, by=None, grain=None, where=None, start=None, end=None):
+    """ Answer a roll-up or slice from a rollup cube, without row level data
+
+    param df_cube: pandas dataframe
+        cube, as built by rollup_feature
+    param by: list of str
+        dimensions to keep, every other dimension is rolled up
+    param grain: str
+        period to roll the date up to, the cube's grain or a coarser one;
+        no period column when None
+    param where: dict
+        dimension to list of values to keep
+    param start: str
+        date in the first period of grain (the cube's grain when None) to
+        keep, e.g. '2010-01-01'
+    param end: str
+        date in the last period of grain to keep, so whole periods are kept
+    returns: pandas dataframe
+        by dimensions and period, with total, row count and percentage of total
+    """
+
+    info = df_cube.attrs.get('rollup')
+    if not info:
+        raise KeyError('Given dataframe is not a rollup cube')
+    date_column = info['date_column']
+    measures = info['measures']
+    by = list(by or [])
+
+    for dimension in by + list(where or {}):
+        if dimension not in info['dimensions']:
+            raise KeyError(f'Dimension <{dimension}> is not part of the rollup cube')
+    if grain and grain not in TIME_GRAINS[info['grain']]:
+        raise ValueError(f'Rollup cube of <{info["grain"]}> grain can not be rolled up to <{grain}>, '
+                         f'elect one of {list(TIME_GRAINS[info["grain"]])}')
+
+    # Slice first, so only the selected cells are rolled up
+    mask = np.ones(len(df_cube.index), dtype=bool)
+    for dimension, values in (where or {}).items():
+        column = df_cube[dimension]
+        if pd.api.types.is_numeric_dtype(column):
+            values = pd.to_numeric(pd.Series(values)).tolist()
+        mask &= column.isin(values).to_numpy()
+    # Dates are compared at the queried grain, so a bound within a period keeps all of it
+    periods = None
+    if grain or start or end:
+        periods = _get_period_start(df_cube[date_column], grain or info['grain'])
+    if start:
+        mask &= (periods >= _get_period_start(pd.Series([start]), grain or info['grain'])[0]).to_numpy()
+    if end:
+        mask &= (periods <= _get_period_start(pd.Series([end]), grain or info['grain'])[0]).to_numpy()
+    df_slice = df_cube if mask.all() else df_cube[mask]
+
+    keys = by + ([date_column] if grain else [])
+    if keys:
+        df_keys = df_slice[by].copy()
+        if grain:
+            df_keys[date_column] = periods[mask]
+        df_result = df_slice[measures].groupby([df_keys[key] for key in keys], sort=True, observed=True,
+                                               dropna=False).sum().reset_index()
+    else:
+        df_result = df_slice[measures].agg(['sum']).reset_index(drop=True)
+    df_result[info['percentage']] = 100 * df_result[measures[0]] / df_result[measures[0]].sum()
+
+    return df_result
+
+
+def _get_period_start(series, grain):
+    """ Start timestamp of the period of given grain each date falls in """
+    dates = pd.to_datetime(series)
+    if grain == 'day':
+        return dates.dt.normalize()
+    return dates.dt.to_period(PERIOD_FREQUENCIES[grain]).dt.start_time
+
+
+@log_trace
+def merge_state_feature(list_of_aggregated_df, categories, config, state_path, input_key=None):
+    """ Merge partial aggregates into the aggregate state persisted in
+        state_path and save the updated state. Only additive aggregation
+        functions ('sum' and 'count') can be merged.
+        The state keeps a key of the categories, summed column and
+        aggregation it was built with, and a state built otherwise is
+        rejected rather than merged into
+
+    param list_of_aggregated_df: list of pandas dataframes
+        one [category, total] df per category, computed over new rows only
+    param categories: list of str
+        aggregation index names
+    param config: dict
+        transformation configurations
+    param state_path: str
+        path of the aggregate state file, created on first use
+    param input_key: str
+        optional identifier of the new rows' source; an input already
+        merged into the state is not merged again
+    returns: list of pandas dataframes
+        one [category, total] df per category, over all merged rows
+    """
+
+    output_configs = miscu.eval_elem_mapping(config, 'output')
+    dest_cols = miscu.eval_elem_mapping(output_configs, 'dest_cols')
+    agg_configs = miscu.eval_elem_mapping(config, 'aggregate')
+    agg_method = miscu.eval_elem_mapping(agg_configs, 'aggfunc')
+    agg_type = miscu.eval_elem_mapping(agg_configs, 'type')
+    sort_keys = agg_type.lower() == 'pivot'
+
+    if agg_method not in ('sum', 'count'):
+        raise ValueError(f'Aggregation function <{agg_method}> can not be merged incrementally')
+
+    # Totals of another column, aggregation or set of categories do not add up with the state's
+    config_key = cacheu.make_key('state', list(categories), miscu.eval_elem_mapping(output_configs, 'col_transforms'),
+                                 dest_cols[0], agg_method, agg_type)
+    if os.path.isfile(state_path):
+        state = pd.read_pickle(state_path)
+        if state.setdefault('config_key', config_key) != config_key:
+            raise ValueError(f'Aggregate state <{state_path}> was built under another transformation config, '
+                             f'remove it to start a new state')
+    else:
+        state = {'inputs': [], 'aggregates': {}, 'config_key': config_key}
+
+    if input_key and input_key in state['inputs']:
+        logging.warning(f'Input <{input_key}> was already merged into <{state_path}>, skipping it')
+        return [state['aggregates'][category].copy() for category in categories]
+
+    list_of_merged_df = []
+    for category, aggregated_df in zip(categories, list_of_aggregated_df):
+        state_df = state['aggregates'].get(category)
+        if state_df is not None:
+            # Existing groups come first, so 'groupby' type keeps first appearance order
+            aggregated_df = pd.concat([state_df, aggregated_df], ignore_index=True)
+            aggregated_df = aggregated_df.groupby(category, sort=sort_keys)[dest_cols[0]].sum().reset_index()
+        state['aggregates'][category] = aggregated_df
+        list_of_merged_df.append(aggregated_df.copy())
+    if input_key:
+        state['inputs'].append(input_key)
+
+    with atomic_path(state_path) as temp_path:
+        pd.to_pickle(state, temp_path)
+    logging.info(f'Aggregate state of <{len(state["inputs"])}> inputs was saved to <{state_path}>')
+
+    return list_of_merged_df
+
+
 @log_trace
 def aggregate_feature(df, category, config):
     """ Aggregation helper using groupby or pivot tables
@@ -182,6 +919,33 @@ def aggregate_feature(df, category, config):
         df with necessary transformations
     """
 
+    return aggregate_dimensions_feature(df, [category], config)[0]
+
+
+@log_trace
+def aggregate_dimensions_feature(df, categories, config):
+    """ Aggregate the added column by each of the given categories at once.
+        The value column is extracted a single time and every category is
+        factorized into group codes and reduced with bincount, so no copy
+        of df is made per category.
+        'pivot' type returns groups sorted by key, 'groupby' type returns
+        groups in order of first appearance.
+        A non pandas aggregate 'engine' (duckdb or polars) runs the same
+        aggregation on that engine instead.
+        With aggregate 'parallel' enabled, row ranges of large dfs are
+        aggregated by worker processes sharing the columns and the partial
+        totals merged, see parallel_util.aggregate_partitioned.
+
+    param df: pandas dataframe
+        df to be transformed
+    param categories: list of str
+        aggregation index names
+    param config: dict
+        transformation configurations
+    returns: list of pandas dataframes
+        one [category, total] df per given category
+    """
+
     output_configs = miscu.eval_elem_mapping(config, 'output')
     col_transforms = miscu.eval_elem_mapping(output_configs, 'col_transforms')
     add_col = miscu.eval_elem_mapping(col_transforms, 'add')
@@ -190,14 +954,79 @@ def aggregate_feature(df, category, config):
     agg_configs = miscu.eval_elem_mapping(config, 'aggregate')
     agg_method = miscu.eval_elem_mapping(agg_configs, 'aggfunc')
     agg_type = miscu.eval_elem_mapping(agg_configs, 'type')
+    sort_keys = agg_type.lower() == 'pivot'
+
+    # Embedded engines aggregate every category on their own threads
+    engine = miscu.eval_elem_mapping(agg_configs, 'engine', default_value='pandas')
+    if engine != 'pandas':
+        return engineu.aggregate_with_engine(engine, df, categories, add_col, dest_cols[0],
+                                             agg_method, sort_keys)
+
+    # Shared pass over the value column; missing values are left out of every total, count and mean,
+    # as in pandas groupby and pivot_table
+    values = df[add_col].to_numpy(dtype=float, na_value=np.nan)
+    present = ~np.isnan(values)
+    if present.all():
+        present = None
 
-    if agg_type.lower() == 'groupby':
-        groupby_table = df.copy()
-        groupby_table[dest_cols[0]] = groupby_table.groupby([category])[add_col].transform(agg_method)
-        groupby_table = groupby_table.drop_duplicates(subset=[category])[[category, dest_cols[0]]]
-        return groupby_table
-    elif agg_type.lower() == 'pivot':
-        pivot_table = df.pivot_table(index=category, aggfunc={add_col: agg_method})
-        pivot_table = pivot_table.rename(columns={add_col: dest_cols[0]})
-        pivot_table.insert(0, category, pivot_table.index)
-        return pivot_table
+    partitioned = {}
+    parallel_configs = miscu.eval_elem_mapping(agg_configs, 'parallel', default_value={})
+    # eval_elem_mapping reads a min_rows of 0 as missing, while it partitions every df
+    min_rows = parallel_configs.get('min_rows')
+    if min_rows is None:
+        min_rows = parallelu.DEFAULT_MIN_ROWS
+    if miscu.eval_elem_mapping(parallel_configs, 'enabled', default_value=False) \
+            and agg_method in parallelu.PARALLEL_AGG_METHODS and len(df.index) >= min_rows:
+        workers = miscu.eval_elem_mapping(parallel_configs, 'workers', default_value=os.cpu_count())
+        parallel_categories = [category for category in categories if parallelu.can_partition(df[category])]
+        if workers > 1 and parallel_categories:
+            logging.info(f'Aggregating <{len(df.index)}> rows by <{parallel_categories}> '
+                         f'over <{workers}> partitions')
+            partials = parallelu.aggregate_partitioned(values, [df[category] for category in parallel_categories],
+                                                       agg_method, sort_keys, workers)
+            partitioned = dict(zip(parallel_categories, partials))
+
+    list_of_aggregated_df = []
+    for category in categories:
+        if category in partitioned:
+            uniques, totals = partitioned[category]
+            list_of_aggregated_df.append(pd.DataFrame({category: uniques, dest_cols[0]: totals}))
+            continue
+        codes, uniques = pd.factorize(df[category], sort=sort_keys)
+        if agg_method in ('sum', 'count', 'mean'):
+            # Rows with a missing key (code -1) or a missing value are left out, as in groupby
+            valid = codes >= 0 if present is None else (codes >= 0) & present
+            group_codes, group_values = (codes, values) if valid.all() else (codes[valid], values[valid])
+            totals = aggregate_codes(group_codes, group_values, len(uniques), agg_method)
+            aggregated_df = pd.DataFrame({category: uniques, dest_cols[0]: totals})
+        else:
+            # Any other aggregation function goes through a copy free groupby
+            aggregated_df = df.groupby(category, sort=sort_keys)[add_col].agg(agg_method)
+            aggregated_df = aggregated_df.rename(dest_cols[0]).reset_index()
+        list_of_aggregated_df.append(aggregated_df)
+
+    return list_of_aggregated_df
+
+
+def aggregate_codes(group_codes, group_values, num_groups, agg_method):
+    """ Reduce values by group code with bincount
+
+    param group_codes: numpy array
+        group code of every value, from 0 to num_groups - 1
+    param group_values: numpy array
+        float values, without missing values
+    param num_groups: int
+        number of groups
+    param agg_method: str
+        'sum', 'count' or 'mean'
+    returns: numpy array
+        aggregated value of every group; the mean of a group without values is missing
+    """
+    counts = np.bincount(group_codes, minlength=num_groups)
+    if agg_method == 'count':
+        return counts
+    totals = np.bincount(group_codes, weights=group_values, minlength=num_groups)
+    if agg_method == 'mean':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            totals = totals / counts
+    return totals
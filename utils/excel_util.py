@@ -0,0 +1,156 @@
+# Maximum number of rows of an Excel sheet, header row included
+EXCEL_MAX_ROWS = 1048576
+# Maximum number of characters of an Excel sheet name
+EXCEL_MAX_SHEET_NAME = 31
+
+# Number of rows converted to Python values at a time when streaming
+BLOCK_ROWS = 65536
+
+
+def split_sheets(df, sheet_name, max_rows=EXCEL_MAX_ROWS):
+    """ Split a dataframe into slices that each fit into one Excel sheet
+
+    param df: pandas dataframe
+        dataframe to split
+    param sheet_name: str
+        name of the first sheet, others are suffixed '_2', '_3', ..., see get_sheet_title
+    param max_rows: int
+        maximum number of rows of a sheet, header row included
+    returns: generator of (str, pandas dataframe)
+        sheet name and slice of df to write into it
+    """
+    rows_per_sheet = max_rows - 1
+    yield get_sheet_title(sheet_name), df.iloc[:rows_per_sheet]
+    for part, start in enumerate(range(rows_per_sheet, len(df.index), rows_per_sheet), start=2):
+        yield get_sheet_title(sheet_name, part), df.iloc[start:start + rows_per_sheet]
+
+
+def get_sheet_title(sheet_name, part=1):
+    """ Title of a part of a sheet within the sheet name length limit: the
+        sheet name for the first part, suffixed '_2', '_3', ... for the others,
+        with the name cut short to leave room for the suffix
+
+    param sheet_name: str
+        sheet name as requested by caller
+    param part: int
+        part number, from 1
+    returns: str
+        sheet title of at most EXCEL_MAX_SHEET_NAME characters
+    """
+    suffix = f'_{part}' if part > 1 else ''
+    return str(sheet_name)[:EXCEL_MAX_SHEET_NAME - len(suffix)] + suffix
+
+
+class ExcelStreamWriter:
+    """ Excel writer streaming dataframe rows straight into the workbook, in
+        xlsxwriter constant_memory mode or openpyxl write_only mode, so only
+        the current row is held by the workbook. Rows beyond a sheet's limit
+        continue in a new sheet suffixed '_2', '_3', ...
+    """
+
+    def __init__(self, path, engine='xlsxwriter', max_rows=EXCEL_MAX_ROWS):
+        """ Open the workbook
+
+        param path: str
+            destination path
+        param engine: str
+            'xlsxwriter' or 'openpyxl'
+        param max_rows: int
+            maximum number of rows of a sheet, header row included
+        """
+        self._path = path
+        self._engine = engine
+        self._max_rows = max_rows
+        # Sheet name -> [current worksheet, next row, part number]
+        self._sheets = {}
+        if engine == 'xlsxwriter':
+            import xlsxwriter
+            self._workbook = xlsxwriter.Workbook(path, {'constant_memory': True,
+                                                        'default_date_format': 'yyyy-mm-dd hh:mm:ss'})
+            self._header_format = self._workbook.add_format({'bold': True})
+        else:
+            from openpyxl import Workbook
+            self._workbook = Workbook(write_only=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """ Finish and save the workbook """
+        if self._engine == 'xlsxwriter':
+            self._workbook.close()
+        else:
+            self._workbook.save(self._path)
+
+    def write(self, df, sheet_name='Sheet1'):
+        """ Append rows of given dataframe to given sheet
+
+        param df: pandas dataframe
+            rows to append
+        param sheet_name: str
+            sheet to append to, created along with its header row on first use
+        returns: None
+        """
+        position = 0
+        while True:
+            worksheet, row = self._get_sheet(sheet_name, df.columns)
+            rows_to_write = min(self._max_rows - row, len(df.index) - position)
+            for values in ExcelStreamWriter._iter_rows(df.iloc[position:position + rows_to_write]):
+                self._write_row(worksheet, row, values)
+                row += 1
+            self._sheets[sheet_name][1] = row
+            position += rows_to_write
+            if position >= len(df.index):
+                return
+
+    def _get_sheet(self, sheet_name, columns):
+        """ Get the worksheet rows of given sheet name go to next, starting a
+            new part when the current one is full
+
+        param sheet_name: str
+            sheet name as requested by caller
+        param columns: list of str
+            header row of a new worksheet
+        returns: tuple of (worksheet, int)
+            worksheet and its next free row
+        """
+        if sheet_name not in self._sheets:
+            part = 1
+        elif self._sheets[sheet_name][1] >= self._max_rows:
+            part = self._sheets[sheet_name][2] + 1
+        else:
+            return self._sheets[sheet_name][0], self._sheets[sheet_name][1]
+
+        title = get_sheet_title(sheet_name, part)
+        if self._engine == 'xlsxwriter':
+            worksheet = self._workbook.add_worksheet(title)
+            worksheet.write_row(0, 0, [str(column) for column in columns], self._header_format)
+        else:
+            worksheet = self._workbook.create_sheet(title)
+            worksheet.append([str(column) for column in columns])
+        self._sheets[sheet_name] = [worksheet, 1, part]
+        return worksheet, 1
+
+    def _write_row(self, worksheet, row, values):
+        """ Write one row of values to given worksheet """
+        if self._engine == 'xlsxwriter':
+            worksheet.write_row(row, 0, values)
+        else:
+            worksheet.append(values)
+
+    @staticmethod
+    def _iter_rows(df):
+        """ Convert dataframe rows into tuples of Python values, block by block,
+            with missing values as None so they are written as blank cells
+
+        param df: pandas dataframe
+            rows to convert
+        returns: generator of tuples
+        """
+        for start in range(0, len(df.index), BLOCK_ROWS):
+            block = df.iloc[start:start + BLOCK_ROWS]
+            block = block.astype(object).where(block.notna(), None)
+            yield from block.itertuples(index=False, name=None)
@@ -1,3 +1,4 @@
+import glob
 import logging
 import pandas as pd
 import os
@@ -5,8 +6,23 @@ import sys
 import utils.misc_util as miscu
 sys.path.append(os.getcwd())
 from utils.data_storage import DataStorage
+from utils.excel_util import ExcelStreamWriter, split_sheets
+from utils.partition_util import PARTITION_FORMATS, get_arrow_filters, open_dataset, read_partitions, write_partitions
+from utils.version_util import allocate_path, atomic_path
 from utils.log_util import log_trace
 
+# File extension written for each supported file type
+FILE_EXTENSIONS = {'excel': 'xlsx',
+                   'csv': 'csv',
+                   'parquet': 'parquet',
+                   'arrow': 'arrow',
+                   'feather': 'feather'}
+
+# Compact column types accepted by 'apply_dtype' configuration, on top of 'str', 'int', 'float' and 'datetime.date'
+INT_TYPES = ('int8', 'int16', 'int32', 'int64', 'uint8', 'uint16', 'uint32', 'uint64')
+FLOAT_TYPES = ('float32', 'float64')
+CATEGORY_TYPE = 'category'
+
 
 class FileDataStorage(DataStorage):
     """ File to read from and write to local files. Write
@@ -36,15 +52,26 @@ class FileDataStorage(DataStorage):
         skip_rows = miscu.eval_elem_mapping(config, 'skip_rows', default_value=0)
         use_cols = miscu.eval_elem_mapping(config, 'use_cols', default_value=None)
         sheet_name = miscu.eval_elem_mapping(config, 'sheet_name', default_value=0)
+        engine = miscu.eval_elem_mapping(config, 'engine', default_value=FileDataStorage.get_csv_engine())
+        memory_map = miscu.eval_elem_mapping(config, 'memory_map', default_value=False)
+        filters = miscu.eval_elem_mapping(config, 'filter', default_value=[])
+        dtype, parse_dates = FileDataStorage.get_read_dtypes(miscu.eval_elem_mapping(config, 'apply_dtype'),
+                                                             FileDataStorage.is_validated(config))
 
         df_target = None
-        if FileDataStorage.validate_path(path):
+        if file_type.lower() in PARTITION_FORMATS and os.path.isdir(path):
+            # Read partitioned dataset directory, as written with 'partition_by', skipping filtered out partitions.
+            df_target = read_partitions(path, file_type.lower(), FileDataStorage.get_column_list(use_cols), filters)
+        elif FileDataStorage.validate_path(path):
             if file_type.lower() == 'csv':
-                # Read csv based file.
+                # Read csv based file, applying configured types while parsing.
                 df_target = pd.read_csv(path,
                                         sep=separator,
                                         skiprows=skip_rows,
                                         usecols=use_cols,
+                                        dtype=dtype,
+                                        parse_dates=parse_dates,
+                                        engine=engine,
                                         encoding='unicode_escape')
             elif file_type.lower() == 'excel':
                 # Read Excel based file.
@@ -59,10 +86,89 @@ class FileDataStorage(DataStorage):
                                               skiprows=skip_rows,
                                               usecols=use_cols,
                                               engine="openpyxl")
+            elif file_type.lower() == 'parquet':
+                # Read Parquet based file, projecting only the given columns
+                # and skipping row groups that the configured filters rule out.
+                df_target = pd.read_parquet(path,
+                                            columns=FileDataStorage.get_column_list(use_cols),
+                                            filters=FileDataStorage.get_parquet_filters(path, filters))
+            elif file_type.lower() in ('arrow', 'feather') and memory_map:
+                # Map Arrow IPC (Feather V2) based file and wrap its buffers in Arrow backed columns,
+                # so pages are shared with other readers through the page cache instead of copied.
+                df_target = FileDataStorage.read_memory_mapped(path, FileDataStorage.get_column_list(use_cols))
+            elif file_type.lower() in ('arrow', 'feather'):
+                # Read Arrow IPC (Feather V2) based file, projecting only the given columns.
+                df_target = pd.read_feather(path,
+                                            columns=FileDataStorage.get_column_list(use_cols))
+            else:
+                raise IOError(f'Unsupported file type <{file_type}> for <{path}>')
 
         logging.info(f'{description} records <{len(df_target.index)}> were read from <{path}>')
         return df_target
 
+    def read_chunks(self, config):
+        """
+        Read file in chunks of fixed row count, along with validating provided path.
+        Lets callers stream files that would not fit in memory as a whole.
+        param config: dict
+            configuration for the specific file to read in,
+            'chunk_size' sets the number of rows per chunk
+        returns: generator of pandas dataframes
+        """
+        description = miscu.eval_elem_mapping(config, 'description')
+        path = miscu.eval_elem_mapping(config, 'path')
+        file_type = miscu.eval_elem_mapping(config, 'file_type', default_value='csv')
+        separator = miscu.eval_elem_mapping(config, 'separator', default_value=',')
+        skip_rows = miscu.eval_elem_mapping(config, 'skip_rows', default_value=0)
+        use_cols = miscu.eval_elem_mapping(config, 'use_cols', default_value=None)
+        chunk_size = miscu.eval_elem_mapping(config, 'chunk_size')
+        filters = miscu.eval_elem_mapping(config, 'filter', default_value=[])
+        dtype, parse_dates = FileDataStorage.get_read_dtypes(miscu.eval_elem_mapping(config, 'apply_dtype'),
+                                                             FileDataStorage.is_validated(config))
+
+        num_records = 0
+        dataset = None
+        if file_type.lower() in PARTITION_FORMATS and os.path.isdir(path):
+            # Scan partitioned dataset directory, as written with 'partition_by'.
+            dataset = open_dataset(path, file_type.lower())
+        elif FileDataStorage.validate_path(path):
+            if file_type.lower() == 'csv':
+                # Note: pyarrow engine does not support chunks
+                with pd.read_csv(path,
+                                 sep=separator,
+                                 skiprows=skip_rows,
+                                 usecols=use_cols,
+                                 dtype=dtype,
+                                 parse_dates=parse_dates,
+                                 encoding='unicode_escape',
+                                 chunksize=int(chunk_size)) as reader:
+                    for df_chunk in reader:
+                        num_records += len(df_chunk.index)
+                        yield df_chunk
+            elif file_type.lower() == 'parquet':
+                import pyarrow.dataset as ds
+                dataset = ds.dataset(path, format='parquet')
+            else:
+                raise IOError(f"Chunked reading is not supported for file type <{file_type}>. "
+                              f"Please elect 'csv' or 'parquet'.")
+
+        if dataset is not None:
+            import pyarrow.parquet as pq
+            # Scan batches, skipping row groups and partitions that the configured filters rule out.
+            arrow_filters = get_arrow_filters(filters, dataset.schema) if filters else None
+            scanner = dataset.scanner(columns=FileDataStorage.get_column_list(use_cols),
+                                      filter=pq.filters_to_expression(arrow_filters) if arrow_filters else None,
+                                      batch_size=int(chunk_size))
+            for batch in scanner.to_batches():
+                if not batch.num_rows:
+                    continue
+                df_chunk = batch.to_pandas()
+                num_records += len(df_chunk.index)
+                yield df_chunk
+
+        logging.info(f'{description} records <{num_records}> were read in chunks of '
+                     f'<{chunk_size}> from <{path}>')
+
     @log_trace
     def write(self, config, df):
         """ Write dataframe to destination path and filename passed by caller
@@ -82,34 +188,149 @@ class FileDataStorage(DataStorage):
         file_type = miscu.eval_elem_mapping(config, 'file_type', default_value='excel')
         separator = miscu.eval_elem_mapping(config, 'separator', default_value=',')
         mode = miscu.eval_elem_mapping(config, 'mode', default_value='new')
+        engine = miscu.eval_elem_mapping(config, 'engine')
+        compression = miscu.eval_elem_mapping(config, 'compression')
+        partition_by = miscu.eval_elem_mapping(config, 'partition_by')
+        workers = miscu.eval_elem_mapping(config, 'workers')
 
         # Get a final path based on caller provided parameters
         final_path = FileDataStorage.get_avail_path(path, file_type, mode)
 
-        # This will write all dataframes to a labeled sheet in one excel file
-        # Write to either a csv or xlsx file if single df or xlsx for multiple df
-        # Note: this logic can handle a list of dataframes in case of multiple
-        # sheets/transformations
-        if isinstance(df, list):
-            if file_type == 'csv':
-                raise IOError("CSV file can only handle one transformation. Please elect 'excel' "
-                              "for multiple transformations.")
-            num_records = 0
-            transform_types = miscu.eval_elem_mapping(config, 'sheet_naming')
-            with pd.ExcelWriter(final_path) as writer:
-                for dataframe, transform_type in zip(df, transform_types):
-                    dataframe.to_excel(writer, index=False, sheet_name=transform_type)
-                    num_records += len(dataframe.index)
+        with atomic_path(final_path) as temp_path:
+            # A partitioned output is a directory of part files, versioned as a whole
+            if partition_by and not isinstance(df, list):
+                num_parts = write_partitions(temp_path, df, partition_by, file_type,
+                                             compression=compression, workers=workers)
+                num_records = len(df.index)
+            # This will write all dataframes to a labeled sheet in one excel file
+            # Write to either a csv or xlsx file if single df or xlsx for multiple df
+            # Note: this logic can handle a list of dataframes in case of multiple
+            # sheets/transformations
+            elif isinstance(df, list):
+                if file_type != 'excel':
+                    raise IOError(f"{file_type} file can only handle one transformation. Please elect 'excel' "
+                                  f"for multiple transformations.")
+                transform_types = miscu.eval_elem_mapping(config, 'sheet_naming')
+                num_records = FileDataStorage.write_excel(temp_path, zip(df, transform_types), engine)
+            else:
+                if file_type == 'csv':
+                    df.to_csv(temp_path, sep=separator, index=False)
+                elif file_type == 'parquet':
+                    df.to_parquet(temp_path, index=False)
+                elif file_type in ('arrow', 'feather'):
+                    df.reset_index(drop=True).to_feather(temp_path, compression=compression)
+                else:
+                    FileDataStorage.write_excel(temp_path, [(df, 'Sheet1')], engine)
+                num_records = len(df.index)
+
+        if partition_by and not isinstance(df, list):
+            logging.info(f'{description} records <{num_records}> were written to <{num_parts}> '
+                         f'partitions of <{final_path}>')
         else:
-            if file_type == 'csv':
-                df.to_csv(final_path, sep=separator, index=False)
+            logging.info(f'{description} records <{num_records}> were written to <{final_path}>')
+        return
+
+    @log_trace
+    def write_chunks(self, config, chunks):
+        """ Write dataframe chunks one after another to destination path and
+            filename passed by caller, so only one chunk is held at a time
+
+        param config: dict
+            Configuration for write destination
+        param chunks: iterable of pandas dataframes
+            the dataframes to be appended, in order, to a single output
+        return: None
+            This method saves to a designated file path
+        """
+        description = miscu.eval_elem_mapping(config, 'description')
+        path = miscu.eval_elem_mapping(config, 'path')
+        file_type = miscu.eval_elem_mapping(config, 'file_type', default_value='excel')
+        separator = miscu.eval_elem_mapping(config, 'separator', default_value=',')
+        mode = miscu.eval_elem_mapping(config, 'mode', default_value='new')
+        engine = miscu.eval_elem_mapping(config, 'engine', default_value='openpyxl')
+        compression = miscu.eval_elem_mapping(config, 'compression')
+        partition_by = miscu.eval_elem_mapping(config, 'partition_by')
+        workers = miscu.eval_elem_mapping(config, 'workers')
+
+        # Get a final path based on caller provided parameters
+        final_path = FileDataStorage.get_avail_path(path, file_type, mode)
+
+        with atomic_path(final_path) as temp_path:
+            num_records = 0
+            if partition_by:
+                # Every chunk adds its own part file to each partition it has rows for
+                for chunk_number, df_chunk in enumerate(chunks):
+                    write_partitions(temp_path, df_chunk, partition_by, file_type, f'part-{chunk_number}',
+                                     compression=compression, workers=workers)
+                    num_records += len(df_chunk.index)
+            elif file_type == 'csv':
+                # Only the first chunk carries the header row, even if it has no rows left after filtering
+                with open(temp_path, 'w', newline='') as file:
+                    for chunk_number, df_chunk in enumerate(chunks):
+                        df_chunk.to_csv(file, sep=separator, index=False, header=(chunk_number == 0))
+                        num_records += len(df_chunk.index)
+            elif file_type in ('parquet', 'arrow', 'feather'):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                # Every chunk is conformed to the schema of the first one
+                writer = None
+                try:
+                    for df_chunk in chunks:
+                        if writer is None:
+                            table = pa.Table.from_pandas(df_chunk, preserve_index=False)
+                            schema = table.schema
+                            if file_type == 'parquet':
+                                writer = pq.ParquetWriter(temp_path, schema)
+                            else:
+                                writer = pa.ipc.new_file(temp_path, schema, options=pa.ipc.IpcWriteOptions(
+                                    compression=None if compression == 'uncompressed' else compression))
+                        else:
+                            table = pa.Table.from_pandas(df_chunk, schema=schema,
+                                                         preserve_index=False)
+                        writer.write_table(table)
+                        num_records += len(df_chunk.index)
+                finally:
+                    if writer is not None:
+                        writer.close()
             else:
-                df.to_excel(final_path, index=False)
-            num_records = len(df.index)
+                # Rows are streamed into the workbook, moving on to a new sheet when one is full
+                with ExcelStreamWriter(temp_path, engine) as writer:
+                    for df_chunk in chunks:
+                        writer.write(df_chunk)
+                        num_records += len(df_chunk.index)
 
         logging.info(f'{description} records <{num_records}> were written to <{final_path}>')
         return
 
+    @staticmethod
+    def write_excel(path, sheets, engine=None):
+        """ Write dataframes to sheets of one Excel file. A dataframe exceeding
+            the sheet row limit continues in sheets suffixed '_2', '_3', ...
+
+        param path: str
+            destination path
+        param sheets: iterable of (pandas dataframe, str)
+            dataframes along with their sheet names
+        param engine: str
+            'xlsxwriter' streams rows in constant memory mode,
+            anything else uses pandas' default Excel writer
+        return: int
+            number of records written
+        """
+        num_records = 0
+        if engine == 'xlsxwriter':
+            with ExcelStreamWriter(path, engine) as writer:
+                for dataframe, sheet_name in sheets:
+                    writer.write(dataframe, sheet_name)
+                    num_records += len(dataframe.index)
+        else:
+            with pd.ExcelWriter(path) as writer:
+                for dataframe, sheet_name in sheets:
+                    for part_name, df_part in split_sheets(dataframe, sheet_name):
+                        df_part.to_excel(writer, index=False, sheet_name=part_name)
+                    num_records += len(dataframe.index)
+        return num_records
+
     @staticmethod
     def validate_path(path, attribute_check="filepath"):
         """ Validate provided directory and path.
@@ -131,6 +352,29 @@ class FileDataStorage(DataStorage):
                 raise FileNotFoundError(f'Provided file path is invalid: <{path}>')
         return True
 
+    @staticmethod
+    def resolve_paths(path):
+        """ Expand provided path into the list of files it designates
+
+        param path: str
+            a file path, a directory path (all files within it) or
+            a glob pattern such as './data/sales_*.csv'
+        return: list of str
+            sorted file paths; raise an exception if none is found
+        """
+        if os.path.isdir(path):
+            paths = [os.path.join(path, file) for file in os.listdir(path)
+                     if not file.startswith('.') and os.path.isfile(os.path.join(path, file))]
+        elif glob.has_magic(path):
+            paths = [file for file in glob.glob(path) if os.path.isfile(file)]
+        else:
+            return [path]
+
+        if not paths:
+            logging.error(f'Provided path matches no files: <{path}>')
+            raise FileNotFoundError(f'Provided path matches no files: <{path}>')
+        return sorted(paths)
+
     @staticmethod
     def get_avail_path(path, file_type, mode):
         """ Find an available path for saving a file
@@ -139,33 +383,135 @@ class FileDataStorage(DataStorage):
             intended save destination
         param file_type: str
             intended write format
-            options - 'excel' or 'csv'
+            options - 'excel', 'csv', 'parquet', 'arrow' or 'feather'
         return: str
             Available path for dataframe save
         """
-        # Get list of existing files
-        files = os.listdir(os.path.dirname(path))
-
         # If you want a new file but the path given pre-exists,
         # get a new path. All other situations can use the path
-        # as provided.
-        if mode == 'new' and path.split('/')[-1] in files:
+        # as provided. A new path is reserved with an empty placeholder
+        # file, so concurrent runs never pick the same one.
+        if mode == 'new':
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return path
+            except FileExistsError:
+                pass
+
             # Get the root title intended by the caller
             final_file_title = FileDataStorage.get_title_without_suffix(path)
 
             # Convert file_type to correct extension
-            file_type = 'xlsx' if file_type == 'excel' else file_type
-
-            # Get an available file number
-            next_number = FileDataStorage.get_avail_version_number(file_type,
-                                                                   final_file_title,
-                                                                   files)
+            file_type = FILE_EXTENSIONS.get(file_type, file_type)
 
-            # Return a destination path for the written file
-            return os.path.join(os.path.dirname(os.path.abspath(path)),
-                                final_file_title + next_number + '.' + file_type)
+            # Get an available file number from the directory's version manifest,
+            # scanning the directory only for a title the manifest does not know yet
+            return allocate_path(os.path.dirname(os.path.abspath(path)), final_file_title, file_type,
+                                 lambda files: FileDataStorage.get_avail_version_number(file_type,
+                                                                                        final_file_title,
+                                                                                        files))
         return path
 
+    @staticmethod
+    def read_memory_mapped(path, columns=None):
+        """ Read an Arrow IPC (Feather V2) file through a memory map. Columns
+            stay Arrow backed (pd.ArrowDtype), so for an uncompressed file no
+            column data is copied into process memory; a compressed file is
+            decompressed on read, as with read_feather
+
+        param path: str
+            path of the arrow or feather file
+        param columns: list of str
+            columns to project, all columns when None
+        returns: pandas dataframe
+        """
+        import pyarrow as pa
+
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        if columns:
+            table = table.select(columns)
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+    @staticmethod
+    def get_parquet_filters(path, filters):
+        """ Translate 'filter' configuration into the pyarrow filters of a
+            parquet file, see partition_util.get_arrow_filters
+
+        param path: str
+            path of the parquet file
+        param filters: list of list
+            [column, operator, value] filters, as configured
+        return: list of tuple or None
+            pyarrow filters, None when none applies
+        """
+        if not filters:
+            return None
+        import pyarrow.parquet as pq
+        return get_arrow_filters(filters, pq.read_schema(path)) or None
+
+    @staticmethod
+    def get_csv_engine():
+        """ Choose the fastest available csv parser
+
+        return: str
+            'pyarrow' if pyarrow is installed, 'c' otherwise
+        """
+        try:
+            import pyarrow  # noqa: F401
+            return 'pyarrow'
+        except ImportError:
+            return 'c'
+
+    @staticmethod
+    def get_read_dtypes(apply_dtype, validated=False):
+        """ Translate 'apply_dtype' configuration into types applied by the parser.
+            Integer types are left to apply_dtype_feature, since a parser can't
+            fill their missing values
+
+        param apply_dtype: dict
+            column name to configured type mapping
+        param validated: bool
+            whether records are validated after reading, in which case only
+            types every value converts to are applied, so that an invalid value
+            is rejected by validation instead of failing the parser
+        return: tuple of (dict, list)
+            parser dtype mapping and columns to parse as dates
+        """
+        dtype = {}
+        parse_dates = []
+        for column, type_value in (apply_dtype or {}).items():
+            if type_value in ('str', CATEGORY_TYPE) or (type_value in FLOAT_TYPES and not validated):
+                dtype[column] = type_value
+            elif type_value == 'float' and not validated:
+                dtype[column] = 'float64'
+            elif type_value == 'datetime.date' and not validated:
+                parse_dates.append(column)
+        return dtype or None, parse_dates or None
+
+    @staticmethod
+    def is_validated(config):
+        """ Whether records read with configuration are validated, see etl_util.validate_feature
+
+        param config: dict
+            configuration for the specific file to read in
+        return: bool
+        """
+        return bool(miscu.eval_elem_mapping(miscu.eval_elem_mapping(config, 'validate'), 'enabled'))
+
+    @staticmethod
+    def get_column_list(use_cols):
+        """ Convert 'use_cols' configuration into a list of column names,
+            used for column projection of columnar files
+
+        param use_cols: str or list of str
+            comma separated column names or list of column names
+        return: list of str or None
+            column names to read, None to read all columns
+        """
+        if isinstance(use_cols, str):
+            return [col.strip() for col in use_cols.split(',')]
+        return use_cols
+
     @staticmethod
     def get_title_without_suffix(provided_path_with_suffix):
         """ Retrieve root title of intended file name
@@ -217,7 +563,8 @@ class FileDataStorage(DataStorage):
                 try:
                     number = int(file_name.split('_')[1])
                     file_numbers.append(number)
-                except IndexError:
+                # No suffix, or a suffix other than a version number
+                except (IndexError, ValueError):
                     continue
 
         # If we need an unused numeric suffix
@@ -0,0 +1,88 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Default number of items a stage may run ahead of the stage consuming them
+DEFAULT_QUEUE_SIZE = 2
+
+# Queue message kinds, passed along with every item
+_ITEM = 'item'
+_DONE = 'done'
+_ERROR = 'error'
+
+
+def prefetch(iterable, queue_size=DEFAULT_QUEUE_SIZE, name='prefetch'):
+    """ Iterate over iterable in a background thread, which starts once the
+        first item is asked for and runs up to queue_size items ahead of the
+        consumer. Chaining stages, e.g. read -> prefetch -> transform ->
+        prefetch -> write, lets each stage work while the others do, as far as
+        they release the GIL (file I/O and the pyarrow and C parsers and
+        writers do)
+
+    param iterable: iterable
+        items to produce, such as a generator of dataframe chunks
+    param queue_size: int
+        bound of items produced but not yet consumed, which bounds memory
+    param name: str
+        thread name, shown in logs
+    returns: generator
+        the items of iterable, in order; an error raised while producing
+        them is raised by the generator
+    """
+    items = queue.Queue(maxsize=max(int(queue_size), 1))
+    stopped = threading.Event()
+
+    def put(message):
+        # Give up once the consumer stopped, rather than block on a full queue forever
+        while not stopped.is_set():
+            try:
+                items.put(message, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((_ITEM, item)):
+                    return
+            put((_DONE, None))
+        except BaseException as error:
+            put((_ERROR, error))
+
+    return _consume(items, stopped, threading.Thread(target=produce, name=name, daemon=True))
+
+
+def _consume(items, stopped, thread):
+    """ Start the prefetch thread and yield the items it puts on the queue.
+        Starting it here rather than in prefetch means a consumer that never
+        iterates leaves no thread behind
+    """
+    thread.start()
+    try:
+        while True:
+            kind, item = items.get()
+            if kind == _DONE:
+                return
+            if kind == _ERROR:
+                raise item
+            yield item
+    finally:
+        # Also reached when the consumer stops early, which lets the producer finish
+        stopped.set()
+        thread.join()
+
+
+def background(func, *args, **kwargs):
+    """ Start func(*args, **kwargs) in a background thread
+
+    param func: callable
+        task to run, e.g. loading a lookup table while the main thread reads a file
+    returns: concurrent.futures.Future
+        result of the task, result() waits for it and raises its error
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(func, *args, **kwargs)
+    executor.shutdown(wait=False)
+    return future
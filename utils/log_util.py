@@ -1,10 +1,17 @@
 import functools
+import json
 import logging
+import threading
+import time
 from inspect import signature
 
+# Stage metrics recorded by log_trace, None while metrics are disabled
+_metrics = None
+
 
 def counter(func):
-    """A decorator to affect indentation in our logging history
+    """A decorator to affect indentation in our logging history.
+    The call depth is kept per thread, since pipeline stages run in threads of their own
 
     param func: object
         any pre-existing function object
@@ -13,27 +20,134 @@ def counter(func):
     """
     @functools.wraps(func)
     def wrapper_counter(*args, **kwargs):
-        wrapper_counter.calls = 0
         return func(*args, **kwargs)
+    wrapper_counter.calls = threading.local()
     return wrapper_counter
 
 
 @counter
 def log_trace(func):
-    """Decorator of any function for our logging records
+    """Decorator of any function for our logging records.
+    When metrics are enabled, also records wall time, CPU time,
+    input and output row counts and output memory of every call
 
     param func: object
         any pre-existing function object
     returns: wrapper
         the call to the actual wrapped function
     """
+    func_signature = signature(func)
 
     @functools.wraps(func)
     def wrapper_logging(*args, **kwargs):
-        log_trace.calls += 1
-        logging.info(f'{"   " * log_trace.calls}Entering {func.__name__} using {signature(func)}')
-        target = func(*args, **kwargs)
-        logging.info(f'{"   " * log_trace.calls}Leaving {func.__name__} using {signature(func)}')
-        log_trace.calls -= 1
+        depth = getattr(log_trace.calls, 'depth', 0) + 1
+        log_trace.calls.depth = depth
+        logging.info('%sEntering %s using %s', '   ' * depth, func.__name__, func_signature)
+        try:
+            if _metrics is None:
+                target = func(*args, **kwargs)
+            else:
+                wall_start = time.perf_counter()
+                cpu_start = time.process_time()
+                target = func(*args, **kwargs)
+                _metrics.append({'stage': func.__name__,
+                                 'depth': depth,
+                                 'wall_seconds': time.perf_counter() - wall_start,
+                                 'cpu_seconds': time.process_time() - cpu_start,
+                                 'input_rows': _count_rows(next((arg for arg in args + tuple(kwargs.values())
+                                                                 if _is_frame(arg)), None)),
+                                 'output_rows': _count_rows(target),
+                                 'output_bytes': _count_bytes(target)})
+            logging.info('%sLeaving %s using %s', '   ' * depth, func.__name__, func_signature)
+        finally:
+            log_trace.calls.depth = depth - 1
         return target
     return wrapper_logging
+
+
+def enable_metrics():
+    """Start recording stage metrics of every log_trace decorated call"""
+    global _metrics
+    _metrics = []
+
+
+def disable_metrics():
+    """Stop recording stage metrics and drop the recorded ones"""
+    global _metrics
+    _metrics = None
+
+
+def get_metrics():
+    """Get the stage metrics recorded so far
+
+    returns: list of dict
+        one record per decorated call, in order of completion
+    """
+    return list(_metrics or [])
+
+
+def write_metrics_report(path):
+    """Write recorded stage metrics to given path, as a Prometheus textfile
+    when path ends with '.prom' and as JSON otherwise
+
+    param path: str
+        destination path of the report
+    returns: None
+    """
+    summary = {}
+    for record in _metrics or []:
+        stage = summary.setdefault(record['stage'], {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                                                     'input_rows': 0, 'output_rows': 0, 'output_bytes': 0})
+        stage['calls'] += 1
+        for key in ('wall_seconds', 'cpu_seconds', 'input_rows', 'output_rows', 'output_bytes'):
+            stage[key] += record[key] or 0
+    peak_rss_bytes = _get_peak_rss_bytes()
+
+    with open(path, 'w') as file:
+        if path.endswith('.prom'):
+            for key in ('calls', 'wall_seconds', 'cpu_seconds', 'input_rows', 'output_rows', 'output_bytes'):
+                file.write(f'# TYPE etl_stage_{key} gauge\n')
+                for stage_name, stage in summary.items():
+                    file.write(f'etl_stage_{key}{{stage="{stage_name}"}} {stage[key]}\n')
+            if peak_rss_bytes is not None:
+                file.write('# TYPE etl_peak_rss_bytes gauge\n')
+                file.write(f'etl_peak_rss_bytes {peak_rss_bytes}\n')
+        else:
+            json.dump({'peak_rss_bytes': peak_rss_bytes, 'stages': summary, 'calls': _metrics or []},
+                      file, indent=4)
+    logging.info(f'Metrics of <{len(summary)}> stages were written to <{path}>')
+
+
+def _is_frame(obj):
+    """Duck-type check for a dataframe, without importing pandas"""
+    return hasattr(obj, 'index') and hasattr(obj, 'memory_usage')
+
+
+def _count_rows(obj):
+    """Number of rows of a dataframe or a list of dataframes, None for anything else"""
+    if _is_frame(obj):
+        return len(obj.index)
+    if isinstance(obj, list) and obj and all(_is_frame(item) for item in obj):
+        return sum(len(item.index) for item in obj)
+    return None
+
+
+def _count_bytes(obj):
+    """Shallow memory of a dataframe or a list of dataframes, None for anything else"""
+    if _is_frame(obj):
+        return int(obj.memory_usage(index=True, deep=False).sum())
+    if isinstance(obj, list) and obj and all(_is_frame(item) for item in obj):
+        return sum(int(item.memory_usage(index=True, deep=False).sum()) for item in obj)
+    return None
+
+
+def _get_peak_rss_bytes():
+    """Peak resident memory of this process, None where not available"""
+    try:
+        import resource
+        import sys
+    except ImportError:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+
+class MappingIndex:
+    """ Lookup index compiled from a mapping table. Keys are held in a
+        hash-based pandas Index and every mapped column in an array whose
+        last element is the value of a missing key, so a missing key
+        (indexer -1) lands on it without any extra fill step
+    """
+
+    def __init__(self, df_mapping, key_column, default_value, fill_columns=None):
+        """ Compile the index out of given mapping dataframe.
+            Only the first row of a duplicated key is kept
+
+        param df_mapping: pandas dataframe
+            mapping table
+        param key_column: str
+            column of the mapping table to look keys up in
+        param default_value: various
+            value assigned to fill_columns when a key is missing from the mapping table
+        param fill_columns: list of str
+            mapped columns taking default_value for a missing key, every mapped column if not given;
+            the other columns are left missing, as in a left merge
+        """
+        df_unique = df_mapping.drop_duplicates(subset=[key_column])
+        self.keys = pd.Index(df_unique[key_column].to_numpy())
+        self.columns = {}
+        for column in df_unique.columns:
+            if column != key_column:
+                missing_value = default_value if fill_columns is None or column in fill_columns else np.nan
+                self.columns[column] = np.append(df_unique[column].to_numpy(dtype=object), missing_value)
+
+    def get_indexer(self, series):
+        """ Find the mapping position of every value in given column.
+            Categorical columns only look up their categories and
+            broadcast the result through the category codes
+
+        param series: pandas series
+            column holding the keys to look up
+        return: numpy array
+            mapping position per row, -1 for a missing key
+        """
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            category_indexer = np.append(self.keys.get_indexer(series.cat.categories), -1)
+            return category_indexer[series.cat.codes.to_numpy()]
+        return self.keys.get_indexer(series)
+
+    def apply(self, df, key_column):
+        """ Add every mapped column to given dataframe
+
+        param df: pandas dataframe
+            dataframe to add mapped columns to
+        param key_column: str
+            column of df holding the keys
+        return: pandas dataframe
+            dataframe with mapped columns added
+        """
+        indexer = self.get_indexer(df[key_column])
+        return df.assign(**{column: values[indexer] for column, values in self.columns.items()})
@@ -1,3 +1,5 @@
+import importlib.util
+import sys
 from argparse import Namespace as ArgNamespace
 from types import SimpleNamespace
 
@@ -47,3 +49,22 @@ def eval_update_mapping(mapping, key, update_with):
         if isinstance(mapping_target, dict) and update_with and isinstance(update_with, dict):
             mapping_target.update(update_with)
     return mapping_target
+
+
+def lazy_import(module_name):
+    """ Import given module lazily; it is only loaded on first attribute access,
+        so heavy libraries are not paid for by runs that never use them
+
+    param module_name: str; Fully qualified module name
+    return: module; Module, loaded on first use
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    spec = importlib.util.find_spec(module_name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,183 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+import pandas as pd
+
+# Columnar file types a partitioned dataset can be written in, with the pyarrow dataset format reading them
+PARTITION_FORMATS = {'parquet': 'parquet',
+                     'arrow': 'ipc',
+                     'feather': 'ipc'}
+# Derived partition keys of date columns, configured as '<column>:<period>'
+DATE_PERIODS = {'year': '%Y',
+                'month': '%Y-%m',
+                'day': '%Y-%m-%d'}
+# Directory value of rows without a partition key, as used by Hive
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+# Filter operators pyarrow evaluates while scanning, so non matching row groups and partitions are skipped
+ARROW_FILTER_OPS = ('=', '==', '!=', '<', '<=', '>', '>=', 'in', 'not in')
+
+
+def get_partition_keys(df, partition_by):
+    """ Compute the partition key columns of df
+
+    param df: pandas dataframe
+        dataframe to partition
+    param partition_by: list of str
+        column names, or '<date column>:<year|month|day>' for a period of a date column
+    returns: tuple of (pandas dataframe, list of str)
+        key columns, named '<column>' or '<column>_<period>', and the
+        columns of df that move from the part files into directory names
+    """
+    keys = {}
+    moved_columns = []
+    for spec in partition_by:
+        column, _, period = spec.partition(':')
+        if column not in df:
+            raise KeyError(f'Partition column <{column}> is missing from given dataframe')
+        if period:
+            if period not in DATE_PERIODS:
+                raise ValueError(f'Unknown partition period <{period}> of <{column}>, '
+                                 f'elect one of {list(DATE_PERIODS)}')
+            keys[f'{column}_{period}'] = pd.to_datetime(df[column]).dt.strftime(DATE_PERIODS[period])
+        else:
+            keys[column] = df[column]
+            moved_columns.append(column)
+    return pd.DataFrame(keys, index=df.index), moved_columns
+
+
+def write_partitions(path, df, partition_by, file_type, part_name='part-0', compression=None, workers=None):
+    """ Write df into a Hive style partitioned dataset directory,
+        <path>/<key>=<value>/.../<part_name>.<file_type>, one part file per
+        partition, with the part files written in parallel
+
+    param path: str
+        dataset directory, created if missing
+    param df: pandas dataframe
+        dataframe to write
+    param partition_by: list of str
+        partition columns, see get_partition_keys
+    param file_type: str
+        'parquet', 'arrow' or 'feather'
+    param part_name: str
+        part file title, distinct for every write into the same dataset
+    param compression: str
+        arrow/feather compression, pyarrow's default when None
+    param workers: int
+        number of writer threads, os.cpu_count() when None
+    returns: int
+        number of part files written
+    """
+    if file_type not in PARTITION_FORMATS:
+        raise IOError(f"{file_type} file can not be partitioned. Please elect 'parquet', 'arrow' or 'feather'.")
+
+    df_keys, moved_columns = get_partition_keys(df, partition_by)
+    df_values = df.drop(columns=moved_columns)
+    groups = df_keys.groupby(list(df_keys.columns), sort=False, observed=True, dropna=False).indices
+
+    def write_part(key_values, positions):
+        if not isinstance(key_values, tuple):
+            key_values = (key_values,)
+        part_dir = os.path.join(path, *[f'{key}={_quote_value(value)}'
+                                        for key, value in zip(df_keys.columns, key_values)])
+        os.makedirs(part_dir, exist_ok=True)
+        df_part = df_values.take(positions).reset_index(drop=True)
+        part_path = os.path.join(part_dir, f'{part_name}.{file_type}')
+        if file_type == 'parquet':
+            df_part.to_parquet(part_path, index=False)
+        else:
+            df_part.to_feather(part_path, compression=compression)
+
+    # pyarrow releases the GIL while encoding and writing, so threads write parts side by side
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for future in [executor.submit(write_part, key_values, positions)
+                       for key_values, positions in groups.items()]:
+            future.result()
+
+    return len(groups)
+
+
+def read_partitions(path, file_type, columns=None, filters=None):
+    """ Read a Hive style partitioned dataset directory. Partition keys come
+        back as columns, and partitions not matching filters are not read
+
+    param path: str
+        dataset directory
+    param file_type: str
+        'parquet', 'arrow' or 'feather'
+    param columns: list of str
+        columns to project, all columns when None
+    param filters: list of tuple
+        filters such as [('Region', '=', 'Europe')], see get_arrow_filters
+    returns: pandas dataframe
+    """
+    import pyarrow.parquet as pq
+
+    dataset = open_dataset(path, file_type)
+    arrow_filters = get_arrow_filters(filters, dataset.schema)
+    expression = pq.filters_to_expression(arrow_filters) if arrow_filters else None
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+def open_dataset(path, file_type):
+    """ Open a Hive style partitioned dataset directory for scanning, with
+        its partition keys as columns
+
+    param path: str
+        dataset directory
+    param file_type: str
+        'parquet', 'arrow' or 'feather'
+    returns: pyarrow dataset
+    """
+    import pyarrow.dataset as ds
+    return ds.dataset(path, format=PARTITION_FORMATS[file_type], partitioning='hive')
+
+
+def get_arrow_filters(filters, schema):
+    """ Select the filters pyarrow can evaluate while scanning, with their
+        values cast to the types of the filtered fields, e.g. a date string
+        to a timestamp. Other filters are left to be applied after reading
+
+    param filters: list of list
+        [column, operator, value] filters, as configured
+    param schema: pyarrow schema
+        schema of the file or dataset to read
+    returns: list of tuple
+        pyarrow filters, empty when none applies
+    """
+    arrow_filters = []
+    for column, operator, value in filters or []:
+        if operator not in ARROW_FILTER_OPS or column not in schema.names:
+            continue
+        field_type = schema.field(column).type
+        if operator in ('in', 'not in'):
+            value = [_cast_filter_value(item, field_type) for item in value]
+        else:
+            value = _cast_filter_value(value, field_type)
+        arrow_filters.append((column, operator, value))
+    return arrow_filters
+
+
+def _cast_filter_value(value, field_type):
+    """ Cast a configured filter value to a pyarrow field type """
+    import pyarrow as pa
+
+    if pa.types.is_dictionary(field_type):
+        field_type = field_type.value_type
+    if pa.types.is_timestamp(field_type):
+        return pd.Timestamp(value).tz_localize(field_type.tz) if field_type.tz else pd.Timestamp(value)
+    if pa.types.is_date(field_type):
+        return pd.Timestamp(value).date()
+    if pa.types.is_integer(field_type):
+        return int(value)
+    if pa.types.is_floating(field_type):
+        return float(value)
+    if pa.types.is_string(field_type) or pa.types.is_large_string(field_type):
+        return str(value)
+    return value
+
+
+def _quote_value(value):
+    """ Directory name of a partition key value """
+    if pd.isna(value):
+        return NULL_PARTITION
+    return quote(str(value), safe='')
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+# Default least number of counters, which keeps sketches exact for moderate cardinalities at little memory
+MIN_SKETCH_SIZE = 10000
+
+
+class HeavyHitters:
+    """ Bounded memory summary of the largest totals of a stream of weighted
+        keys (Misra-Gries summary, in its mergeable form). At most capacity
+        counters are kept; each one underestimates its key's true total by
+        no more than error, which grows by at most total / (capacity + 1).
+        The summary only holds for non-negative counters. Negative weights
+        (e.g. cancelled invoices) are taken off their key's counter, and
+        whatever would take a counter below zero, such as a key holding no
+        counter, is left out of the counters and added up in clipped
+        instead. A key may then be overestimated by its clipped amount,
+        while total stays exact.
+    """
+
+    def __init__(self, capacity):
+        """ Initializes an empty summary
+
+        param capacity: int
+            number of counters kept, some multiple of the number of keys wanted
+        """
+        self.capacity = capacity
+        self.counters = pd.Series(dtype=float)
+        self.total = 0.0
+        self.error = 0.0
+        self.clipped = 0.0
+
+    def update(self, keys, weights):
+        """ Add weighted keys, e.g. the totals of one chunk, to the summary
+
+        param keys: array like
+            keys, distinct or not
+        param weights: array like
+            weight of every key
+        returns: None
+        """
+        chunk = pd.Series(np.asarray(weights, dtype=float),
+                          index=pd.Index(np.asarray(keys, dtype=object))).groupby(level=0, sort=False).sum()
+        self.total += chunk.sum()
+        counters = self.counters.add(chunk, fill_value=0.0)
+        negative = counters < 0
+        if negative.any():
+            self.clipped -= counters[negative].sum()
+            counters = counters[~negative]
+        if len(counters.index) > self.capacity:
+            # Subtracting the (capacity + 1)-th largest counter from all drops every counter
+            # but the capacity largest, and bounds how much any total is underestimated
+            threshold = counters.nlargest(self.capacity + 1).iloc[-1]
+            counters = counters[counters > threshold] - threshold
+            self.error += threshold
+        self.counters = counters
+
+    def top(self, k):
+        """ Largest k counters
+
+        param k: int
+            number of keys wanted
+        returns: pandas series
+            estimated totals indexed by key, largest first
+        """
+        return self.counters.nlargest(k)
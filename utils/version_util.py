@@ -0,0 +1,143 @@
+import contextlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+
+# Per-directory index of the next free version number of every output title
+MANIFEST_NAME = '.versions.json'
+LOCK_NAME = '.versions.lock'
+# Seconds to wait for the lock, and age after which a lock left by a crashed run is broken
+LOCK_TIMEOUT = 30
+LOCK_STALE_AFTER = 300
+
+
+@contextlib.contextmanager
+def file_lock(lock_path, timeout=LOCK_TIMEOUT):
+    """ Hold an exclusive lock, as a lock file created with O_EXCL, which is
+        atomic on every platform and across processes
+
+    param lock_path: str
+        lock file path
+    param timeout: float
+        seconds to wait for the lock before raising TimeoutError
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            lock_fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > LOCK_STALE_AFTER:
+                    logging.warning(f'Breaking stale lock <{lock_path}>')
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f'Could not acquire lock <{lock_path}> within <{timeout}> seconds')
+            time.sleep(0.01)
+    try:
+        os.write(lock_fd, str(os.getpid()).encode())
+        os.close(lock_fd)
+        yield
+    finally:
+        os.remove(lock_path)
+
+
+def allocate_path(directory, title, extension, scan_version_number):
+    """ Reserve the next version of an output in directory, '<title>.<extension>'
+        first and '<title>_<N>.<extension>' after it. The directory's manifest
+        keeps the next version number of every title, so allocation does not
+        list the directory, and the lock plus an empty placeholder file make
+        the reserved path unique across concurrent runs
+
+    param directory: str
+        output directory
+    param title: str
+        root title of the output, without version suffix
+    param extension: str
+        file extension of the output
+    param scan_version_number: callable
+        fallback taking the directory's file names and returning the next
+        version suffix, used once per title that is not in the manifest yet
+    returns: str
+        reserved path, to be replaced by the finished output
+    """
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    key = f'{title}.{extension}'
+
+    with file_lock(os.path.join(directory, LOCK_NAME)):
+        manifest = {}
+        if os.path.isfile(manifest_path):
+            with open(manifest_path) as file:
+                manifest = json.load(file)
+
+        number = manifest.get(key)
+        if number is None:
+            # Outputs written before the manifest existed are counted once
+            suffix = scan_version_number(os.listdir(directory))
+            number = int(suffix[1:]) if suffix else 0
+
+        # Skip names taken outside the manifest, e.g. copied in by hand
+        while True:
+            path = os.path.join(directory, f'{title}_{number}.{extension}' if number else key)
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                number += 1
+
+        manifest[key] = number + 1
+        with atomic_path(manifest_path) as temp_path:
+            with open(temp_path, 'w') as file:
+                json.dump(manifest, file, indent=2, sort_keys=True)
+
+    return path
+
+
+@contextlib.contextmanager
+def atomic_path(final_path):
+    """ Yield a temporary path next to final_path to write the output to, and
+        rename it over final_path once written, so readers and concurrent runs
+        never see a partial output. On failure the temporary output is removed,
+        along with final_path if it is still an empty placeholder
+
+    param final_path: str
+        destination file or dataset directory
+    """
+    directory, file_name = os.path.split(os.path.abspath(final_path))
+    title, extension = os.path.splitext(file_name)
+    # Keep the extension, since writers such as pandas' Excel writer pick their format from it
+    temp_path = os.path.join(directory, f'.{title}.{uuid.uuid4().hex[:8]}.tmp{extension}')
+    try:
+        yield temp_path
+        if not os.path.exists(temp_path):
+            # Nothing was written, e.g. for an empty chunk stream
+            _remove_placeholder(final_path)
+            return
+        if os.path.isdir(temp_path) or os.path.isdir(final_path):
+            # A directory can not replace or be replaced by a file, so clear the destination first
+            _remove(final_path)
+        os.replace(temp_path, final_path)
+    except BaseException:
+        _remove(temp_path)
+        _remove_placeholder(final_path)
+        raise
+
+
+def _remove_placeholder(path):
+    """ Remove path if it is still the empty placeholder reserved by allocate_path """
+    if os.path.isfile(path) and os.path.getsize(path) == 0:
+        os.remove(path)
+
+
+def _remove(path):
+    """ Remove a file or directory, if it exists """
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)